@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -151,8 +152,12 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
-    ]
+    ],
+    # List endpoints return {"next", "previous", "results"} pages; see tours/pagination.py.
+    'DEFAULT_PAGINATION_CLASS': 'tours.pagination.KeysetPagination',
+    'PAGE_SIZE': config("API_PAGE_SIZE", default=100, cast=int),
 }
+API_MAX_PAGE_SIZE = config("API_MAX_PAGE_SIZE", default=1000, cast=int)
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=config("JWT_ACCESS_TOKEN_DAYS", default=7, cast=int)),
@@ -161,6 +166,38 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': False,
 }
 
+# OpenAI response cache (SQLite). Lives in the user's cache directory, outside the
+# source tree; set OPENAI_CACHE_PATH to an empty string to turn the cache off.
+OPENAI_CACHE_PATH = config(
+    "OPENAI_CACHE_PATH",
+    default=str(Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "artist_tour_manager" / "ai_cache.sqlite3"),
+)
+
+# Tests run with the OpenAI response cache disabled (see tours/test_runner.py).
+TEST_RUNNER = "tours.test_runner.TestRunner"
+
+# Optimization
+# Size of the per-web-worker pool of spawned solver processes behind /api/plans/run-batch/.
+PLAN_BATCH_MAX_WORKERS = config("PLAN_BATCH_MAX_WORKERS", default=4, cast=int)
+# prune_optimization_runs keeps this many newest runs per plan (confirmed runs are always kept).
+OPTIMIZATION_RUNS_KEEP_PER_PLAN = config("OPTIMIZATION_RUNS_KEEP_PER_PLAN", default=20, cast=int)
+# Background threads that finish ai_mode="deferred" plan runs, and how many such
+# jobs may be queued or running per process before new ones are refused.
+OPTIMIZATION_DEFERRED_WORKERS = config("OPTIMIZATION_DEFERRED_WORKERS", default=2, cast=int)
+OPTIMIZATION_DEFERRED_MAX_PENDING = config("OPTIMIZATION_DEFERRED_MAX_PENDING", default=20, cast=int)
+# Responses to POSTs sent with an Idempotency-Key header are kept this long; a
+# retry that arrives while the first request is still running waits up to
+# IDEMPOTENCY_WAIT_SECONDS for it, and an in-progress key older than
+# IDEMPOTENCY_IN_FLIGHT_SECONDS is treated as abandoned.
+IDEMPOTENCY_TTL_SECONDS = config("IDEMPOTENCY_TTL_SECONDS", default=86400, cast=int)
+IDEMPOTENCY_WAIT_SECONDS = config("IDEMPOTENCY_WAIT_SECONDS", default=60.0, cast=float)
+IDEMPOTENCY_IN_FLIGHT_SECONDS = config("IDEMPOTENCY_IN_FLIGHT_SECONDS", default=600, cast=int)
+# Identical plan runs (same plan and input hash) are coalesced: a run saved in the
+# last SINGLE_FLIGHT_REUSE_SECONDS is shared, and a worker waits up to
+# SINGLE_FLIGHT_WAIT_SECONDS for another worker solving the same inputs.
+SINGLE_FLIGHT_REUSE_SECONDS = config("SINGLE_FLIGHT_REUSE_SECONDS", default=30, cast=int)
+SINGLE_FLIGHT_WAIT_SECONDS = config("SINGLE_FLIGHT_WAIT_SECONDS", default=120.0, cast=float)
+
 # CORS
 CORS_ALLOW_ALL_ORIGINS = config("CORS_ALLOW_ALL_ORIGINS", default=False, cast=bool)
 CORS_ALLOWED_ORIGINS = [
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class ResponseCache:
+    """
+    Persistent cache for OpenAI JSON responses, stored in a small SQLite file so
+    it is shared by every worker process and thread without touching the main
+    database connection. Entries expire after `ttl_seconds` and the least
+    recently used ones are evicted once there are more than `max_entries`.
+    Cache failures are treated as misses; they never break an AI call. A
+    `path` of None disables the cache.
+    """
+
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = Path(path) if path else None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._ready = False
+
+    @staticmethod
+    def key(model, system_prompt, user_prompt):
+        raw = json.dumps([model, system_prompt, user_prompt])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                if not self._ready:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute(
+                        'CREATE TABLE IF NOT EXISTS responses ('
+                        'key TEXT PRIMARY KEY, response TEXT NOT NULL, '
+                        'created_at REAL NOT NULL, last_used_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)'
+                    )
+                    conn.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at)')
+                    self._ready = True
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        if self.path is None or self.max_entries <= 0 or not self.path.exists():
+            return None
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+                if not row:
+                    return None
+                if now - row[1] > self.ttl_seconds:
+                    conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    return None
+                conn.execute('UPDATE responses SET last_used_at = ?, hits = hits + 1 WHERE key = ?', (now, key))
+            return json.loads(row[0])
+        except (sqlite3.Error, OSError, ValueError):
+            return None
+
+    def set(self, key, value):
+        if self.path is None or self.max_entries <= 0:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, response, created_at, last_used_at, hits) VALUES (?, ?, ?, ?, 0)',
+                    (key, json.dumps(value), now, now),
+                )
+                conn.execute('DELETE FROM responses WHERE created_at < ?', (now - self.ttl_seconds,))
+                conn.execute(
+                    'DELETE FROM responses WHERE key IN ('
+                    'SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,),
+                )
+        except (sqlite3.Error, OSError):
+            pass
+
@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connections
+
+
+class BoundedExecutor:
+    """
+    In-process thread pool that refuses new work once `max_pending` jobs are
+    queued or running, so a burst of requests cannot pile up unbounded work
+    inside a web worker. Each job closes its thread's database connections
+    when it finishes.
+    """
+
+    def __init__(self, max_workers, max_pending, thread_name_prefix):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs); returns None when the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            future = self._executor.submit(self._run, fn, args, kwargs)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _future: self._slots.release())
+        return future
+
+    @staticmethod
+    def _run(fn, args, kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+
+def start_refinement_executor():
+    # Threads do not survive fork(); gunicorn workers forked after import start their own.
+    global refinement_executor
+    refinement_executor = BoundedExecutor(
+        settings.OPTIMIZATION_DEFERRED_WORKERS,
+        settings.OPTIMIZATION_DEFERRED_MAX_PENDING,
+        thread_name_prefix='refine',
+    )
+
+
+_solver_pool = None
+_solver_pool_lock = threading.Lock()
+
+
+def solver_pool():
+    """
+    Process pool for CPU-bound plan solves, created on first use and shared by
+    every request this web worker serves. Workers are spawned, not forked, so
+    they never inherit the web worker's database connections, locks or
+    threads, and pay Django's startup once rather than per request.
+    """
+    global _solver_pool
+    with _solver_pool_lock:
+        if _solver_pool is None:
+            _solver_pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.PLAN_BATCH_MAX_WORKERS),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _solver_pool
+
+
+def discard_solver_pool(pool=None):
+    """Drop the shared pool (e.g. after a worker died and broke it); the next call to solver_pool() starts a new one."""
+    global _solver_pool
+    with _solver_pool_lock:
+        if _solver_pool is not None and (pool is None or _solver_pool is pool):
+            _solver_pool.shutdown(wait=False, cancel_futures=True)
+            _solver_pool = None
+
+
+def reset_after_fork():
+    # A forked child must not share the parent's pool or threads.
+    global _solver_pool, _solver_pool_lock
+    _solver_pool = None
+    _solver_pool_lock = threading.Lock()
+    start_refinement_executor()
+
+
+start_refinement_executor()
+os.register_at_fork(after_in_child=reset_after_fork)
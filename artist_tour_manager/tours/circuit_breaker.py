@@ -0,0 +1,87 @@
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Process-wide circuit breaker. After `failure_threshold` consecutive
+    failures the circuit opens and calls are rejected immediately for
+    `cooldown_seconds`; then a single trial call is let through (half-open)
+    and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, cooldown_seconds=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._counters = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def _refresh_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+    def allow(self):
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._counters['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._counters['successes'] += 1
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._counters['failures'] += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._counters['opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            self._refresh_state()
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = round(max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at)), 3)
+            return {
+                'name': self.name,
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'cooldown_seconds': self.cooldown_seconds,
+                'retry_in_seconds': retry_in,
+                **self._counters,
+            }
@@ -0,0 +1,147 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def extract_json_after(label, text):
+    index = text.find(label)
+    if index < 0:
+        return None
+    try:
+        value, _end = json.JSONDecoder().raw_decode(text[index + len(label):].lstrip())
+    except ValueError:
+        return None
+    return value
+
+
+def extract_int(label, text):
+    match = re.search(rf'{label}:\s*(\d+)', text)
+    return int(match.group(1)) if match else None
+
+
+def fake_revenue_adjustments(user_prompt):
+    venues = extract_json_after('Venues:', user_prompt)
+    if venues is None:
+        # Batch prompts (ai_adjust_revenue_batch) list rows as id|artist|city|...
+        ids = [int(line.split('|', 1)[0]) for line in user_prompt.splitlines() if re.match(r'\d+\|', line)]
+        return {
+            'venue_adjustments': [
+                {'id': row_id, 'revenue_multiplier': round(0.8 + (row_id % 5) * 0.1, 2)} for row_id in ids
+            ],
+        }
+    return {
+        'venue_adjustments': [
+            # Deterministic spread over 0.8-1.2 so adjusted revenue visibly differs.
+            {'venue_id': v['venue_id'], 'revenue_multiplier': round(0.8 + (v['venue_id'] % 5) * 0.1, 2)}
+            for v in venues
+        ],
+    }
+
+
+def fake_venue_selection(user_prompt):
+    # Rows follow build_selection_prompt: id|city|lat|lon|revenue_k|capacity_k|cost_k
+    rows = [line.split('|') for line in user_prompt.splitlines() if re.match(r'\d+\|', line)]
+    max_venues = extract_int('max_venues', user_prompt) or len(rows)
+    start_id = extract_int('start_id', user_prompt)
+    ranked = sorted(rows, key=lambda row: (-float(row[4] or 0), int(row[0])))
+    picked = [start_id] if any(int(row[0]) == start_id for row in rows) else []
+    for row in ranked:
+        if len(picked) >= max_venues:
+            break
+        if int(row[0]) not in picked:
+            picked.append(int(row[0]))
+    return {'venue_ids': picked, 'rationale': f'Stand-in model picked the {len(picked)} highest-revenue venues.'}
+
+
+def fake_completion(request_body):
+    messages = request_body.get('messages') or []
+    user_prompt = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+    if 'venue_adjustments' in user_prompt:
+        content = fake_revenue_adjustments(user_prompt)
+    else:
+        content = fake_venue_selection(user_prompt)
+    return {
+        'id': 'chatcmpl-fake',
+        'object': 'chat.completion',
+        'model': request_body.get('model'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': json.dumps(content)},
+            'finish_reason': 'stop',
+        }],
+    }
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self.send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+        with server.lock:
+            server.requests += 1
+            roll = server.rng.random()
+            delay = server.latency + server.rng.uniform(0, server.jitter)
+        if roll < server.timeout_rate:
+            delay = server.hang
+        time.sleep(delay)
+        if server.timeout_rate <= roll < server.timeout_rate + server.error_rate:
+            return self.send_json(server.error_status, {'error': {'message': 'Injected failure', 'type': 'fake_llm'}})
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return self.send_json(400, {'error': {'message': 'Body must be JSON'}})
+        self.send_json(200, fake_completion(payload))
+
+    def send_json(self, status_code, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up first (e.g. an injected stall outlasted its timeout).
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_fake_llm_server(host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, error_status=429,
+                         timeout_rate=0.0, hang=30.0, seed=None, verbose=False):
+    """
+    Chat-completions stand-in for tests and load benchmarks. Returns deterministic
+    venue_adjustments / venue_ids JSON after `latency` (+ up to `jitter`) seconds;
+    `error_rate` of requests fail with `error_status` and `timeout_rate` of them
+    stall for `hang` seconds. Call serve_forever() (or serve_in_thread()) to run it.
+    """
+    server = ThreadingHTTPServer((host, port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.rng = random.Random(seed)
+    server.requests = 0
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.timeout_rate = timeout_rate
+    server.hang = hang
+    server.verbose = verbose
+    server.base_url = f'http://{host}:{server.server_port}/v1'
+    return server
+
+
+def serve_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,92 @@
+import http.client
+import json
+import queue
+import threading
+from urllib.parse import urlsplit
+
+
+class HTTPStatusError(Exception):
+    """Raised for 4xx/5xx responses; `body` holds the decoded response text."""
+
+    def __init__(self, code, body):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+        self.body = body
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to a single host, shared by every thread in
+    the process so repeated calls skip the TCP and TLS handshakes. At most
+    `max_connections` requests are in flight at once; further callers wait for
+    a free slot, up to their own timeout.
+    """
+
+    def __init__(self, base_url, max_connections=8, timeout=20.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, max_connections))
+
+    def _new_connection(self, timeout):
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=timeout)
+
+    def _checkout(self, timeout):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._new_connection(timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _send(self, conn, method, path, body, headers):
+        try:
+            conn.request(method, self.base_path + path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        return response.status, data
+
+    def request(self, method, path, body=None, headers=None, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No free connection to {self.host} within {timeout:g}s")
+        try:
+            conn, reused = self._checkout(timeout)
+            try:
+                status, data = self._send(conn, method, path, body, headers or {})
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry once on a fresh one.
+                status, data = self._send(self._new_connection(timeout), method, path, body, headers or {})
+        finally:
+            self._slots.release()
+        if status >= 400:
+            raise HTTPStatusError(status, data.decode('utf-8', errors='replace'))
+        return data
+
+    def post_json(self, path, payload, headers=None, timeout=None):
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        data = self.request('POST', path, body=json.dumps(payload).encode('utf-8'), headers=headers, timeout=timeout)
+        return json.loads(data.decode('utf-8'))
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,108 @@
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+# How often a retry re-checks a key whose first request is still running.
+POLL_INTERVAL_SECONDS = 0.2
+
+
+def request_fingerprint(request):
+    raw = json.dumps([request.method, request.path, request.data], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Insert an in-progress row for (user, key). Returns (row, created); when the
+    key is already taken, row is the existing one (or None if it just vanished).
+    Expired rows and abandoned in-progress ones are cleared first.
+    """
+    now = timezone.now()
+    IdempotencyKey.objects.filter(user=user).filter(
+        Q(expires_at__lte=now)
+        | Q(key=key, status=IdempotencyKey.STATUS_IN_PROGRESS,
+            created_at__lte=now - timedelta(seconds=settings.IDEMPOTENCY_IN_FLIGHT_SECONDS))
+    ).delete()
+    try:
+        with transaction.atomic():
+            row = IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request_hash=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+            )
+        return row, True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(user=user, key=key).first(), False
+
+
+def replay(row):
+    return Response(row.response_body, status=row.response_status, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """
+    Make an APIView.post honour the Idempotency-Key header. The first request
+    with a key runs and its response is stored; a repeat with the same key and
+    body gets the stored response back without running again, and one that
+    arrives while the first is still running waits for it (up to
+    IDEMPOTENCY_WAIT_SECONDS). Reusing a key for a different request is a 422.
+    Server errors are not stored, so the client can retry them.
+    """
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key or not request.user.is_authenticated:
+            return view_method(view, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'detail': 'Idempotency-Key must be at most 255 characters.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            row, created = claim_key(request.user, key, fingerprint)
+            if created:
+                break
+            if row is not None:
+                if row.request_hash != fingerprint:
+                    return Response(
+                        {'detail': 'Idempotency-Key was already used for a different request.'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if row.status == IdempotencyKey.STATUS_COMPLETED:
+                    return replay(row)
+            if time.monotonic() >= deadline:
+                return Response(
+                    {'detail': 'A request with this Idempotency-Key is still in progress.'},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={'Retry-After': '5'},
+                )
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+        try:
+            response = view_method(view, request, *args, **kwargs)
+        except BaseException:
+            row.delete()
+            raise
+        if response.status_code >= 500 or not isinstance(response, Response):
+            row.delete()
+            return response
+        row.status = IdempotencyKey.STATUS_COMPLETED
+        row.response_status = response.status_code
+        row.response_body = response.data
+        row.save(update_fields=['status', 'response_status', 'response_body'])
+        return response
+
+    return wrapper
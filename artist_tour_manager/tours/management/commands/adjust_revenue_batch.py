@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from tours.models import FanDemand, RevenueMultiplier
+from tours.optimization import ai_adjust_revenue_batch, openai_settings
+from tours.views import fallback_prices, revenue_estimates
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute AI revenue multipliers for (artist, venue) demand rows in a few large prompts "
+        "and store them, so optimizations with use_ai skip the per-request revenue call."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--artist", type=int, action="append", dest="artists", help="Limit to this artist id (repeatable).")
+        parser.add_argument("--concurrency", type=int, help="Prompts in flight at once (default OPENAI_MAX_CONCURRENCY).")
+        parser.add_argument("--max-prompt-chars", type=int, help="Upper bound on one prompt's size (default OPENAI_BATCH_PROMPT_CHARS).")
+        parser.add_argument("--missing-only", action="store_true", help="Skip pairs that already have a stored multiplier.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Demand rows loaded and stored per round.")
+
+    def handle(self, *args, **options):
+        demands = FanDemand.objects.select_related("artist", "venue").order_by("id")
+        if options["artists"]:
+            demands = demands.filter(artist_id__in=options["artists"])
+        if options["missing_only"]:
+            demands = demands.exclude(Exists(
+                RevenueMultiplier.objects.filter(artist=OuterRef("artist"), venue=OuterRef("venue"))
+            ))
+
+        started = time.perf_counter()
+        totals = {"pairs": 0, "prompts": 0, "failed_prompts": 0, "stored": 0}
+        chunk_size = max(1, options["chunk_size"])
+        last_id = 0
+        while True:
+            chunk = list(demands.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            venues_by_id = {demand.venue_id: demand.venue for demand in chunk}
+            estimates = revenue_estimates(chunk, venues_by_id, fallback_prices({d.artist_id for d in chunk}))
+            rows = [
+                {
+                    "artist_id": demand.artist_id,
+                    "artist": demand.artist.name,
+                    "venue_id": demand.venue_id,
+                    "city": demand.venue.city,
+                    "latitude": demand.venue.latitude,
+                    "longitude": demand.venue.longitude,
+                    "base_revenue": estimates[(demand.artist_id, demand.venue_id)][0],
+                }
+                for demand in chunk
+            ]
+            multipliers, stats = ai_adjust_revenue_batch(
+                rows, concurrency=options["concurrency"], max_chars=options["max_prompt_chars"],
+            )
+            if multipliers:
+                RevenueMultiplier.objects.bulk_create(
+                    [
+                        RevenueMultiplier(artist_id=artist_id, venue_id=venue_id, multiplier=multiplier, model=openai_settings["model"])
+                        for (artist_id, venue_id), multiplier in multipliers.items()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["artist", "venue"],
+                    update_fields=["multiplier", "model", "updated_at"],
+                )
+            for key in ("pairs", "prompts", "failed_prompts"):
+                totals[key] += stats[key]
+            totals["stored"] += len(multipliers)
+
+        elapsed = time.perf_counter() - started
+        style = self.style.WARNING if totals["failed_prompts"] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"pairs={totals['pairs']} prompts={totals['prompts']} stored={totals['stored']} "
+            f"failed_prompts={totals['failed_prompts']} elapsed={elapsed:.2f}s"
+        ))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from tours.models import OptimizationRun
+
+
+def stored_bytes(run_ids):
+    """
+    On Postgres, the on-disk size of the stored results (pg_column_size, so
+    TOAST compression is counted). Elsewhere, the length of the stored text.
+    """
+    placeholders = ", ".join(["%s"] * len(run_ids))
+    size = "pg_column_size(result)" if connection.vendor == "postgresql" else "LENGTH(result)"
+    sql = f"SELECT COALESCE(SUM({size}), 0) FROM {OptimizationRun._meta.db_table} WHERE id IN ({placeholders})"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, run_ids)
+        return int(cursor.fetchone()[0] or 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite OptimizationRun results saved before compact storage (or as zlib blobs by an "
+        "earlier version) into the compact JSON format, in batches. Safe to re-run; compacted rows are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Runs rewritten per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Report the savings without writing.")
+
+    def handle(self, *args, **options):
+        # Compacted rows carry the "v" marker; legacy rows read back unchanged.
+        legacy = (
+            OptimizationRun.objects.filter(~Q(result__has_key="v") | Q(result__has_key="zlib"))
+            .order_by("id").only("id", "result")
+        )
+        batch_size = max(1, options["batch_size"])
+
+        started = time.perf_counter()
+        totals = {"rows": 0, "bytes_before": 0, "bytes_after": 0}
+        last_id = 0
+        while True:
+            batch = list(legacy.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            ids = [run.id for run in batch]
+            totals["rows"] += len(batch)
+            # Sizes are read back from the table, so they are what the database
+            # actually stores; a dry run rewrites the batch and rolls it back.
+            with transaction.atomic():
+                totals["bytes_before"] += stored_bytes(ids)
+                # Saving through CompactResultField re-encodes each result.
+                OptimizationRun.objects.bulk_update(batch, ["result"])
+                totals["bytes_after"] += stored_bytes(ids)
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+
+        elapsed = time.perf_counter() - started
+        saved = totals["bytes_before"] - totals["bytes_after"]
+        self.stdout.write(self.style.SUCCESS(
+            f"{'would compact' if options['dry_run'] else 'compacted'} rows={totals['rows']} "
+            f"bytes_before={totals['bytes_before']} bytes_after={totals['bytes_after']} "
+            f"saved={saved} elapsed={elapsed:.2f}s"
+        ))
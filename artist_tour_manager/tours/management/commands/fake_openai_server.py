@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from tours.fake_llm import make_fake_llm_server
+
+
+class Command(BaseCommand):
+    help = "Run a local stand-in for the OpenAI chat-completions API (point OPENAI_BASE_URL at it)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay before every response.")
+        parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay of up to this much.")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0-1).")
+        parser.add_argument("--error-status", type=int, default=429, help="HTTP status for injected failures.")
+        parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that stall (0-1).")
+        parser.add_argument("--hang-seconds", type=float, default=30.0, help="How long a stalled request hangs.")
+        parser.add_argument("--seed", type=int, help="Random seed for reproducible failure patterns.")
+        parser.add_argument("--verbose", action="store_true", help="Log every request.")
+
+    def handle(self, *args, **options):
+        server = make_fake_llm_server(
+            host=options["host"],
+            port=options["port"],
+            latency=options["latency_ms"] / 1000,
+            jitter=options["jitter_ms"] / 1000,
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+            timeout_rate=options["timeout_rate"],
+            hang=options["hang_seconds"],
+            seed=options["seed"],
+            verbose=options["verbose"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake OpenAI server listening; set OPENAI_BASE_URL={server.base_url} and OPENAI_API_KEY to any value."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {server.requests} requests.")
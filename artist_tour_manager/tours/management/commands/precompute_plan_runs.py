@@ -0,0 +1,119 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from tours.models import TourPlan, OptimizationRun
+from tours.views import load_plan_batch, plan_input_hash, save_plan_runs, solve_plan_in_worker
+
+
+def timed_solve(plan, data, inputs):
+    started = time.perf_counter()
+    event, payload, artefacts = solve_plan_in_worker(plan, data, inputs)
+    return event, payload, artefacts, time.perf_counter() - started
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = "Re-optimize every TourPlan whose inputs changed since its last run (intended for a nightly job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of solver processes.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Plans loaded from the database per batch.")
+        parser.add_argument("--all", action="store_true", help="Re-run every plan, even if its inputs are unchanged.")
+
+    def handle(self, *args, **options):
+        # Failed, pending and hash-less runs say nothing about the current inputs,
+        # so only the newest completed run with a hash can mark a plan unchanged.
+        latest_hash = (
+            OptimizationRun.objects.filter(plan=OuterRef("pk"), status=OptimizationRun.STATUS_COMPLETED)
+            .exclude(input_hash="")
+            .order_by("-created_at")
+            .values("input_hash")[:1]
+        )
+        plan_ids = list(TourPlan.objects.order_by("id").values_list("id", flat=True))
+        batch_size = max(1, options["batch_size"])
+
+        started = time.perf_counter()
+        durations = []
+        skipped = 0
+        failed = 0
+        created = 0
+
+        def new_pool():
+            return ProcessPoolExecutor(max_workers=max(1, options["workers"]), initializer=django.setup)
+
+        pool = new_pool()
+        try:
+            for offset in range(0, len(plan_ids), batch_size):
+                plans = list(
+                    TourPlan.objects.filter(id__in=plan_ids[offset:offset + batch_size])
+                    .annotate(last_input_hash=Subquery(latest_hash))
+                    .select_related("artist")
+                )
+                prepared = load_plan_batch(plans)
+
+                jobs = []
+                for plan in plans:
+                    data, inputs, error = prepared[plan.id]
+                    if error:
+                        failed += 1
+                        self.stderr.write(f"Plan {plan.id} skipped: {error}")
+                        continue
+                    if not options["all"] and plan.last_input_hash == plan_input_hash(plan, data, inputs):
+                        skipped += 1
+                        continue
+                    jobs.append((plan, data, inputs))
+
+                # Workers only run the DB-free solver; runs are saved here in bulk.
+                futures = [(plan, pool.submit(timed_solve, plan, data, inputs)) for plan, data, inputs in jobs]
+
+                new_runs = []
+                broken = False
+                for plan, future in futures:
+                    # A plan that raises (or a worker that dies) is counted as failed;
+                    # the runs already solved in this batch are still saved.
+                    try:
+                        event, payload, artefacts, seconds = future.result()
+                    except Exception as exc:
+                        broken = broken or isinstance(exc, BrokenProcessPool)
+                        failed += 1
+                        self.stderr.write(f"Plan {plan.id} failed: {exc!r}")
+                        continue
+                    durations.append(seconds)
+                    if event != "result":
+                        failed += 1
+                        self.stderr.write(f"Plan {plan.id} failed: {payload}")
+                        continue
+                    inputs = prepared[plan.id][1]
+                    inputs["artefacts"] = artefacts
+                    new_runs.append((plan, payload, inputs))
+                save_plan_runs(new_runs)
+                created += len(new_runs)
+
+                if broken:
+                    # A dead worker breaks the whole pool; the next batch gets a fresh one.
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = new_pool()
+        finally:
+            pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        durations.sort()
+        throughput = len(durations) / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Precomputed: runs={created}, unchanged={skipped}, failed={failed}, "
+            f"elapsed={elapsed:.2f}s, plans/sec={throughput:.2f}, "
+            f"p50={percentile(durations, 50) * 1000:.1f}ms, p95={percentile(durations, 95) * 1000:.1f}ms"
+        ))
@@ -0,0 +1,89 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from tours.models import OptimizationRun, OptimizationRunInput
+
+
+def reclaimable_bytes(run_ids):
+    """
+    On Postgres, the on-disk size of the runs and their input rows
+    (pg_column_size, so TOASTed results count as stored). Elsewhere, the
+    length of the stored result text.
+    """
+    placeholders = ", ".join(["%s"] * len(run_ids))
+    runs, inputs = OptimizationRun._meta.db_table, OptimizationRunInput._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = (
+            f"SELECT (SELECT COALESCE(SUM(pg_column_size(r.*)), 0) FROM {runs} r WHERE r.id IN ({placeholders}))"
+            f" + (SELECT COALESCE(SUM(pg_column_size(i.*)), 0) FROM {inputs} i WHERE i.run_id IN ({placeholders}))"
+        )
+        params = [*run_ids, *run_ids]
+    else:
+        sql = f"SELECT COALESCE(SUM(LENGTH(result)), 0) FROM {runs} WHERE id IN ({placeholders})"
+        params = run_ids
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return int(cursor.fetchone()[0] or 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete optimization runs beyond the newest --keep per plan. Confirmed runs and runs still "
+        "pending or running are always kept. Deletes in short batches so locks stay brief."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", type=int, default=None, help="Newest runs kept per plan (default OPTIMIZATION_RUNS_KEEP_PER_PLAN).")
+        parser.add_argument("--batch-size", type=int, default=500, help="Runs deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting.")
+
+    def handle(self, *args, **options):
+        keep = settings.OPTIMIZATION_RUNS_KEEP_PER_PLAN if options["keep"] is None else options["keep"]
+        keep = max(0, keep)
+        batch_size = max(1, options["batch_size"])
+
+        started = time.perf_counter()
+        ranked = OptimizationRun.objects.annotate(
+            rank=Window(RowNumber(), partition_by=[F("plan_id")], order_by=[F("created_at").desc(), F("id").desc()]),
+        ).filter(rank__gt=keep).values("id")
+        # Rank once up front; the batches below then delete by primary key
+        # instead of re-running the window over the whole table each time.
+        expired_ids = list(
+            OptimizationRun.objects.filter(id__in=ranked, confirmed_at__isnull=True)
+            .exclude(status__in=[OptimizationRun.STATUS_PENDING, OptimizationRun.STATUS_RUNNING])
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+        totals = {"runs": 0, "inputs": 0, "bytes": 0}
+        for offset in range(0, len(expired_ids), batch_size):
+            ids = expired_ids[offset:offset + batch_size]
+            totals["bytes"] += reclaimable_bytes(ids)
+            if options["dry_run"]:
+                totals["runs"] += len(ids)
+                totals["inputs"] += OptimizationRunInput.objects.filter(run_id__in=ids).count()
+                continue
+            # One short transaction per batch; inputs go in a single cascaded DELETE.
+            # The keep rules are re-checked so a run confirmed since the ranking stays.
+            with transaction.atomic():
+                _count, per_model = (
+                    OptimizationRun.objects.filter(id__in=ids, confirmed_at__isnull=True)
+                    .exclude(status__in=[OptimizationRun.STATUS_PENDING, OptimizationRun.STATUS_RUNNING])
+                    .delete()
+                )
+            totals["runs"] += per_model.get(OptimizationRun._meta.label, 0)
+            totals["inputs"] += per_model.get(OptimizationRunInput._meta.label, 0)
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'would delete' if options['dry_run'] else 'deleted'} runs={totals['runs']} inputs={totals['inputs']} "
+            f"bytes={totals['bytes']} keep={keep} elapsed={elapsed:.2f}s"
+        ))
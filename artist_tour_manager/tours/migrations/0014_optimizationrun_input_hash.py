@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0013_venue_default_ticket_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='input_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
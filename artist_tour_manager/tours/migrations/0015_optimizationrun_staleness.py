@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0014_optimizationrun_input_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='is_stale',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='OptimizationRunInput',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_revenue', models.FloatField(default=0)),
+                ('expected_attendance', models.FloatField(default=0)),
+                ('revenue_multiplier', models.FloatField(default=1)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('is_stale', models.BooleanField(default=False)),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tours.artist')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inputs', to='tours.optimizationrun')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tours.venue')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['artist', 'venue'], name='tours_optim_artist__db1677_idx')],
+                'unique_together': {('run', 'venue')},
+            },
+        ),
+    ]
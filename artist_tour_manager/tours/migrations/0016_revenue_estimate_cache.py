@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0015_optimizationrun_staleness'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fandemand',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.CreateModel(
+            name='RevenueEstimate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('demand_version', models.PositiveIntegerField()),
+                ('venue_version', models.PositiveIntegerField()),
+                ('fallback_price', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('revenue', models.FloatField()),
+                ('attendance', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_estimates', to='tours.artist')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_estimates', to='tours.venue')),
+            ],
+            options={
+                'unique_together': {('artist', 'venue')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0016_revenue_estimate_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='refines',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refinements', to='tours.optimizationrun'),
+        ),
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=16),
+        ),
+    ]
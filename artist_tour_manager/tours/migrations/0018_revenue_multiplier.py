@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0017_optimizationrun_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueMultiplier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('multiplier', models.FloatField()),
+                ('model', models.CharField(blank=True, max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_multipliers', to='tours.artist')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_multipliers', to='tours.venue')),
+            ],
+            options={
+                'unique_together': {('artist', 'venue')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def delete_duplicate_fan_demands(apps, schema_editor):
+    # Concurrent optimizations could insert the same (artist, venue) row twice;
+    # keep the oldest so the unique constraint can be added.
+    FanDemand = apps.get_model('tours', 'FanDemand')
+    duplicates = (
+        FanDemand.objects.values('artist_id', 'venue_id')
+        .annotate(rows=Count('id'), keep_id=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        FanDemand.objects.filter(artist_id=row['artist_id'], venue_id=row['venue_id']).exclude(id=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0018_revenue_multiplier'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_fan_demands, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='fandemand',
+            unique_together={('artist', 'venue')},
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:36
+
+from django.db import migrations, models
+
+SUMMARY_FIELDS = ['optimized_distance_km', 'estimated_revenue', 'estimated_roi', 'venue_count', 'selection_strategy', 'warnings']
+
+
+def backfill_run_summaries(apps, schema_editor):
+    OptimizationRun = apps.get_model('tours', 'OptimizationRun')
+    batch = []
+    for run in OptimizationRun.objects.only('id', 'result').iterator(chunk_size=500):
+        result = run.result or {}
+        metrics = result.get('metrics') or {}
+        run.optimized_distance_km = metrics.get('optimized_distance_km')
+        run.estimated_revenue = metrics.get('estimated_revenue')
+        run.estimated_roi = metrics.get('estimated_roi')
+        run.venue_count = len(result.get('selected_venue_ids') or [])
+        run.selection_strategy = result.get('selection_strategy') or ''
+        run.warnings = result.get('warnings') or []
+        batch.append(run)
+        if len(batch) >= 500:
+            OptimizationRun.objects.bulk_update(batch, SUMMARY_FIELDS)
+            batch = []
+    if batch:
+        OptimizationRun.objects.bulk_update(batch, SUMMARY_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0020_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='estimated_revenue',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='estimated_roi',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='optimized_distance_km',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='selection_strategy',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='venue_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='warnings',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddIndex(
+            model_name='optimizationrun',
+            index=models.Index(fields=['plan', '-created_at'], name='tours_optim_plan_id_4276d8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='optimizationrun',
+            index=models.Index(fields=['plan', 'estimated_revenue'], name='tours_optim_plan_id_017473_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='optimizationrun',
+            index=models.Index(fields=['plan', 'estimated_roi'], name='tours_optim_plan_id_387dce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='optimizationrun',
+            index=models.Index(fields=['plan', 'optimized_distance_km'], name='tours_optim_plan_id_aae9f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='optimizationrun',
+            index=models.Index(fields=['selection_strategy'], name='tours_optim_selecti_d8c6d0_idx'),
+        ),
+        migrations.RunPython(backfill_run_summaries, migrations.RunPython.noop),
+    ]
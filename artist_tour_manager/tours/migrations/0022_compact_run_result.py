@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:39
+
+import tours.run_results
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0021_optimization_run_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='optimizationrun',
+            name='result',
+            field=tours.run_results.CompactResultField(default=dict),
+        ),
+    ]
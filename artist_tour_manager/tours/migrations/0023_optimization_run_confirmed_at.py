@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0022_compact_run_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='confirmed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0023_optimization_run_confirmed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revenueestimate',
+            name='demand',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revenue_estimates', to='tours.fandemand'),
+        ),
+    ]
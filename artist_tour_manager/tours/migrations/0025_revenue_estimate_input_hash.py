@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0024_revenue_estimate_demand'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='fandemand',
+            name='version',
+        ),
+        migrations.RemoveField(
+            model_name='venue',
+            name='version',
+        ),
+        migrations.RemoveField(
+            model_name='revenueestimate',
+            name='demand_version',
+        ),
+        migrations.RemoveField(
+            model_name='revenueestimate',
+            name='venue_version',
+        ),
+        migrations.RemoveField(
+            model_name='revenueestimate',
+            name='fallback_price',
+        ),
+        # Existing estimates get an empty hash, so they are recomputed on first use.
+        migrations.AddField(
+            model_name='revenueestimate',
+            name='input_hash',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+    ]
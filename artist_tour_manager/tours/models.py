@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .run_results import CompactResultField
 
 # This file defines the models for the Artist Tour Management application.
+
 class Artist(models.Model):
     name = models.CharField(max_length=100, unique=True)
     genre = models.CharField(max_length=100)
@@ -70,9 +74,41 @@ class FanDemand(models.Model):
     engagement_score = models.DecimalField(max_digits=5, decimal_places=4, default=0.1000)
     expected_ticket_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
 
+    class Meta:
+        unique_together = [['artist', 'venue']]
+
     def __str__(self):
         return f"{self.artist.name} @ {self.venue.name} fans"
 
+
+class RevenueEstimate(models.Model):
+    # Precomputed revenue/attendance per (artist, venue); valid while input_hash
+    # (revenue_input_hash: the FanDemand row and its values, the venue capacity
+    # and price, and the artist's fallback price) still matches. Hashing the
+    # values rather than counting saves also catches QuerySet.update() writes.
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name="revenue_estimates")
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name="revenue_estimates")
+    demand = models.ForeignKey(FanDemand, on_delete=models.CASCADE, null=True, blank=True, related_name="revenue_estimates")
+    input_hash = models.CharField(max_length=64)
+    revenue = models.FloatField()
+    attendance = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [['artist', 'venue']]
+
+class RevenueMultiplier(models.Model):
+    # AI revenue adjustment per (artist, venue), computed in bulk by the
+    # adjust_revenue_batch command so interactive runs never wait on the model.
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name="revenue_multipliers")
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name="revenue_multipliers")
+    multiplier = models.FloatField()
+    model = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [['artist', 'venue']]
+
 class TourPlan(models.Model):
     artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name="plans")
     name = models.CharField(max_length=150)
@@ -94,6 +130,83 @@ class TourPlan(models.Model):
 
 
 class OptimizationRun(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
     plan = models.ForeignKey(TourPlan, on_delete=models.CASCADE, related_name="runs")
-    result = models.JSONField(default=dict)
+    # Stored compacted (and compressed when large); reads return the full result.
+    result = CompactResultField(default=dict)
+    input_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    is_stale = models.BooleanField(default=False)
+    # Deferred AI runs start out pending and point at the heuristic run they refine.
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_COMPLETED)
+    refines = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True, related_name="refinements")
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the run's schedule is committed to TourDate rows; retention never prunes these.
+    confirmed_at = models.DateTimeField(null=True, blank=True)
+    # Summary copied out of `result` when the run is saved, so listings can skip the blob.
+    SUMMARY_FIELDS = ["optimized_distance_km", "estimated_revenue", "estimated_roi", "venue_count", "selection_strategy", "warnings"]
+    optimized_distance_km = models.FloatField(null=True, blank=True)
+    estimated_revenue = models.FloatField(null=True, blank=True)
+    estimated_roi = models.FloatField(null=True, blank=True)
+    venue_count = models.PositiveIntegerField(default=0)
+    selection_strategy = models.CharField(max_length=16, blank=True)
+    warnings = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["plan", "-created_at"]),
+            models.Index(fields=["plan", "estimated_revenue"]),
+            models.Index(fields=["plan", "estimated_roi"]),
+            models.Index(fields=["plan", "optimized_distance_km"]),
+            models.Index(fields=["selection_strategy"]),
+        ]
+
+
+class OptimizationRunInput(models.Model):
+    # Dependency index: one row per (artist, venue) a run used, with the per-venue
+    # artefacts needed to refresh the run without recomputing unchanged venues.
+    run = models.ForeignKey(OptimizationRun, on_delete=models.CASCADE, related_name="inputs")
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE)
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE)
+    base_revenue = models.FloatField(default=0)
+    expected_attendance = models.FloatField(default=0)
+    revenue_multiplier = models.FloatField(default=1)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    is_stale = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = [['run', 'venue']]
+        indexes = [models.Index(fields=['artist', 'venue'])]
+
+
+class IdempotencyKey(models.Model):
+    # Stored response for a POST sent with an Idempotency-Key header, so a retry
+    # replays it instead of running the work again. Rows expire after a TTL.
+    STATUS_IN_PROGRESS = "in_progress"
+    STATUS_COMPLETED = "completed"
+    STATUS_CHOICES = [
+        (STATUS_IN_PROGRESS, "In progress"),
+        (STATUS_COMPLETED, "Completed"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_IN_PROGRESS)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
     created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = [['user', 'key']]
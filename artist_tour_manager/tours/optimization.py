@@ -1,16 +1,58 @@
+import heapq
 import json
 import math
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import timedelta
 from decimal import Decimal
+from http.client import HTTPException
 from pathlib import Path
-from urllib import request
-from urllib.error import HTTPError, URLError
 from decouple import config
+from django.conf import settings
+
+from .ai_cache import ResponseCache
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .http_pool import ConnectionPool, HTTPStatusError
 
 
 PLACEHOLDER_API_KEYS = {"YOUR_NEW_KEY", "sk-...", "change-me"}
 
+# Identical prompts (same venue set, same model) are answered from disk instead of OpenAI.
+response_cache = ResponseCache(
+    settings.OPENAI_CACHE_PATH or None,
+    ttl_seconds=config('OPENAI_CACHE_TTL_SECONDS', default=7 * 24 * 3600, cast=int),
+    max_entries=config('OPENAI_CACHE_MAX_ENTRIES', default=2000, cast=int),
+)
+
+# Point at `manage.py fake_openai_server` to run the AI paths offline.
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='https://api.openai.com/v1')
+OPENAI_MAX_CONCURRENCY = config('OPENAI_MAX_CONCURRENCY', default=8, cast=int)
+
+# Revenue adjustment and venue selection are sent together; the AI stage waits
+# at most this long for both before falling back to the heuristic results.
+AI_STAGE_DEADLINE_SECONDS = config('OPENAI_STAGE_DEADLINE_SECONDS', default=20.0, cast=float)
+
+# Venue selection prompts list at most this many candidates (shortlisted per
+# geographic grid cell of this many degrees).
+AI_SELECTION_SHORTLIST = config('OPENAI_SELECTION_SHORTLIST', default=60, cast=int)
+AI_SELECTION_CLUSTER_DEGREES = config('OPENAI_SELECTION_CLUSTER_DEGREES', default=5.0, cast=float)
+
+# The "diverse" local selector treats a region as served in proportion to
+# exp(-distance / radius) from its nearest picked venue.
+DIVERSE_SELECTION_RADIUS_KM = config('DIVERSE_SELECTION_RADIUS_KM', default=400.0, cast=float)
+
+# Batch revenue adjustment packs (artist, venue) rows into prompts of at most this many characters.
+AI_BATCH_PROMPT_CHARS = config('OPENAI_BATCH_PROMPT_CHARS', default=24000, cast=int)
+
+# Transient failures (429, 5xx, timeouts) are retried with jittered backoff within
+# each call's time budget; repeated failures open the breaker for a cool-down.
+OPENAI_MAX_RETRIES = config('OPENAI_MAX_RETRIES', default=2, cast=int)
+OPENAI_RETRY_BACKOFF_SECONDS = config('OPENAI_RETRY_BACKOFF_SECONDS', default=0.5, cast=float)
+OPENAI_BREAKER_FAILURES = config('OPENAI_BREAKER_FAILURES', default=5, cast=int)
+OPENAI_BREAKER_COOLDOWN_SECONDS = config('OPENAI_BREAKER_COOLDOWN_SECONDS', default=30.0, cast=float)
+
 
 def local_env_value(name):
     env_path = Path(__file__).resolve().parents[1] / ".env"
@@ -34,6 +76,31 @@ def openai_config(name, default=None):
     return value
 
 
+def load_openai_settings():
+    return {
+        'api_key': openai_config('OPENAI_API_KEY', default=os.getenv('OPENAI_API_KEY')),
+        'model': openai_config('OPENAI_MODEL', default=os.getenv('OPENAI_MODEL', 'gpt-4o-mini')),
+        'timeout': config('OPENAI_TIMEOUT_SECONDS', default=20.0, cast=float),
+    }
+
+
+# Resolved once per process; the .env file is not re-read on every AI call.
+openai_settings = load_openai_settings()
+
+
+def start_openai_clients():
+    # Worker threads, pooled sockets and locks do not survive fork(), so forked
+    # processes (precompute_plan_runs workers) get their own.
+    global ai_executor, openai_pool, openai_breaker
+    openai_breaker = CircuitBreaker('openai', OPENAI_BREAKER_FAILURES, OPENAI_BREAKER_COOLDOWN_SECONDS)
+    ai_executor = ThreadPoolExecutor(max_workers=OPENAI_MAX_CONCURRENCY, thread_name_prefix='openai')
+    openai_pool = ConnectionPool(OPENAI_BASE_URL, max_connections=OPENAI_MAX_CONCURRENCY, timeout=openai_settings['timeout'])
+
+
+start_openai_clients()
+os.register_at_fork(after_in_child=start_openai_clients)
+
+
 def haversine_km(lat1, lon1, lat2, lon2):
     if None in (lat1, lon1, lat2, lon2):
         return None
@@ -82,7 +149,8 @@ def nearest_neighbor_route(venue_ids, venues_by_id, start_id=None):
     return route
 
 
-def two_opt(route, venues_by_id):
+def iter_two_opt(route, venues_by_id):
+    # Yields every improved route as it is found; the last one is the local optimum.
     best = route[:]
     improved = True
     while improved:
@@ -94,8 +162,15 @@ def two_opt(route, venues_by_id):
                 if total_distance_km(new_route, venues_by_id) < total_distance_km(best, venues_by_id):
                     best = new_route
                     improved = True
+                    yield best
         if not improved:
             break
+
+
+def two_opt(route, venues_by_id):
+    best = route[:]
+    for best in iter_two_opt(route, venues_by_id):
+        pass
     return best
 
 
@@ -167,52 +242,278 @@ def select_venue_subset(venue_ids, venues_by_id, revenue_by_venue, max_venues, s
     return ordered
 
 
-def ai_select_venues(venue_ids, venues_by_id, revenue_by_venue, max_venues, start_city=None, start_venue_id=None):
+def select_diverse_venues(venue_ids, venues_by_id, revenue_by_venue, max_venues, start_venue_id=None, start_city=None,
+                          radius_km=None):
+    """
+    Revenue-weighted facility-location greedy. Candidates are grouped into the
+    lat/lon grid used by geo_clusters; each region counts as served by exp(-distance / radius_km)
+    to its nearest pick, and a venue is worth its own revenue plus the extra
+    service it adds to every region, weighted by that region's revenue. The
+    objective is submodular, so lazy greedy only re-scores a handful of venues
+    per pick; regions beyond 3 * radius_km are ignored. Returns (venue_ids,
+    rationale) with venue_ids in input order.
+    """
     if not max_venues or len(venue_ids) <= max_venues:
-        return None
+        return venue_ids, None
+    radius_km = radius_km or DIVERSE_SELECTION_RADIUS_KM
+    cutoff_km = 3 * radius_km
+    cell_degrees = AI_SELECTION_CLUSTER_DEGREES
 
-    venues_payload = []
+    def cell_of(lat, lon):
+        return math.floor(lat / cell_degrees), math.floor(lon / cell_degrees)
+
+    points = {}
+    totals = {}
     for vid in venue_ids:
-        v = venues_by_id.get(vid)
-        if not v:
+        v = venues_by_id[vid]
+        if v.latitude is None or v.longitude is None:
             continue
-        venues_payload.append({
-            "venue_id": vid,
-            "name": v.name,
-            "city": v.city,
-            "latitude": float(v.latitude) if v.latitude is not None else None,
-            "longitude": float(v.longitude) if v.longitude is not None else None,
-            "operating_cost": float(v.operating_cost or 0),
-            "capacity": int(v.capacity or 0),
-            "estimated_revenue": float(revenue_by_venue.get(vid, 0)),
-        })
+        lat, lon = points[vid] = (float(v.latitude), float(v.longitude))
+        lat_sum, lon_sum, count, weight = totals.get(cell_of(lat, lon), (0.0, 0.0, 0, 0.0))
+        totals[cell_of(lat, lon)] = (lat_sum + lat, lon_sum + lon, count + 1, weight + float(revenue_by_venue.get(vid, 0)))
+    region_index = {key: index for index, key in enumerate(totals)}
+    regions = [(lat_sum / count, lon_sum / count, weight) for lat_sum, lon_sum, count, weight in totals.values()]
+    region_radians = [(math.radians(lat), math.radians(lon)) for lat, lon, _weight in regions]
+    served = [0.0] * len(regions)
+
+    lon_cells = math.ceil(360 / cell_degrees)
+    lon_origin = math.floor(-180 / cell_degrees)
+    lat_reach = math.ceil(cutoff_km / (111.0 * cell_degrees)) + 1
+    neighbour_cache = {}
+
+    def neighbours(cell):
+        # Regions whose centroid can lie within cutoff_km of some point in `cell`, plus their total weight.
+        if cell not in neighbour_cache:
+            edge_lat = min(89.0, (abs(cell[0]) + 1 + lat_reach) * cell_degrees)
+            lon_reach = min(lon_cells // 2, math.ceil(cutoff_km / (111.0 * cell_degrees * math.cos(math.radians(edge_lat)))) + 1)
+            found = []
+            for dlat in range(-lat_reach, lat_reach + 1):
+                for dlon in range(-lon_reach, lon_reach + 1):
+                    key = (cell[0] + dlat, (cell[1] + dlon - lon_origin) % lon_cells + lon_origin)
+                    if key in region_index:
+                        found.append(region_index[key])
+            found = sorted(set(found))
+            neighbour_cache[cell] = (found, sum(regions[index][2] for index in found))
+        return neighbour_cache[cell]
+
+    similarity_cache = {}
+
+    def similarity(vid):
+        # [(region index, exp(-distance / radius))] for regions within cutoff_km. An equirectangular
+        # distance is accurate enough at this scale and far cheaper than haversine_km.
+        if vid not in similarity_cache:
+            near = []
+            if vid in points:
+                lat, lon = map(math.radians, points[vid])
+                cos_lat = math.cos(lat)
+                for index in neighbours(cell_of(*points[vid]))[0]:
+                    region_lat, region_lon = region_radians[index]
+                    dlon = abs(lon - region_lon)
+                    if dlon > math.pi:
+                        dlon = 2 * math.pi - dlon
+                    distance = 6371.0 * math.hypot(dlon * cos_lat, lat - region_lat)
+                    if distance <= cutoff_km:
+                        near.append((index, math.exp(-distance / radius_km)))
+            similarity_cache[vid] = near
+        return similarity_cache[vid]
+
+    def gain(vid):
+        extra = sum(regions[index][2] * (sim - served[index]) for index, sim in similarity(vid) if sim > served[index])
+        return float(revenue_by_venue.get(vid, 0)) + extra
+
+    def upper_bound(vid):
+        # Revenue plus every nearby region fully served; cheap, and never below the real gain.
+        reach = neighbours(cell_of(*points[vid]))[1] if vid in points else 0.0
+        return float(revenue_by_venue.get(vid, 0)) + reach
+
+    selected = []
+
+    def pick(vid):
+        selected.append(vid)
+        for index, sim in similarity(vid):
+            if sim > served[index]:
+                served[index] = sim
+
+    if start_venue_id and start_venue_id in venue_ids:
+        pick(start_venue_id)
+    if start_city:
+        city_matches = [
+            vid for vid in venue_ids
+            if venues_by_id.get(vid) and venues_by_id[vid].city and venues_by_id[vid].city.lower().startswith(start_city.lower())
+        ]
+        if city_matches:
+            best_city = max(city_matches, key=lambda vid: revenue_by_venue.get(vid, 0))
+            if best_city not in selected:
+                pick(best_city)
+
+    # Heap entries are (-gain upper bound, input position, venue id); gains only shrink as regions
+    # get served, so an entry scored since the last pick is exact and can be taken as is.
+    chosen = set(selected)
+    heap = [(-upper_bound(vid), index, vid) for index, vid in enumerate(venue_ids) if vid not in chosen]
+    heapq.heapify(heap)
+    scored_at = {}
+    while heap and len(selected) < max_venues:
+        _bound, index, vid = heapq.heappop(heap)
+        if scored_at.get(vid) == len(selected):
+            pick(vid)
+            continue
+        scored_at[vid] = len(selected)
+        current = gain(vid)
+        if heap and current < -heap[0][0]:
+            heapq.heappush(heap, (-current, index, vid))
+            continue
+        pick(vid)
+
+    total_weight = sum(weight for _lat, _lon, weight in regions) or 1.0
+    near = [level >= math.exp(-1) for level in served]
+    covered_revenue = sum(weight for (_lat, _lon, weight), is_near in zip(regions, near) if is_near)
+    total_revenue = sum(float(revenue_by_venue.get(vid, 0)) for vid in venue_ids) or 1.0
+    picked_revenue = sum(float(revenue_by_venue.get(vid, 0)) for vid in selected)
+    rationale = (
+        f"Picked {len(selected)} of {len(venue_ids)} venues for revenue and geographic spread: "
+        f"{sum(near)} of {len(regions)} regions have a pick within {radius_km:g} km "
+        f"({round(100 * covered_revenue / total_weight)}% of candidate revenue), "
+        f"and the picks hold {round(100 * picked_revenue / total_revenue)}% of candidate revenue."
+    )
+    chosen = set(selected)
+    return [vid for vid in venue_ids if vid in chosen], rationale
+
+
+def select_local_venues(strategy, venue_ids, venues_by_id, revenue_by_venue, max_venues, start_venue_id=None, start_city=None):
+    """Subset selection without AI. Returns (venue_ids, selection_strategy, rationale)."""
+    if strategy == 'diverse':
+        selected, rationale = select_diverse_venues(
+            venue_ids, venues_by_id, revenue_by_venue, max_venues, start_venue_id, start_city
+        )
+        return selected, 'diverse', rationale
+    return select_venue_subset(venue_ids, venues_by_id, revenue_by_venue, max_venues, start_venue_id, start_city), 'heuristic', None
+
+def geo_clusters(venue_ids, venues_by_id, revenue_by_venue, cell_degrees=None):
+    """Group venues into lat/lon grid cells; clusters and their members are ordered by revenue."""
+    cell_degrees = cell_degrees or AI_SELECTION_CLUSTER_DEGREES
+    cells = {}
+    for vid in venue_ids:
+        v = venues_by_id[vid]
+        if v.latitude is None or v.longitude is None:
+            key = None
+        else:
+            key = (math.floor(float(v.latitude) / cell_degrees), math.floor(float(v.longitude) / cell_degrees))
+        cells.setdefault(key, []).append(vid)
+    clusters = [
+        sorted(members, key=lambda vid: revenue_by_venue.get(vid, 0), reverse=True)
+        for members in cells.values()
+    ]
+    clusters.sort(key=lambda members: sum(revenue_by_venue.get(vid, 0) for vid in members), reverse=True)
+    return clusters
+
+
+def shortlist_clusters(clusters, size, start_venue_id=None):
+    # Round-robin over clusters, best revenue first, so the shortlist keeps every region.
+    keep = set()
+    if start_venue_id and any(start_venue_id in members for members in clusters):
+        keep.add(start_venue_id)
+    depth = 0
+    while len(keep) < size and any(depth < len(members) for members in clusters):
+        for members in clusters:
+            if len(keep) >= size:
+                break
+            if depth < len(members):
+                keep.add(members[depth])
+        depth += 1
+    trimmed = [[vid for vid in members if vid in keep] for members in clusters]
+    return [members for members in trimmed if members]
+
+
+def compact_number(value):
+    return f"{round(float(value or 0) / 1000, 1):g}"
+
+
+def build_selection_prompt(venue_ids, venues_by_id, revenue_by_venue, max_venues, start_city=None, start_venue_id=None):
+    """
+    Compact prompt for AI venue selection: candidates grouped into geographic
+    clusters, one pipe-separated row per venue with a short id and rounded
+    figures. Sets larger than the shortlist size are first cut down per cluster
+    by revenue. Returns (system_prompt, user_prompt, venue_id_by_short_id, stats).
+    """
+    started = time.perf_counter()
+    candidates = [vid for vid in venue_ids if vid in venues_by_id]
+    clusters = geo_clusters(candidates, venues_by_id, revenue_by_venue)
+    shortlist_size = max(AI_SELECTION_SHORTLIST, 2 * max_venues)
+    if len(candidates) > shortlist_size:
+        clusters = shortlist_clusters(clusters, shortlist_size, start_venue_id)
+
+    venue_id_by_short_id = {}
+    start_short_id = None
+    lines = []
+    for index, members in enumerate(clusters, 1):
+        located = [venues_by_id[vid] for vid in members if venues_by_id[vid].latitude is not None]
+        if located:
+            lat = sum(float(v.latitude) for v in located) / len(located)
+            lon = sum(float(v.longitude) for v in located) / len(located)
+            lines.append(f"[C{index} {lat:.1f},{lon:.1f}]")
+        else:
+            lines.append(f"[C{index} no coordinates]")
+        for vid in members:
+            v = venues_by_id[vid]
+            short_id = len(venue_id_by_short_id) + 1
+            venue_id_by_short_id[short_id] = vid
+            if vid == start_venue_id:
+                start_short_id = short_id
+            lines.append("|".join([
+                str(short_id),
+                (v.city or "").replace("|", "/"),
+                f"{float(v.latitude):.1f}" if v.latitude is not None else "",
+                f"{float(v.longitude):.1f}" if v.longitude is not None else "",
+                compact_number(revenue_by_venue.get(vid, 0)),
+                compact_number(v.capacity),
+                compact_number(v.operating_cost),
+            ]))
 
     system_prompt = (
-        "You are a tour routing expert. Select exactly max_venues venues from the list. "
-        "Spread selections across multiple cities and countries to create a geographically diverse tour. "
-        "Do NOT cluster all venues in one city. Balance revenue with travel efficiency across regions. "
-        "You MUST return valid JSON with exactly two keys: venue_ids (array of exactly max_venues ints) and rationale (string). "
-        "Return JSON only, no markdown."
+        "You are a tour routing expert. Candidates are grouped into geographic clusters, "
+        "each headed [C<n> lat,lon]. Select exactly max_venues venues. "
+        "Spread selections across clusters, cities and countries to create a geographically diverse tour. "
+        "Balance revenue with travel efficiency. Include the start venue if given. "
+        "You MUST return valid JSON with exactly two keys: venue_ids (array of exactly max_venues ids from the id column) "
+        "and rationale (string). Return JSON only, no markdown."
     )
     user_prompt = (
-        f"Select EXACTLY {max_venues} venues from the list below. "
-        f"You must return exactly {max_venues} venue_ids — not fewer. "
-        "Spread picks across different cities/countries. Include the start venue if provided. "
-        "Return JSON: {\"venue_ids\": [..], \"rationale\": \"...\"}."
-        f"\nmax_venues: {max_venues}"
-        f"\nstart_city: {start_city}"
-        f"\nstart_venue_id: {start_venue_id}"
-        f"\nVenues: {json.dumps(venues_payload)}"
+        f"max_venues: {max_venues}"
+        f"\nstart_city: {start_city or '-'}"
+        f"\nstart_id: {start_short_id or '-'}"
+        "\ncolumns: id|city|lat|lon|revenue_k|capacity_k|cost_k (k = thousands)\n"
+        + "\n".join(lines)
     )
+    stats = {
+        "candidates": len(candidates),
+        "sent": len(venue_id_by_short_id),
+        "clusters": len(clusters),
+        "prompt_chars": len(system_prompt) + len(user_prompt),
+        "build_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    return system_prompt, user_prompt, venue_id_by_short_id, stats
+
+
+def ai_select_venues(venue_ids, venues_by_id, revenue_by_venue, max_venues, start_city=None, start_venue_id=None, timeout=None):
+    if not max_venues or len(venue_ids) <= max_venues:
+        return None
 
+    system_prompt, user_prompt, venue_id_by_short_id, prompt_stats = build_selection_prompt(
+        venue_ids, venues_by_id, revenue_by_venue, max_venues, start_city, start_venue_id
+    )
+    selection = request_ai_selection(
+        system_prompt, user_prompt, venue_id_by_short_id, venue_ids, max_venues, start_venue_id, timeout
+    )
+    if selection is not None:
+        selection["prompt_stats"] = prompt_stats
+    return selection
+
+
+def request_ai_selection(system_prompt, user_prompt, venue_id_by_short_id, venue_ids, max_venues, start_venue_id, timeout):
     try:
-        result = call_openai_json(system_prompt, user_prompt)
-    except HTTPError as exc:
-        error_detail = None
-        try:
-            error_detail = exc.read().decode('utf-8')
-        except Exception:
-            error_detail = None
+        result, cache_hit = cached_call_openai_json(system_prompt, user_prompt, timeout=timeout)
+    except HTTPStatusError as exc:
+        error_detail = exc.body
         if exc.code == 429:
             rationale = "AI selection rate-limited; used heuristic selection."
         elif exc.code == 401:
@@ -225,7 +526,14 @@ def ai_select_venues(venue_ids, venues_by_id, revenue_by_venue, max_venues, star
             "error": f"HTTP {exc.code}",
             "error_detail": error_detail or f"HTTP {exc.code}",
         }
-    except URLError as exc:
+    except CircuitOpenError as exc:
+        return {
+            "venue_ids": None,
+            "rationale": "AI selection paused after repeated failures; used heuristic selection.",
+            "error": "circuit-open",
+            "error_detail": str(exc),
+        }
+    except (OSError, HTTPException) as exc:
         return {
             "venue_ids": None,
             "rationale": "AI selection unavailable; used heuristic selection.",
@@ -254,14 +562,14 @@ def ai_select_venues(venue_ids, venues_by_id, revenue_by_venue, max_venues, star
 
     cleaned = []
     seen = set()
-    for vid in ids:
+    for short_id in ids:
         try:
-            vid_int = int(vid)
+            vid = venue_id_by_short_id.get(int(short_id))
         except (TypeError, ValueError):
             continue
-        if vid_int in venue_ids and vid_int not in seen:
-            cleaned.append(vid_int)
-            seen.add(vid_int)
+        if vid is not None and vid not in seen:
+            cleaned.append(vid)
+            seen.add(vid)
 
     if start_venue_id and start_venue_id in venue_ids and start_venue_id not in seen:
         cleaned.insert(0, start_venue_id)
@@ -287,6 +595,7 @@ def ai_select_venues(venue_ids, venues_by_id, revenue_by_venue, max_venues, star
     return {
         "venue_ids": ordered,
         "rationale": rationale,
+        "cache_hit": cache_hit,
     }
 
 
@@ -329,13 +638,78 @@ def filter_venues_by_region(venues, region_filters):
     return filtered, excluded
 
 
-def call_openai_json(system_prompt, user_prompt):
-    api_key = openai_config('OPENAI_API_KEY', default=os.getenv('OPENAI_API_KEY'))
+def openai_model():
+    return openai_settings['model']
+
+
+def cached_call_openai_json(system_prompt, user_prompt, timeout=None):
+    """call_openai_json behind the persistent response cache; returns (result, cache_hit)."""
+    key = response_cache.key(openai_model(), system_prompt, user_prompt)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached, True
+    result = call_openai_json(system_prompt, user_prompt, timeout=timeout)
+    if result:
+        response_cache.set(key, result)
+    return result, False
+
+
+def is_retryable(exc):
+    if isinstance(exc, HTTPStatusError):
+        return exc.code == 429 or exc.code >= 500
+    return isinstance(exc, (OSError, HTTPException))
+
+
+def post_chat_completion(payload, api_key, timeout=None):
+    """
+    POST to chat completions through the circuit breaker. `timeout` is the budget
+    for the whole call, retries included; every failed attempt counts towards
+    opening the breaker, and an open breaker raises CircuitOpenError immediately.
+    """
+    budget = openai_settings['timeout'] if timeout is None else timeout
+    deadline = time.monotonic() + budget
+    attempt = 0
+    while True:
+        if not openai_breaker.allow():
+            raise CircuitOpenError('OpenAI circuit breaker is open')
+        try:
+            data = openai_pool.post_json(
+                '/chat/completions',
+                payload,
+                headers={'Authorization': f'Bearer {api_key}'},
+                timeout=max(deadline - time.monotonic(), 0.01),
+            )
+        except Exception as exc:
+            if not is_retryable(exc):
+                # OpenAI answered (e.g. 400/401); that is not an outage.
+                openai_breaker.record_success()
+                raise
+            openai_breaker.record_failure()
+            attempt += 1
+            backoff = random.uniform(0, OPENAI_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            if attempt > OPENAI_MAX_RETRIES or time.monotonic() + backoff >= deadline:
+                raise
+            time.sleep(backoff)
+            continue
+        openai_breaker.record_success()
+        return data
+
+
+def openai_status():
+    return {
+        'configured': bool(openai_settings['api_key']),
+        'model': openai_settings['model'],
+        'circuit_breaker': openai_breaker.snapshot(),
+    }
+
+
+def call_openai_json(system_prompt, user_prompt, timeout=None):
+    api_key = openai_settings['api_key']
     if not api_key:
         return None
 
     payload = {
-        'model': openai_config('OPENAI_MODEL', default=os.getenv('OPENAI_MODEL', 'gpt-4o-mini')),
+        'model': openai_model(),
         'messages': [
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': user_prompt},
@@ -343,18 +717,7 @@ def call_openai_json(system_prompt, user_prompt):
         'temperature': 0.2,
     }
 
-    req = request.Request(
-        'https://api.openai.com/v1/chat/completions',
-        data=json.dumps(payload).encode('utf-8'),
-        headers={
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {api_key}',
-        },
-        method='POST',
-    )
-
-    with request.urlopen(req, timeout=20) as resp:
-        data = json.loads(resp.read().decode('utf-8'))
+    data = post_chat_completion(payload, api_key, timeout=timeout)
 
     # Extract content from Chat Completions API response
     choices = data.get('choices', [])
@@ -367,7 +730,8 @@ def call_openai_json(system_prompt, user_prompt):
     return json.loads(output_text)
 
 
-def ai_adjust_revenue(revenue_by_venue, venues):
+def ai_adjust_revenue(revenue_by_venue, venues, meta=None, timeout=None):
+    # Pass a dict as `meta` to learn whether the answer came from the response cache.
     venues_payload = []
     for vid, revenue in revenue_by_venue.items():
         v = venues[vid]
@@ -390,7 +754,9 @@ def ai_adjust_revenue(revenue_by_venue, venues):
         f'\nVenues: {json.dumps(venues_payload)}'
     )
 
-    result = call_openai_json(system_prompt, user_prompt)
+    result, cache_hit = cached_call_openai_json(system_prompt, user_prompt, timeout=timeout)
+    if meta is not None:
+        meta['cache_hit'] = cache_hit
     if not result or 'venue_adjustments' not in result:
         return revenue_by_venue
 
@@ -404,6 +770,153 @@ def ai_adjust_revenue(revenue_by_venue, venues):
     return adjusted
 
 
+def pack_revenue_batches(rows, max_chars):
+    # Each prompt numbers its rows from 1, so ids stay short whatever the real ids are.
+    batches = []
+    keys, lines, size = [], [], 0
+    for row in rows:
+        line = "|".join([
+            str(len(keys) + 1),
+            (row['artist'] or "").replace("|", "/"),
+            (row['city'] or "").replace("|", "/"),
+            f"{float(row['latitude']):.1f}" if row['latitude'] is not None else "",
+            f"{float(row['longitude']):.1f}" if row['longitude'] is not None else "",
+            compact_number(row['base_revenue']),
+        ])
+        if lines and size + len(line) + 1 > max_chars:
+            batches.append((keys, lines))
+            keys, lines, size = [], [], 0
+            line = "1" + line[line.index("|"):]
+        keys.append((row['artist_id'], row['venue_id']))
+        lines.append(line)
+        size += len(line) + 1
+    if lines:
+        batches.append((keys, lines))
+    return batches
+
+
+def ai_adjust_revenue_batch(rows, concurrency=None, max_chars=None, timeout=None):
+    """
+    AI revenue multipliers for many (artist, venue) pairs at once. `rows` are dicts
+    with artist_id, artist, venue_id, city, latitude, longitude and base_revenue.
+    Rows are packed into as few prompts as max_chars allows and the prompts run
+    with at most `concurrency` in flight. Returns ({(artist_id, venue_id): multiplier},
+    stats); pairs from failed prompts are simply missing.
+    """
+    batches = pack_revenue_batches(rows, max_chars or AI_BATCH_PROMPT_CHARS)
+    system_prompt = (
+        'You are a tour optimization assistant. '
+        'Adjust each artist\'s venue revenue estimates based on fan density and geographic clustering. '
+        'Return JSON only.'
+    )
+
+    def run_batch(lines):
+        user_prompt = (
+            'Rows are id|artist|city|lat|lon|revenue_k (k = thousands). '
+            'Return a JSON object with a "venue_adjustments" array with one item per row; '
+            'each item has id and revenue_multiplier (0.5 to 1.5).\n'
+            + "\n".join(lines)
+        )
+        result, _cache_hit = cached_call_openai_json(system_prompt, user_prompt, timeout=timeout)
+        return result
+
+    multipliers = {}
+    failed = 0
+    workers = max(1, min(concurrency or OPENAI_MAX_CONCURRENCY, len(batches) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='openai-batch') as executor:
+        futures = [(keys, executor.submit(run_batch, lines)) for keys, lines in batches]
+        for keys, future in futures:
+            try:
+                result = future.result()
+            except Exception:
+                result = None
+            if not result or not isinstance(result.get('venue_adjustments'), list):
+                failed += 1
+                continue
+            for item in result['venue_adjustments']:
+                try:
+                    index = int(item.get('id')) - 1
+                    multiplier = float(item.get('revenue_multiplier', 1.0))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                if 0 <= index < len(keys):
+                    multipliers[keys[index]] = min(1.5, max(0.5, multiplier))
+
+    return multipliers, {'pairs': len(rows), 'prompts': len(batches), 'failed_prompts': failed}
+
+
+def reconcile_ai_selection(selected_ids, venue_ids, revenue_by_venue, max_venues):
+    # The AI picked venues from base revenue; top up short picks with the best adjusted venues.
+    chosen = set(selected_ids)
+    if max_venues and len(chosen) < max_venues:
+        for vid in sorted(venue_ids, key=lambda vid: revenue_by_venue.get(vid, 0), reverse=True):
+            if len(chosen) >= max_venues:
+                break
+            chosen.add(vid)
+    return [vid for vid in venue_ids if vid in chosen]
+
+
+def run_ai_stage(revenue_by_venue, venue_ids, venues_by_id, max_venues=None, start_city=None, start_venue_id=None,
+                 adjust_revenue=False, select_venues=False, deadline_seconds=None, adjust_venue_ids=None):
+    """
+    Issue the AI revenue adjustment and AI venue selection concurrently under one deadline.
+
+    Returns (revenue_by_venue, ai_selected, cache_hits). A call that fails or misses
+    the deadline leaves the heuristic result in place: unadjusted revenue, or an
+    ai_selected dict without venue_ids. ai_selected is None when no selection was needed.
+    `adjust_venue_ids` limits the revenue adjustment to those venues (the rest
+    already carry a stored multiplier); None adjusts every venue.
+    """
+    if deadline_seconds is None:
+        deadline_seconds = AI_STAGE_DEADLINE_SECONDS
+    select_venues = select_venues and bool(max_venues) and len(venue_ids) > max_venues
+    cache_hits = {'revenue_adjustment': None, 'venue_selection': None}
+
+    revenue_meta = {}
+    futures = {}
+    to_adjust = revenue_by_venue
+    if adjust_venue_ids is not None:
+        to_adjust = {vid: revenue for vid, revenue in revenue_by_venue.items() if vid in adjust_venue_ids}
+    if adjust_revenue and to_adjust:
+        futures['revenue'] = ai_executor.submit(
+            ai_adjust_revenue, to_adjust, venues_by_id, revenue_meta, timeout=deadline_seconds
+        )
+    if select_venues:
+        futures['selection'] = ai_executor.submit(
+            ai_select_venues, venue_ids, venues_by_id, revenue_by_venue, max_venues, start_city, start_venue_id,
+            timeout=deadline_seconds,
+        )
+    if futures:
+        wait(futures.values(), timeout=deadline_seconds)
+
+    adjusted = revenue_by_venue
+    revenue_future = futures.get('revenue')
+    if revenue_future and revenue_future.done() and not revenue_future.exception():
+        adjusted = {**revenue_by_venue, **revenue_future.result()}
+        cache_hits['revenue_adjustment'] = revenue_meta.get('cache_hit')
+    elif revenue_future:
+        revenue_future.cancel()
+
+    ai_selected = None
+    selection_future = futures.get('selection')
+    if selection_future and selection_future.done():
+        ai_selected = selection_future.result()
+        if ai_selected:
+            cache_hits['venue_selection'] = ai_selected.get('cache_hit', False)
+            if ai_selected.get('venue_ids'):
+                ai_selected['venue_ids'] = reconcile_ai_selection(ai_selected['venue_ids'], venue_ids, adjusted, max_venues)
+    elif selection_future:
+        selection_future.cancel()
+        ai_selected = {
+            'venue_ids': None,
+            'rationale': 'AI selection timed out; used heuristic selection.',
+            'error': 'timeout',
+            'error_detail': f'No response within {deadline_seconds:g}s',
+        }
+
+    return adjusted, ai_selected, cache_hits
+
+
 def build_schedule(route, venues_by_id, start_date=None, min_gap_days=0, travel_speed_km_per_day=None):
     if not start_date:
         return []
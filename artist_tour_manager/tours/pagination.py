@@ -0,0 +1,146 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def cursor_value(value):
+    # Dates and datetimes keep full precision; Decimals go as strings so no
+    # digits are lost. The ORM converts both back when filtering.
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination for every list endpoint. The cursor holds the values of
+    every ordering column of the last row on the page (always ending in id),
+    and the next page is read with a WHERE on that whole tuple instead of an
+    OFFSET. Deep pages cost the same as the first one, and rows inserted
+    meanwhile never shift or repeat a page, even when many rows share a value
+    of the ordering column. NULLs sort last in either direction and are part
+    of the key, so nullable ordering columns page through every row too.
+    Clients follow `next` until it is null; ?page_size= picks the page length
+    up to API_MAX_PAGE_SIZE.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        # Views may order by a non-unique column (e.g. date); id makes the key
+        # unique, and nothing after it could change the order.
+        ordering = list(super().get_ordering(request, queryset, view))
+        for index, field in enumerate(ordering):
+            if field.lstrip('-') in ('id', 'pk'):
+                return tuple(ordering[:index + 1])
+        ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def order_by(self, reverse):
+        # NULLs go last when reading forwards, so first when reading backwards.
+        expressions = []
+        for field in self.ordering:
+            descending = field.startswith('-') != reverse
+            column = F(field.lstrip('-'))
+            nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            expressions.append(column.desc(**nulls) if descending else column.asc(**nulls))
+        return expressions
+
+    def keyset_filter(self, position, reverse):
+        """Rows strictly after `position` in the forward order (before it when reverse)."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            if value is None:
+                # A NULL is last going forwards: nothing comes after it, and
+                # every non-NULL value comes before it.
+                beyond = Q(**{f'{name}__isnull': False}) if reverse else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                lookup = 'gt' if descending == reverse else 'lt'
+                beyond = Q(**{f'{name}__{lookup}': value})
+                if not reverse:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def position_of(self, instance):
+        get = instance.get if isinstance(instance, dict) else lambda name: getattr(instance, name)
+        return [cursor_value(get(field.lstrip('-'))) for field in self.ordering]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        position, reverse = self.cursor if self.cursor else (None, False)
+
+        queryset = queryset.order_by(*self.order_by(reverse))
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.keyset_filter(position, reverse))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Walked back past the first row: the next page is the first page.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor((self.position_of(self.page[-1]), False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return self.encode_cursor((self.cursor[0], True))
+        return self.encode_cursor((self.position_of(self.page[0]), True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = data['p'], bool(data.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            # A cursor from a different ?ordering= cannot be applied to this one.
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, cursor):
+        position, reverse = cursor
+        data = {'p': position, 'r': 1} if reverse else {'p': position}
+        encoded = urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
@@ -0,0 +1,90 @@
+import base64
+import json
+import zlib
+from datetime import date, timedelta
+
+from django.db import models
+
+# Marker key of the compact storage format; rows without it are stored as-is.
+COMPACT_VERSION = 2
+
+
+def derived_venue_revenues(result):
+    revenue_by_venue = result.get('revenue_by_venue') or {}
+    return [
+        {'venue_id': vid, 'estimated_revenue': revenue_by_venue.get(vid, revenue_by_venue.get(str(vid), 0))}
+        for vid in result.get('selected_venue_ids') or []
+    ]
+
+
+def compact_result(result):
+    """
+    Drop what can be rebuilt from the rest of a run result: `venue_revenues`
+    (a copy of `revenue_by_venue` for the selected venues) and the schedule's
+    per-stop venue ids and ISO dates, which become a start date plus day
+    offsets along `optimized_route`. Anything unusual is kept verbatim.
+    """
+    compact = dict(result, v=COMPACT_VERSION)
+    if 'venue_revenues' in compact and compact['venue_revenues'] == derived_venue_revenues(result):
+        del compact['venue_revenues']
+
+    schedule = result.get('schedule')
+    if schedule and all(set(stop) == {'venue_id', 'date'} for stop in schedule) \
+            and [stop['venue_id'] for stop in schedule] == result.get('optimized_route'):
+        try:
+            dates = [date.fromisoformat(stop['date']) for stop in schedule]
+        except (TypeError, ValueError):
+            dates = None
+        if dates:
+            del compact['schedule']
+            compact['schedule_start'] = schedule[0]['date']
+            compact['schedule_offsets'] = [(day - dates[0]).days for day in dates]
+    return compact
+
+
+def expand_result(compact):
+    """Rebuild the API shape of a result stored by compact_result()."""
+    result = {key: value for key, value in compact.items() if key not in ('v', 'schedule_start', 'schedule_offsets')}
+    if 'schedule_start' in compact:
+        start = date.fromisoformat(compact['schedule_start'])
+        result['schedule'] = [
+            {'venue_id': vid, 'date': (start + timedelta(days=offset)).isoformat()}
+            for vid, offset in zip(compact.get('optimized_route') or [], compact['schedule_offsets'])
+        ]
+    if 'venue_revenues' not in result and 'revenue_by_venue' in result:
+        result['venue_revenues'] = derived_venue_revenues(result)
+    return result
+
+
+def encode_result(result):
+    """
+    Stored form of a run result: the compact JSON only. Compressing large
+    values is left to the database (Postgres TOASTs JSONB above ~2 KB), which
+    beats base64 of zlib inside a JSON string and keeps the column queryable.
+    """
+    if not isinstance(result, dict) or result.get('v') == COMPACT_VERSION:
+        return result
+    return compact_result(result)
+
+
+def decode_result(stored):
+    if not isinstance(stored, dict) or stored.get('v') != COMPACT_VERSION:
+        return stored
+    if 'zlib' in stored:
+        # Written by an earlier version; compact_run_results rewrites these as plain JSON.
+        stored = json.loads(zlib.decompress(base64.b64decode(stored['zlib'])))
+    return expand_result(stored)
+
+
+class CompactResultField(models.JSONField):
+    """
+    JSONField that stores run results through encode_result() and hands back
+    the full API shape on read, so views, serializers and the solver never
+    see the compact form. Rows written before compaction are read unchanged.
+    """
+
+    def get_prep_value(self, value):
+        return super().get_prep_value(encode_result(value))
+
+    def from_db_value(self, value, expression, connection):
+        return decode_result(super().from_db_value(value, expression, connection))
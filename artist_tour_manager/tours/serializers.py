@@ -100,6 +100,9 @@ class TourSerializer(serializers.ModelSerializer):
 
         if user and user.is_authenticated:
             self.fields['artist'].queryset = Artist.objects.filter(owner=user)
+        # List views send venue ids unless the caller asks for ?expand=venues.
+        if not self.context.get('expand_venues', True):
+            self.fields['venues'] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
 
     def validate(self, data):
         start_date = data.get('start_date')
@@ -138,6 +141,8 @@ class OptimizationRequestSerializer(serializers.Serializer):
     start_city = serializers.CharField(required=False, allow_blank=False)
     use_ai = serializers.BooleanField(default=False)
     use_ai_selection = serializers.BooleanField(required=False, default=False)
+    # How max_venues are picked without AI (or when the AI call fails); "ai" is use_ai_selection.
+    selection_strategy = serializers.ChoiceField(choices=['heuristic', 'diverse', 'ai'], required=False, default='heuristic')
     max_venues = serializers.IntegerField(required=False, min_value=1, allow_null=True)
     cost_per_km = serializers.DecimalField(max_digits=10, decimal_places=2, default=2.00)
     distance_weight = serializers.DecimalField(max_digits=6, decimal_places=3, default=1.000)
@@ -146,6 +151,18 @@ class OptimizationRequestSerializer(serializers.Serializer):
     start_date = serializers.DateField(required=False)
     travel_speed_km_per_day = serializers.DecimalField(max_digits=7, decimal_places=2, required=False)
 
+    def validate(self, data):
+        if data.get('selection_strategy') == 'ai':
+            data['use_ai_selection'] = True
+        return data
+
+class PlanBatchRunSerializer(serializers.Serializer):
+    plan_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=100)
+
+class PlanRunOptionsSerializer(serializers.Serializer):
+    # "deferred" returns the heuristic run at once and refines it with AI in the background.
+    ai_mode = serializers.ChoiceField(choices=['sync', 'deferred'], default='sync')
+
 class OptimizationConfirmSerializer(serializers.Serializer):
     artist_id = serializers.IntegerField()
     tour_id = serializers.IntegerField()
@@ -176,4 +193,10 @@ class TourPlanSerializer(serializers.ModelSerializer):
 class OptimizationRunSerializer(serializers.ModelSerializer):
     class Meta:
         model = OptimizationRun
-        fields = ['id', 'plan', 'result', 'created_at']
+        fields = ['id', 'plan', 'result', 'is_stale', 'status', 'refines', 'created_at', 'confirmed_at', *OptimizationRun.SUMMARY_FIELDS]
+
+class OptimizationRunSummarySerializer(serializers.ModelSerializer):
+    # List view of runs: summary columns only, never the result blob.
+    class Meta:
+        model = OptimizationRun
+        fields = ['id', 'plan', 'is_stale', 'status', 'refines', 'created_at', 'confirmed_at', *OptimizationRun.SUMMARY_FIELDS]
@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import FanDemand, OptimizationRun, OptimizationRunInput, Venue
+
+# Venue fields that feed revenue, routing or cost in an optimization run.
+VENUE_INPUT_FIELDS = ('capacity', 'default_ticket_price', 'latitude', 'longitude', 'operating_cost')
+
+
+def stored_value(field, value):
+    """`value` as the column would hold it, so 1.0, '1' and Decimal('1.000000') compare equal."""
+    value = field.to_python(value)
+    if isinstance(field, models.DecimalField) and value is not None:
+        value = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+    return value
+
+
+def mark_inputs_stale(**filters):
+    """Flag matching dependency rows and their runs as stale with two bulk UPDATEs."""
+    inputs = OptimizationRunInput.objects.filter(is_stale=False, **filters)
+    OptimizationRun.objects.filter(id__in=inputs.values('run_id'), is_stale=False).update(is_stale=True)
+    inputs.update(is_stale=True)
+
+
+@receiver(post_save, sender=FanDemand)
+def fan_demand_saved(sender, instance, created, **kwargs):
+    # A brand-new row can't be referenced by any run yet.
+    if not created:
+        mark_inputs_stale(artist_id=instance.artist_id, venue_id=instance.venue_id)
+
+
+@receiver(post_delete, sender=FanDemand)
+def fan_demand_deleted(sender, instance, **kwargs):
+    mark_inputs_stale(artist_id=instance.artist_id, venue_id=instance.venue_id)
+
+
+@receiver(pre_save, sender=Venue)
+def venue_snapshot(sender, instance, update_fields=None, **kwargs):
+    instance._input_snapshot = None
+    if not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(VENUE_INPUT_FIELDS):
+        return
+    instance._input_snapshot = Venue.objects.filter(pk=instance.pk).values(*VENUE_INPUT_FIELDS).first()
+
+
+@receiver(post_save, sender=Venue)
+def venue_saved(sender, instance, created, **kwargs):
+    snapshot = getattr(instance, '_input_snapshot', None)
+    if created or not snapshot:
+        return
+    fields = [Venue._meta.get_field(name) for name in VENUE_INPUT_FIELDS]
+    if any(stored_value(field, snapshot[field.name]) != stored_value(field, getattr(instance, field.name))
+           for field in fields):
+        mark_inputs_stale(venue_id=instance.id)
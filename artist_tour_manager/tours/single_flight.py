@@ -0,0 +1,73 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+class SingleFlight:
+    """
+    In-process request coalescing: while a call for `key` is running, other
+    threads asking for the same key wait for it and share its result (or
+    exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Return (result, shared); `shared` is True when another thread did the work."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def advisory_lock_id(key):
+    return int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def advisory_lock(key, timeout, poll_interval=0.1):
+    """
+    Hold a session-level Postgres advisory lock on `key` for the duration of
+    the block, so only one worker process at a time runs it. Waits up to
+    `timeout` seconds; yields True if the lock was taken, False if the wait
+    timed out (the caller may then go ahead unlocked). A no-op that yields
+    True on other databases.
+    """
+    if connection.vendor != 'postgresql':
+        yield True
+        return
+    lock_id = advisory_lock_id(key)
+    deadline = time.monotonic() + timeout
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [lock_id])
+            acquired = cursor.fetchone()[0]
+            if acquired or time.monotonic() >= deadline:
+                break
+            time.sleep(poll_interval)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
@@ -0,0 +1,21 @@
+from django.test.runner import DiscoverRunner
+
+from . import optimization
+from .ai_cache import ResponseCache
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Django's test runner with the OpenAI response cache turned off, so a test
+    run never writes (or answers from) the deployment's cache file. Tests of
+    the cache itself give it a temporary file.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._response_cache = optimization.response_cache
+        optimization.response_cache = ResponseCache(None, ttl_seconds=0, max_entries=0)
+
+    def teardown_test_environment(self, **kwargs):
+        optimization.response_cache = self._response_cache
+        super().teardown_test_environment(**kwargs)
@@ -6,3 +6,5 @@ from .test_serializers import *
 from .test_api import *
 from .test_constraints import *
 from .test_optimization import *
+from .test_ai import *
+from .test_idempotency import *
@@ -0,0 +1,531 @@
+"""
+AI Integration Tests
+Tests for the OpenAI response cache and how AI results surface in optimization responses.
+"""
+import io
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from decimal import Decimal
+
+from ..ai_cache import ResponseCache
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError
+from ..fake_llm import make_fake_llm_server, serve_in_thread
+from ..http_pool import ConnectionPool, HTTPStatusError
+from ..models import Artist, FanDemand, RevenueMultiplier, Venue
+from .. import optimization
+
+
+class ResponseCacheTests(SimpleTestCase):
+    """Unit tests for the persistent OpenAI response cache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'cache.sqlite3'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_and_key_depends_on_prompt(self):
+        """Stored responses should be returned for the same model and prompts only."""
+        cache = ResponseCache(self.path, ttl_seconds=60, max_entries=10)
+        key = cache.key('gpt', 'system', 'user')
+        self.assertIsNone(cache.get(key))
+        cache.set(key, {'venue_ids': [1, 2]})
+        self.assertEqual(cache.get(key), {'venue_ids': [1, 2]})
+        self.assertNotEqual(key, cache.key('gpt', 'system', 'other user'))
+        self.assertNotEqual(key, cache.key('other-model', 'system', 'user'))
+
+    def test_expired_entries_are_misses(self):
+        """Entries older than the TTL should not be served."""
+        cache = ResponseCache(self.path, ttl_seconds=60, max_entries=10)
+        cache.set('k', {'a': 1})
+        with mock.patch('tours.ai_cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(cache.get('k'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Exceeding max_entries should drop the least recently used entry."""
+        cache = ResponseCache(self.path, ttl_seconds=60, max_entries=2)
+        start = time.time()
+        clock = iter([start + step for step in range(10)])
+        with mock.patch('tours.ai_cache.time.time', side_effect=lambda: next(clock)):
+            cache.set('a', {'v': 'a'})
+            cache.set('b', {'v': 'b'})
+            cache.get('a')
+            cache.set('c', {'v': 'c'})
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual(cache.get('a'), {'v': 'a'})
+            self.assertEqual(cache.get('c'), {'v': 'c'})
+
+    def test_missing_directory_is_created_and_none_disables(self):
+        """The cache should create its directory on first write; a None path should never touch disk."""
+        nested = ResponseCache(Path(self.tmpdir.name) / 'a' / 'b' / 'cache.sqlite3', ttl_seconds=60, max_entries=10)
+        nested.set('k', {'a': 1})
+        self.assertEqual(nested.get('k'), {'a': 1})
+
+        disabled = ResponseCache(None, ttl_seconds=60, max_entries=10)
+        disabled.set('k', {'a': 1})
+        self.assertIsNone(disabled.get('k'))
+
+    def test_default_path_is_outside_the_source_tree_and_off_in_tests(self):
+        """The deployment cache should not live next to the code, and the test run should not use it."""
+        self.assertFalse(Path(settings.OPENAI_CACHE_PATH).resolve().is_relative_to(settings.BASE_DIR.parent))
+        self.assertIsNone(optimization.response_cache.path)
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        body = json.dumps({'echo': payload}).encode('utf-8')
+        self.send_response(500 if payload.get('fail') else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Unit tests for the keep-alive connection pool used for OpenAI calls."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RecordingHandler)
+        self.server.connections = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.pool = ConnectionPool(f'http://127.0.0.1:{self.server.server_port}/v1', max_connections=2, timeout=5)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_sequential_calls_reuse_one_connection(self):
+        """Keep-alive should serve repeated calls over a single connection."""
+        for i in range(3):
+            self.assertEqual(self.pool.post_json('/chat/completions', {'n': i}), {'echo': {'n': i}})
+        self.assertEqual(self.server.connections, 1)
+
+    def test_error_status_raises_with_body(self):
+        """4xx/5xx responses should raise HTTPStatusError carrying the response body."""
+        with self.assertRaises(HTTPStatusError) as ctx:
+            self.pool.post_json('/chat/completions', {'fail': True})
+        self.assertEqual(ctx.exception.code, 500)
+        self.assertIn('fail', ctx.exception.body)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """Unit tests for the process-wide circuit breaker."""
+
+    def test_opens_after_consecutive_failures_and_recovers(self):
+        """The breaker should reject calls while open and close after a successful trial."""
+        breaker = CircuitBreaker('test', failure_threshold=2, cooldown_seconds=30)
+        with mock.patch('tours.circuit_breaker.time.monotonic', return_value=100.0):
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+            self.assertEqual(breaker.snapshot()['state'], 'open')
+        with mock.patch('tours.circuit_breaker.time.monotonic', return_value=131.0):
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record_success()
+            self.assertTrue(breaker.allow())
+        snapshot = breaker.snapshot()
+        self.assertEqual(snapshot['state'], 'closed')
+        self.assertEqual(snapshot['opened'], 1)
+        self.assertEqual(snapshot['rejected'], 2)
+
+    def test_failed_trial_reopens(self):
+        """A failure while half-open should open the circuit again."""
+        breaker = CircuitBreaker('test', failure_threshold=1, cooldown_seconds=10)
+        with mock.patch('tours.circuit_breaker.time.monotonic', return_value=0.0):
+            breaker.record_failure()
+        with mock.patch('tours.circuit_breaker.time.monotonic', return_value=11.0):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+
+
+class OpenAIRetryTests(APITestCase):
+    """Retries and the circuit breaker around chat-completion calls."""
+
+    def setUp(self):
+        self.breaker = CircuitBreaker('openai', failure_threshold=3, cooldown_seconds=30)
+        for patcher in (
+            mock.patch.object(optimization, 'openai_breaker', self.breaker),
+            mock.patch.dict(optimization.openai_settings, {'api_key': 'test-key'}),
+            mock.patch.object(optimization.time, 'sleep'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def completion(self, content):
+        return {'choices': [{'message': {'content': json.dumps(content)}}]}
+
+    def test_transient_errors_are_retried(self):
+        """A 429 followed by a success should return the successful response."""
+        responses = [HTTPStatusError(429, 'slow down'), self.completion({'ok': True})]
+        with mock.patch.object(optimization.openai_pool, 'post_json', side_effect=responses) as post:
+            self.assertEqual(optimization.call_openai_json('system', 'user'), {'ok': True})
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(self.breaker.snapshot()['state'], 'closed')
+
+    def test_client_errors_are_not_retried(self):
+        """A 401 should fail immediately and not count as an outage."""
+        with mock.patch.object(optimization.openai_pool, 'post_json', side_effect=HTTPStatusError(401, 'bad key')) as post:
+            with self.assertRaises(HTTPStatusError):
+                optimization.call_openai_json('system', 'user')
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(self.breaker.snapshot()['consecutive_failures'], 0)
+
+    def test_open_breaker_skips_the_network_and_is_reported(self):
+        """Once open, calls should fail fast and the status endpoint should say so."""
+        with mock.patch.object(optimization.openai_pool, 'post_json', side_effect=TimeoutError('timed out')) as post:
+            with self.assertRaises(TimeoutError):
+                optimization.call_openai_json('system', 'user')
+            self.assertEqual(post.call_count, 3)
+            with self.assertRaises(CircuitOpenError):
+                optimization.call_openai_json('system', 'user')
+            self.assertEqual(post.call_count, 3)
+
+        user = User.objects.create_user(username='statususer', password='testpass123')
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/ai/status/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['openai']['configured'])
+        self.assertEqual(response.data['openai']['circuit_breaker']['state'], 'open')
+
+
+class AIOptimizationFixture:
+    """Three geocoded venues and an owner, with a per-test response cache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        cache = ResponseCache(Path(self.tmpdir.name) / 'cache.sqlite3', ttl_seconds=60, max_entries=10)
+        patcher = mock.patch.object(optimization, 'response_cache', cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmpdir.cleanup)
+
+        self.user = User.objects.create_user(username='aiuser', email='ai@test.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.artist = Artist.objects.create(name='AI Artist', genre='Techno', owner=self.user)
+        coords = [('NYC', '40.75', '-73.99'), ('Chicago', '41.88', '-87.67'), ('LA', '34.04', '-118.26')]
+        self.venues = [
+            Venue.objects.create(
+                name=f'AI Venue {city}', city=city, capacity=10000,
+                latitude=Decimal(lat), longitude=Decimal(lon), operating_cost=Decimal('1000.00'),
+            )
+            for city, lat, lon in coords
+        ]
+
+    def short_ids(self, user_prompt, *venues):
+        # Selection prompts list venues as id|city|...; the model answers with those short ids.
+        by_city = {}
+        for line in user_prompt.splitlines():
+            parts = line.split('|')
+            if len(parts) > 1 and parts[0].isdigit():
+                by_city[parts[1]] = int(parts[0])
+        return [by_city[v.city] for v in venues]
+
+    def optimize(self):
+        return self.client.post('/api/optimize/', {
+            'artist_id': self.artist.id,
+            'venue_ids': [v.id for v in self.venues],
+            'use_ai': True,
+            'use_ai_selection': True,
+            'max_venues': 2,
+        }, format='json')
+
+
+class AIOptimizationAPITests(AIOptimizationFixture, APITestCase):
+    """AI stage behaviour as seen through the optimization endpoint."""
+
+    def test_second_identical_request_is_served_from_cache(self):
+        """Repeating an optimization should not call OpenAI again and should report hits."""
+        picked = [self.venues[0].id, self.venues[2].id]
+
+        def fake_openai(system_prompt, user_prompt, timeout=None):
+            if 'venue_adjustments' in user_prompt:
+                return {'venue_adjustments': [{'venue_id': v.id, 'revenue_multiplier': 1.1} for v in self.venues]}
+            return {'venue_ids': self.short_ids(user_prompt, self.venues[0], self.venues[2]), 'rationale': 'Coasts first.'}
+
+        with mock.patch.object(optimization, 'call_openai_json', side_effect=fake_openai) as call:
+            first = self.optimize()
+            second = self.optimize()
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(call.call_count, 2)
+        self.assertEqual(first.data['ai_cache_hits'], {'revenue_adjustment': False, 'venue_selection': False})
+        self.assertEqual(second.data['ai_cache_hits'], {'revenue_adjustment': True, 'venue_selection': True})
+        self.assertEqual(second.data['selection_strategy'], 'ai')
+        self.assertEqual(sorted(second.data['selected_venue_ids']), sorted(picked))
+
+    def test_revenue_and_selection_calls_run_concurrently(self):
+        """Both AI calls should be in flight at the same time."""
+        both_in_flight = threading.Barrier(2, timeout=2)
+
+        def fake_openai(system_prompt, user_prompt, timeout=None):
+            both_in_flight.wait()
+            if 'venue_adjustments' in user_prompt:
+                return {'venue_adjustments': [{'venue_id': v.id, 'revenue_multiplier': 1.2} for v in self.venues]}
+            return {'venue_ids': self.short_ids(user_prompt, self.venues[1]), 'rationale': 'Midwest anchor.'}
+
+        with mock.patch.object(optimization, 'call_openai_json', side_effect=fake_openai):
+            response = self.optimize()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['selection_strategy'], 'ai')
+        self.assertEqual(response.data['ai_cache_hits'], {'revenue_adjustment': False, 'venue_selection': False})
+        # The AI returned one venue; the second slot is filled from adjusted revenue.
+        self.assertEqual(len(response.data['selected_venue_ids']), 2)
+        self.assertIn(self.venues[1].id, response.data['selected_venue_ids'])
+
+    def test_partially_stored_multipliers_keep_the_live_call_for_the_rest(self):
+        """Only venues without a stored multiplier should be sent to the revenue call."""
+        demands = [
+            FanDemand.objects.create(artist=self.artist, venue=venue, fan_count=5000, expected_ticket_price=Decimal('50.00'))
+            for venue in self.venues
+        ]
+        RevenueMultiplier.objects.create(artist=self.artist, venue=self.venues[0], multiplier=2.0)
+        adjusted_ids = []
+
+        def fake_openai(system_prompt, user_prompt, timeout=None):
+            if 'venue_adjustments' in user_prompt:
+                venues = json.loads(user_prompt.split('Venues: ', 1)[1])
+                adjusted_ids.extend(item['venue_id'] for item in venues)
+                return {'venue_adjustments': [{'venue_id': item['venue_id'], 'revenue_multiplier': 1.5} for item in venues]}
+            return {'venue_ids': self.short_ids(user_prompt, self.venues[1]), 'rationale': 'Midwest anchor.'}
+
+        with mock.patch.object(optimization, 'call_openai_json', side_effect=fake_openai):
+            response = self.optimize()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(adjusted_ids), sorted([self.venues[1].id, self.venues[2].id]))
+        self.assertEqual(response.data['revenue_adjustment_source'], 'mixed')
+        base = optimization.estimate_revenue_by_venue(demands, None, {v.id: v for v in self.venues})
+        self.assertGreater(base[self.venues[0].id], 0)
+        revenue = response.data['revenue_by_venue']
+        self.assertAlmostEqual(revenue[self.venues[0].id], base[self.venues[0].id] * 2.0)
+        self.assertAlmostEqual(revenue[self.venues[1].id], base[self.venues[1].id] * 1.5)
+        self.assertAlmostEqual(revenue[self.venues[2].id], base[self.venues[2].id] * 1.5)
+
+    def test_selection_past_deadline_falls_back_to_heuristic(self):
+        """A slow selection call should not hold up the response beyond the deadline."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def fake_openai(system_prompt, user_prompt, timeout=None):
+            if 'venue_adjustments' in user_prompt:
+                return {'venue_adjustments': [{'venue_id': v.id, 'revenue_multiplier': 1.5} for v in self.venues]}
+            release.wait(5)
+            return None
+
+        with mock.patch.object(optimization, 'AI_STAGE_DEADLINE_SECONDS', 0.2), \
+                mock.patch.object(optimization, 'call_openai_json', side_effect=fake_openai):
+            started = time.monotonic()
+            response = self.optimize()
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(elapsed, 2)
+        self.assertEqual(response.data['selection_strategy'], 'heuristic')
+        self.assertIn('timed out', response.data['selection_rationale'])
+        self.assertEqual(response.data['ai_cache_hits']['revenue_adjustment'], False)
+        self.assertIsNone(response.data['ai_cache_hits']['venue_selection'])
+
+
+class FakeLLMPipelineTests(AIOptimizationFixture, APITestCase):
+    """The full AI pipeline against the bundled stand-in server instead of OpenAI."""
+
+    def start_server(self, failure_threshold=5, **options):
+        server = make_fake_llm_server(seed=0, **options)
+        serve_in_thread(server)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        for patcher in (
+            mock.patch.object(optimization, 'openai_pool', ConnectionPool(server.base_url, max_connections=4, timeout=5)),
+            mock.patch.object(optimization, 'openai_breaker', CircuitBreaker('openai', failure_threshold, cooldown_seconds=30)),
+            mock.patch.object(optimization, 'OPENAI_RETRY_BACKOFF_SECONDS', 0.001),
+            mock.patch.dict(optimization.openai_settings, {'api_key': 'fake-key'}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return server
+
+    def test_stand_in_answers_both_ai_calls(self):
+        """Revenue multipliers and venue picks should come back from the stand-in."""
+        server = self.start_server()
+        response = self.optimize()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(response.data['selection_strategy'], 'ai')
+        self.assertIn('Stand-in model', response.data['selection_rationale'])
+        self.assertEqual(response.data['selection_prompt_stats']['sent'], 3)
+        self.assertEqual(len(response.data['selected_venue_ids']), 2)
+
+    def test_injected_rate_limits_fall_back_to_heuristics(self):
+        """Persistent 429s should be retried, then the heuristic result used."""
+        server = self.start_server(error_rate=1.0, error_status=429, failure_threshold=10)
+        response = self.optimize()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['selection_strategy'], 'heuristic')
+        self.assertIn('rate-limited', response.data['selection_rationale'])
+        self.assertEqual(server.requests, 2 * (optimization.OPENAI_MAX_RETRIES + 1))
+
+    def test_stalled_server_is_bounded_by_stage_deadline(self):
+        """Hanging responses should cost no more than the AI stage deadline."""
+        self.start_server(timeout_rate=1.0, hang=3)
+        with mock.patch.object(optimization, 'AI_STAGE_DEADLINE_SECONDS', 0.3):
+            started = time.monotonic()
+            response = self.optimize()
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(elapsed, 2)
+        self.assertEqual(response.data['selection_strategy'], 'heuristic')
+
+
+    def test_batch_command_stores_multipliers_used_by_later_runs(self):
+        """adjust_revenue_batch should fill RevenueMultiplier so optimizations skip the revenue call."""
+        for venue in self.venues:
+            FanDemand.objects.create(artist=self.artist, venue=venue, fan_count=5000)
+        server = self.start_server()
+        out = io.StringIO()
+        # A tiny prompt budget forces one row per prompt.
+        call_command('adjust_revenue_batch', '--max-prompt-chars', '10', stdout=out)
+
+        self.assertIn('pairs=3 prompts=3 stored=3 failed_prompts=0', out.getvalue())
+        self.assertEqual(server.requests, 3)
+        self.assertEqual(RevenueMultiplier.objects.filter(artist=self.artist).count(), 3)
+
+        response = self.optimize()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['revenue_adjustment_source'], 'stored')
+        self.assertIsNone(response.data['ai_cache_hits']['revenue_adjustment'])
+        # Only the venue selection call reaches the model.
+        self.assertEqual(server.requests, 4)
+
+        call_command('adjust_revenue_batch', '--missing-only', stdout=out)
+        self.assertIn('pairs=0 prompts=0 stored=0', out.getvalue())
+
+
+class RevenueBatchTests(SimpleTestCase):
+    """Unit tests for packing many (artist, venue) pairs into revenue prompts."""
+
+    rows = [
+        {'artist_id': artist_id, 'artist': f'Artist {artist_id}', 'venue_id': venue_id, 'city': 'Berlin',
+         'latitude': 52.52, 'longitude': 13.4, 'base_revenue': 125000}
+        for artist_id in (1, 2) for venue_id in (10, 11, 12)
+    ]
+
+    def test_rows_are_packed_up_to_the_character_budget(self):
+        batches = optimization.pack_revenue_batches(self.rows, max_chars=80)
+        self.assertEqual(sum(len(keys) for keys, _lines in batches), len(self.rows))
+        self.assertGreater(len(batches), 1)
+        for keys, lines in batches:
+            self.assertLessEqual(sum(len(line) + 1 for line in lines), 80)
+            self.assertEqual([line.split('|')[0] for line in lines], [str(i) for i in range(1, len(keys) + 1)])
+        self.assertEqual(batches[0][1][0], '1|Artist 1|Berlin|52.5|13.4|125')
+
+    def test_answers_are_mapped_back_and_clipped(self):
+        def fake_openai(system_prompt, user_prompt, timeout=None):
+            ids = [int(line.split('|')[0]) for line in user_prompt.splitlines() if line[:1].isdigit()]
+            return {'venue_adjustments': [{'id': i, 'revenue_multiplier': 3.0 if i == 1 else 0.9} for i in ids] + [
+                {'id': 99, 'revenue_multiplier': 1.0},
+            ]}
+
+        with mock.patch.object(optimization, 'cached_call_openai_json', side_effect=lambda *a, **k: (fake_openai(*a, **k), False)):
+            multipliers, stats = optimization.ai_adjust_revenue_batch(self.rows, max_chars=10000)
+
+        self.assertEqual(stats, {'pairs': 6, 'prompts': 1, 'failed_prompts': 0})
+        self.assertEqual(multipliers[(1, 10)], 1.5)
+        self.assertEqual(multipliers[(2, 12)], 0.9)
+        self.assertEqual(len(multipliers), 6)
+
+    def test_failed_prompts_leave_their_pairs_out(self):
+        with mock.patch.object(optimization, 'cached_call_openai_json', return_value=(None, False)):
+            multipliers, stats = optimization.ai_adjust_revenue_batch(self.rows, max_chars=80)
+        self.assertEqual(multipliers, {})
+        self.assertEqual(stats['failed_prompts'], stats['prompts'])
+
+
+class SelectionPromptTests(SimpleTestCase):
+    """Unit tests for the compact venue selection prompt."""
+
+    def make_venues(self, count):
+        venues = {}
+        for i in range(1, count + 1):
+            # Four regions far enough apart to land in different grid cells.
+            lat, lon = [(40.7, -74.0), (51.5, -0.1), (35.7, 139.7), (-33.9, 151.2)][i % 4]
+            venues[100 + i] = mock.Mock(
+                id=100 + i, city=f'City {i}', latitude=Decimal(str(lat + i * 0.01)), longitude=Decimal(str(lon)),
+                capacity=1000 + i, operating_cost=Decimal('2500'),
+            )
+        return venues
+
+    def test_rows_use_short_ids_grouped_by_cluster(self):
+        """Every candidate gets a short id that maps back to its real id."""
+        venues = self.make_venues(8)
+        revenue = {vid: vid * 1000.0 for vid in venues}
+        _system, user, id_map, stats = optimization.build_selection_prompt(list(venues), venues, revenue, 3)
+
+        self.assertEqual(sorted(id_map.values()), sorted(venues))
+        self.assertEqual(sorted(id_map), list(range(1, 9)))
+        self.assertEqual(stats['clusters'], 4)
+        self.assertEqual(stats['sent'], 8)
+        self.assertEqual(user.count('[C'), 4)
+        self.assertGreater(stats['prompt_chars'], 0)
+
+    def test_large_sets_are_shortlisted_across_every_cluster(self):
+        """Shortlisting should keep the start venue and every region."""
+        venues = self.make_venues(40)
+        revenue = {vid: vid * 1000.0 for vid in venues}
+        with mock.patch.object(optimization, 'AI_SELECTION_SHORTLIST', 10):
+            _system, user, id_map, stats = optimization.build_selection_prompt(
+                list(venues), venues, revenue, 2, start_venue_id=101,
+            )
+
+        self.assertEqual(stats['candidates'], 40)
+        self.assertEqual(stats['sent'], 10)
+        self.assertEqual(stats['clusters'], 4)
+        self.assertIn(101, id_map.values())
+        start_short_id = next(short for short, vid in id_map.items() if vid == 101)
+        self.assertIn(f'start_id: {start_short_id}', user)
+
+    def test_answer_maps_short_ids_back_to_venue_ids(self):
+        """ai_select_venues should translate short ids and ignore unknown ones."""
+        venues = self.make_venues(6)
+        revenue = {vid: vid * 1000.0 for vid in venues}
+
+        def fake_openai(system_prompt, user_prompt, timeout=None):
+            return {'venue_ids': [1, 2, 99], 'rationale': 'ok'}
+
+        _system, _user, id_map, _stats = optimization.build_selection_prompt(list(venues), venues, revenue, 2)
+        with mock.patch.object(optimization, 'cached_call_openai_json', side_effect=lambda *a, **kw: (fake_openai(*a), False)):
+            selected = optimization.ai_select_venues(list(venues), venues, revenue, 2)
+
+        self.assertEqual(sorted(selected['venue_ids']), sorted([id_map[1], id_map[2]]))
+        self.assertEqual(selected['prompt_stats']['sent'], 6)
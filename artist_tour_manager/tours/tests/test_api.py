@@ -4,12 +4,16 @@ Tests for REST API endpoints including tours, registration, export, and filterin
 """
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from decimal import Decimal
 from datetime import date, timedelta
+from unittest import mock
 
-from ..models import Artist, Venue, TourDate, Tour
+from ..models import Artist, Venue, TourDate, Tour, TourPlan, OptimizationRun
+from ..pagination import KeysetPagination
 
 
 class TourDateAPITests(APITestCase):
@@ -66,6 +70,27 @@ class TourDateAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['artist']['name'], 'TourDate API Artist')
 
+    def test_list_query_count_does_not_grow_with_rows(self):
+        """Listing tour dates should load artist, venue and tour in a fixed number of queries."""
+        self.client.force_authenticate(user=self.user1)
+        with CaptureQueriesContext(connection) as one_row:
+            self.client.get('/api/tours/')
+
+        for offset in range(1, 21):
+            venue = Venue.objects.create(name=f'Extra Venue {offset}', city='Leeds', capacity=500)
+            tour = Tour.objects.create(artist=self.artist, name=f'Extra Tour {offset}', created_by=self.user1)
+            TourDate.objects.create(
+                artist=self.artist, tour=tour, venue=venue,
+                date=date.today() + timedelta(days=60 + offset),
+                ticket_price=Decimal('50.00'), created_by=self.user1,
+            )
+        with CaptureQueriesContext(connection) as many_rows:
+            response = self.client.get('/api/tours/')
+
+        self.assertEqual(len(response.data['results']), 21)
+        self.assertEqual(response.data['results'][0]['tour'], 'TourDate API Artist - API Tour')
+        self.assertEqual(len(many_rows), len(one_row))
+
     def test_owner_can_update_tour(self):
         """Owner should be able to update their tour."""
         self.client.force_authenticate(user=self.user1)
@@ -155,6 +180,145 @@ class TourDateAPITests(APITestCase):
         self.assertIn('Tour date must be in the future', str(response.data))
 
 
+class TourGroupAPITests(APITestCase):
+    """Integration tests for the tour group endpoints."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='groupuser', email='group@test.com', password='testpass123')
+        self.artist = Artist.objects.create(name='Group Artist', genre='Jazz', owner=self.user)
+        self.venues = [
+            Venue.objects.create(name=f'Group Venue {i}', city='Paris', capacity=1000) for i in range(3)
+        ]
+        self.group = Tour.objects.create(artist=self.artist, name='Group Tour', created_by=self.user)
+        self.group.venues.set(self.venues[:2])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_returns_venue_ids_unless_expanded(self):
+        """The list should carry venue ids by default and full venues with ?expand=venues."""
+        response = self.client.get('/api/tour-groups/')
+        self.assertEqual(sorted(response.data['results'][0]['venues']), [v.id for v in self.venues[:2]])
+        self.assertEqual(response.data['results'][0]['artist_name'], 'Group Artist')
+
+        response = self.client.get('/api/tour-groups/?expand=venues')
+        self.assertEqual(sorted(v['name'] for v in response.data['results'][0]['venues']), ['Group Venue 0', 'Group Venue 1'])
+
+    def test_detail_embeds_full_venues(self):
+        """Retrieving a single group should always embed venue objects."""
+        response = self.client.get(f'/api/tour-groups/{self.group.id}/')
+        self.assertEqual(response.data['venues'][0]['city'], 'Paris')
+
+    def test_list_query_count_does_not_grow_with_groups(self):
+        """Listing groups should prefetch venues and select the artist in a fixed number of queries."""
+        with CaptureQueriesContext(connection) as one_group:
+            self.client.get('/api/tour-groups/?expand=venues')
+
+        for index in range(10):
+            group = Tour.objects.create(artist=self.artist, name=f'Extra Group {index}', created_by=self.user)
+            group.venues.set(self.venues)
+        with CaptureQueriesContext(connection) as many_groups:
+            response = self.client.get('/api/tour-groups/?expand=venues')
+
+        self.assertEqual(len(response.data['results']), 11)
+        self.assertEqual(len(many_groups), len(one_group))
+
+
+class PaginationAPITests(APITestCase):
+    """Integration tests for cursor pagination on list endpoints."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pageuser', email='page@test.com', password='testpass123')
+        self.venues = [
+            Venue.objects.create(name=f'Page Venue {i}', city='Oslo', capacity=100 + i) for i in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_follow_next_cursor(self):
+        """Following next with a small page_size should visit every row once, in id order."""
+        response = self.client.get('/api/venues/?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(self.collect('/api/venues/?page_size=2'), [v.id for v in self.venues])
+
+    def test_rows_inserted_while_paging_do_not_shift_pages(self):
+        """A row added mid-walk should not repeat or skip rows already paged past."""
+        first = self.client.get('/api/venues/?page_size=2')
+        Venue.objects.create(name='Late Venue', city='Oslo', capacity=10)
+        rest = self.collect(first.data['next'])
+        seen = [item['id'] for item in first.data['results']] + rest
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen[:5], [v.id for v in self.venues])
+
+    def test_page_size_is_capped(self):
+        """page_size above API_MAX_PAGE_SIZE should be clamped."""
+        with mock.patch.object(KeysetPagination, 'max_page_size', 3):
+            response = self.client.get('/api/venues/?page_size=50')
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_ties_in_ordering_are_broken_by_id(self):
+        """Tour dates sharing a date should page in a stable order without duplicates."""
+        tour_date = date.today() + timedelta(days=90)
+        created = []
+        for index in range(4):
+            artist = Artist.objects.create(name=f'Page Artist {index}', genre='Folk', owner=self.user)
+            created.append(TourDate.objects.create(
+                artist=artist, venue=self.venues[index], date=tour_date,
+                ticket_price=Decimal('40.00'), created_by=self.user,
+            ).id)
+        self.assertEqual(self.collect('/api/tours/?page_size=1'), created)
+
+    def test_nullable_ordering_pages_across_nulls_and_ties(self):
+        """Runs without a revenue and runs sharing one should all be paged, forwards and back."""
+        artist = Artist.objects.create(name='Run Page Artist', genre='Folk', owner=self.user)
+        plan = TourPlan.objects.create(
+            artist=artist, name='Run Page Plan',
+            start_date=date.today() + timedelta(days=30), end_date=date.today() + timedelta(days=60),
+            venue_ids=[v.id for v in self.venues],
+        )
+        pending = [OptimizationRun.objects.create(plan=plan, status=OptimizationRun.STATUS_PENDING) for _ in range(3)]
+        completed = [OptimizationRun.objects.create(plan=plan, estimated_revenue=revenue) for revenue in (500.0, 900.0, 500.0)]
+        # Highest revenue first, ties newest first, runs without a revenue last.
+        expected = [completed[1].id, completed[2].id, completed[0].id] + [run.id for run in reversed(pending)]
+
+        url = '/api/runs/?ordering=-estimated_revenue&page_size=2'
+        self.assertEqual(self.collect(url), expected)
+
+        pages = []
+        response = self.client.get(url)
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+        while True:
+            pages.insert(0, [item['id'] for item in response.data['results']])
+            if not response.data['previous']:
+                break
+            response = self.client.get(response.data['previous'])
+        self.assertEqual(sum(pages, []), expected)
+
+        # A run tying with the last row of a page lands after it, without shifting the walk.
+        first = self.client.get('/api/runs/?ordering=estimated_revenue&page_size=2')
+        self.assertEqual([item['id'] for item in first.data['results']], [completed[0].id, completed[2].id])
+        late = OptimizationRun.objects.create(plan=plan, estimated_revenue=500.0)
+        rest = self.collect(first.data['next'])
+        self.assertEqual(rest, [late.id, completed[1].id] + [run.id for run in pending])
+
+    def test_invalid_cursor_is_rejected(self):
+        """A tampered or mismatched cursor should return 404 rather than an error."""
+        self.assertEqual(self.client.get('/api/venues/?cursor=garbage').status_code, status.HTTP_404_NOT_FOUND)
+        cursor = self.client.get('/api/venues/?page_size=2').data['next'].split('cursor=')[1]
+        response = self.client.get(f'/api/tours/?ordering=date&cursor={cursor}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class RegistrationAPITests(APITestCase):
     """Integration tests for user registration endpoint."""
 
@@ -297,47 +461,47 @@ class FilterSearchOrderingAPITests(APITestCase):
         response = self.client.get(f'/api/tours/?artist={self.artist1.id}')
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['artist']['name'], 'Filter Metal Artist')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['artist']['name'], 'Filter Metal Artist')
 
     def test_filter_by_venue(self):
         """Should filter tours by venue."""
         response = self.client.get(f'/api/tours/?venue={self.venue2.id}')
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['venue']['name'], 'Filter Stadium')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['venue']['name'], 'Filter Stadium')
 
     def test_search_by_artist_name(self):
         """Should search tours by artist name."""
         response = self.client.get('/api/tours/?search=Pop')
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['artist']['name'], 'Filter Pop Artist')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['artist']['name'], 'Filter Pop Artist')
 
     def test_search_by_venue_name(self):
         """Should search tours by venue name."""
         response = self.client.get('/api/tours/?search=Arena')
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['venue']['name'], 'Filter Arena')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['venue']['name'], 'Filter Arena')
 
     def test_ordering_by_date(self):
         """Should order tours by date."""
         response = self.client.get('/api/tours/?ordering=date')
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
         # First tour should be the earlier date
-        self.assertEqual(response.data[0]['artist']['name'], 'Filter Metal Artist')
+        self.assertEqual(response.data['results'][0]['artist']['name'], 'Filter Metal Artist')
 
     def test_ordering_by_ticket_price_descending(self):
         """Should order tours by ticket price descending."""
         response = self.client.get('/api/tours/?ordering=-ticket_price')
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
         # First tour should be the higher price
-        self.assertEqual(response.data[0]['artist']['name'], 'Filter Pop Artist')
+        self.assertEqual(response.data['results'][0]['artist']['name'], 'Filter Pop Artist')
@@ -0,0 +1,110 @@
+"""
+Idempotency Key Tests
+Tests for replaying optimize/confirm responses sent with an Idempotency-Key header.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from ..models import Artist, FanDemand, IdempotencyKey, Tour, TourDate, Venue
+from .. import idempotency, views
+
+
+class IdempotencyKeyAPITests(APITestCase):
+    """Repeat requests with the same Idempotency-Key should not redo the work."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='idemuser', email='idem@test.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.artist = Artist.objects.create(name='Idempotent Artist', genre='Pop', owner=self.user)
+        self.tour = Tour.objects.create(artist=self.artist, name='Idempotent Tour', created_by=self.user)
+        self.venues = [
+            Venue.objects.create(
+                name=f'Idem Venue {city}', city=city, capacity=10000,
+                latitude=Decimal(lat), longitude=Decimal(lon), operating_cost=Decimal('1000.00'),
+            )
+            for city, lat, lon in [('NYC', '40.75', '-73.99'), ('Chicago', '41.88', '-87.67'), ('LA', '34.04', '-118.26')]
+        ]
+        FanDemand.objects.create(
+            artist=self.artist, venue=self.venues[0], fan_count=50000, expected_ticket_price=Decimal('100.00'),
+        )
+
+    def optimize(self, key, **extra):
+        payload = {'artist_id': self.artist.id, 'venue_ids': [v.id for v in self.venues], **extra}
+        return self.client.post('/api/optimize/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeat_request_replays_stored_response(self):
+        with mock.patch.object(views, 'two_opt', wraps=views.two_opt) as solver:
+            first = self.optimize('opt-1')
+            second = self.optimize('opt-1')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(solver.call_count, 1)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data['optimized_route'], first.data['optimized_route'])
+
+    def test_key_reused_for_a_different_request_is_rejected(self):
+        self.optimize('opt-2')
+        response = self.optimize('opt-2', max_venues=2)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_repeated_confirm_does_not_report_its_own_dates_as_conflicts(self):
+        payload = {
+            'artist_id': self.artist.id,
+            'tour_id': self.tour.id,
+            'schedule': [{'venue_id': self.venues[0].id, 'date': (date.today() + timedelta(days=30)).isoformat()}],
+        }
+        first = self.client.post('/api/optimize/confirm/', payload, format='json', HTTP_IDEMPOTENCY_KEY='confirm-1')
+        second = self.client.post('/api/optimize/confirm/', payload, format='json', HTTP_IDEMPOTENCY_KEY='confirm-1')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['created_tour_ids'], first.data['created_tour_ids'])
+        self.assertEqual(TourDate.objects.filter(artist=self.artist).count(), 1)
+
+    def test_request_in_flight_is_waited_for(self):
+        row = IdempotencyKey.objects.create(
+            user=self.user, key='opt-3', request_hash='fingerprint', expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+        def first_request_finishes(_seconds):
+            IdempotencyKey.objects.filter(pk=row.pk).update(
+                status=IdempotencyKey.STATUS_COMPLETED, response_status=200, response_body={'optimized_route': [1, 2]},
+            )
+
+        with mock.patch.object(idempotency, 'request_fingerprint', return_value='fingerprint'), \
+                mock.patch.object(idempotency.time, 'sleep', side_effect=first_request_finishes) as sleep, \
+                mock.patch.object(views, 'two_opt') as solver:
+            response = self.optimize('opt-3')
+
+        self.assertEqual(sleep.call_count, 1)
+        solver.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'optimized_route': [1, 2]})
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_request_in_flight_past_the_wait_limit_gets_409(self):
+        IdempotencyKey.objects.create(
+            user=self.user, key='opt-4', request_hash='fingerprint', expires_at=timezone.now() + timedelta(hours=1),
+        )
+        with mock.patch.object(idempotency, 'request_fingerprint', return_value='fingerprint'):
+            response = self.optimize('opt-4')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn('Retry-After', response)
+
+    def test_expired_key_runs_again(self):
+        self.optimize('opt-5')
+        IdempotencyKey.objects.filter(key='opt-5').update(expires_at=timezone.now() - timedelta(seconds=1))
+        with mock.patch.object(views, 'two_opt', wraps=views.two_opt) as solver:
+            response = self.optimize('opt-5')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(solver.call_count, 1)
+        self.assertNotIn('Idempotent-Replayed', response)
@@ -3,12 +3,45 @@ Optimization and Fan Demand Tests
 Tests for tour optimization endpoints and fan demand functionality.
 """
 from django.contrib.auth.models import User
+from django.test import SimpleTestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from decimal import Decimal
 from datetime import date, timedelta
+import base64
+import json
+import random
+import threading
+import time
+import zlib
+from types import SimpleNamespace
 
-from ..models import Artist, Venue, TourDate, FanDemand, Tour
+from ..background import BoundedExecutor
+from ..single_flight import SingleFlight
+from ..models import Artist, Venue, TourDate, FanDemand, Tour, TourPlan, OptimizationRun, OptimizationRunInput, RevenueEstimate
+from .. import background, optimization, views
+from ..run_results import compact_result
+
+
+class InlineExecutor:
+    """Stand-in for the refinement pool that runs jobs synchronously (or refuses them)."""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+
+    def submit(self, fn, *args, **kwargs):
+        if not self.accept:
+            return None
+        fn(*args, **kwargs)
+        return True
 
 
 class FanDemandAndOptimizationAPITests(APITestCase):
@@ -62,7 +95,7 @@ class FanDemandAndOptimizationAPITests(APITestCase):
         """Should list all fan demand records for owned artists."""
         response = self.client.get('/api/fan-demand/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(response.data['results']), 3)
 
     def test_optimize_returns_metrics(self):
         """Optimization endpoint should return route metrics."""
@@ -84,6 +117,145 @@ class FanDemandAndOptimizationAPITests(APITestCase):
         self.assertIn('optimized_route', response.data)
         self.assertIn('distance_reduction_pct', response.data['metrics'])
 
+    def test_optimize_with_diverse_selection(self):
+        """selection_strategy "diverse" should pick locally and explain the pick."""
+        response = self.client.post('/api/optimize/', {
+            'artist_id': self.artist.id,
+            'venue_ids': [self.venue1.id, self.venue2.id, self.venue3.id],
+            'max_venues': 2,
+            'selection_strategy': 'diverse',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['selection_strategy'], 'diverse')
+        self.assertEqual(len(response.data['selected_venue_ids']), 2)
+        self.assertIn('regions', response.data['selection_rationale'])
+
+
+class EnsureFanDemandTests(APITestCase):
+    """Bulk provisioning of generated fan demand rows."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='demanduser', email='demand@test.com', password='testpass123')
+        self.artist = Artist.objects.create(name='Demand Artist', genre='Pop', owner=self.user)
+        self.venues = [
+            Venue.objects.create(
+                name=f'Demand Venue {i}', city=f'City {i}', capacity=1000 + i,
+                latitude=Decimal('40.0') + i, longitude=Decimal('-80.0') + i,
+            )
+            for i in range(30)
+        ]
+
+    def test_missing_rows_are_inserted_with_constant_queries(self):
+        FanDemand.objects.create(artist=self.artist, venue=self.venues[0], fan_count=123)
+        with CaptureQueriesContext(connection) as queries:
+            demands, created = views.ensure_fan_demands(self.artist, self.venues, Decimal('80.00'))
+
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(len(demands), 30)
+        self.assertEqual(len(created), 29)
+        self.assertTrue(all(d.pk for d in demands))
+        by_venue = {d.venue_id: d for d in demands}
+        self.assertEqual(by_venue[self.venues[0].id].fan_count, 123)
+        expected = views.build_fan_demand(self.artist, self.venues[5], Decimal('80.00'))
+        self.assertEqual(by_venue[self.venues[5].id].fan_count, expected.fan_count)
+        self.assertEqual(by_venue[self.venues[5].id].expected_ticket_price, expected.expected_ticket_price)
+
+        with CaptureQueriesContext(connection) as queries:
+            _demands, created = views.ensure_fan_demands(self.artist, self.venues, Decimal('80.00'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(created, [])
+
+    def test_duplicate_artist_venue_rows_are_rejected(self):
+        FanDemand.objects.create(artist=self.artist, venue=self.venues[0], fan_count=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FanDemand.objects.create(artist=self.artist, venue=self.venues[0], fan_count=2)
+
+
+class DiverseSelectionTests(SimpleTestCase):
+    """Unit tests for the local geographic-diversity venue selector."""
+
+    def venues(self, rows):
+        return {
+            vid: SimpleNamespace(id=vid, city=city, latitude=lat, longitude=lon)
+            for vid, (city, lat, lon) in enumerate(rows, 1)
+        }
+
+    def test_covers_a_second_region_that_pure_revenue_ranking_skips(self):
+        venues_by_id = self.venues([
+            ('NYC', 40.7, -74.0), ('Newark', 40.7, -74.2), ('Brooklyn', 40.6, -73.9), ('Jersey City', 40.7, -74.1),
+            ('LA', 34.0, -118.2),
+        ])
+        revenue = {1: 100000, 2: 95000, 3: 90000, 4: 85000, 5: 60000}
+        venue_ids = list(venues_by_id)
+
+        by_revenue = optimization.select_venue_subset(venue_ids, venues_by_id, revenue, 3)
+        diverse, rationale = optimization.select_diverse_venues(venue_ids, venues_by_id, revenue, 3)
+
+        self.assertNotIn(5, by_revenue)
+        self.assertIn(5, diverse)
+        self.assertIn(1, diverse)
+        self.assertEqual(len(diverse), 3)
+        self.assertIn('2 of 2 regions', rationale)
+
+    def test_start_venue_is_always_kept(self):
+        venues_by_id = self.venues([('A', 10.0, 10.0), ('B', 50.0, 50.0), ('C', -30.0, 120.0)])
+        revenue = {1: 10, 2: 1000, 3: 900}
+        selected, _rationale = optimization.select_diverse_venues(list(venues_by_id), venues_by_id, revenue, 2, start_venue_id=1)
+        self.assertIn(1, selected)
+        self.assertEqual(len(selected), 2)
+
+    def test_thousands_of_candidates_are_fast_and_deterministic(self):
+        rng = random.Random(7)
+        venues_by_id = self.venues([(f'City {i}', rng.uniform(-40, 60), rng.uniform(-120, 140)) for i in range(3000)])
+        revenue = {vid: rng.uniform(1000, 100000) for vid in venues_by_id}
+        venue_ids = list(venues_by_id)
+
+        started = time.perf_counter()
+        first, _rationale = optimization.select_diverse_venues(venue_ids, venues_by_id, revenue, 40)
+        elapsed = time.perf_counter() - started
+        second, _rationale = optimization.select_diverse_venues(venue_ids, venues_by_id, revenue, 40)
+
+        self.assertEqual(len(first), 40)
+        self.assertEqual(first, second)
+        self.assertLess(elapsed, 1.0)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Tests for in-process coalescing of identical calls."""
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('key', work)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do('key', work))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('result', False)] + [('result', True)] * 3)
+
+    def test_errors_are_shared_and_key_is_released(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('key', lambda: (_ for _ in ()).throw(ValueError('boom')))
+        self.assertEqual(flight.do('key', lambda: 'again'), ('again', False))
+
 
 class OptimizationConfirmAPITests(APITestCase):
     """Tests for optimization schedule confirmation."""
@@ -161,3 +333,648 @@ class OptimizationConfirmAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         updated = TourDate.objects.get(artist=self.artist, date=conflict_date)
         self.assertEqual(updated.venue_id, self.venue2.id)
+
+    def confirm(self, schedule, **extra):
+        self.client.force_authenticate(user=self.owner)
+        return self.client.post('/api/optimize/confirm/', {
+            'artist_id': self.artist.id, 'tour_id': self.tour_group.id, 'schedule': schedule, **extra,
+        }, format='json')
+
+    def test_unresolved_conflict_writes_nothing(self):
+        """A 409 should not leave the non-conflicting dates behind."""
+        conflict_date = date.today() + timedelta(days=30)
+        TourDate.objects.create(
+            artist=self.artist, tour=self.tour_group, venue=self.venue1, date=conflict_date,
+            ticket_price=Decimal('90.00'), created_by=self.owner,
+        )
+        response = self.confirm([
+            {'venue_id': self.venue2.id, 'date': (conflict_date - timedelta(days=1)).isoformat()},
+            {'venue_id': self.venue2.id, 'date': conflict_date.isoformat()},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(TourDate.objects.filter(artist=self.artist).count(), 1)
+
+    def test_confirm_query_count_does_not_grow_with_schedule(self):
+        """Confirming 40 stops should cost the same number of queries as 4."""
+        start = date.today() + timedelta(days=10)
+
+        def schedule(offset, stops):
+            return [
+                {'venue_id': (self.venue1 if i % 2 else self.venue2).id, 'date': (start + timedelta(days=offset + i)).isoformat()}
+                for i in range(stops)
+            ]
+
+        self.client.force_authenticate(user=self.owner)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.confirm(schedule(0, 4)).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as large:
+            response = self.confirm(schedule(100, 40))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['created_tour_ids']), 40)
+        self.assertEqual(len(large), len(small))
+        prices = set(TourDate.objects.filter(artist=self.artist, venue=self.venue1).values_list('ticket_price', flat=True))
+        self.assertEqual(prices, {Decimal('100.00')})
+
+    def test_both_confirm_views_lock_the_artist_before_reading_conflicts(self):
+        """Conflict detection should run under the per-artist lock, so concurrent confirms serialize."""
+        plan = TourPlan.objects.create(
+            artist=self.artist, name='Lock Plan', venue_ids=[self.venue1.id], created_by=self.owner,
+            start_date=date.today() + timedelta(days=30), end_date=date.today() + timedelta(days=60),
+        )
+        run = OptimizationRun.objects.create(plan=plan, result={'schedule': [
+            {'venue_id': self.venue1.id, 'date': (date.today() + timedelta(days=40)).isoformat()},
+        ]})
+        self.client.force_authenticate(user=self.owner)
+
+        for send in (
+            lambda: self.confirm([{'venue_id': self.venue2.id, 'date': (date.today() + timedelta(days=20)).isoformat()}]),
+            lambda: self.client.post(f'/api/runs/{run.id}/confirm/', {'tour_id': self.tour_group.id}, format='json'),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                lock_at = []
+                with mock.patch.object(views, 'lock_artist', side_effect=lambda artist_id: lock_at.append((artist_id, len(queries)))):
+                    response = send()
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(lock_at), 1)
+            artist_id, position = lock_at[0]
+            self.assertEqual(artist_id, self.artist.id)
+            tour_date_reads = [
+                index for index, query in enumerate(queries.captured_queries)
+                if query['sql'].startswith('SELECT') and 'tours_tourdate' in query['sql']
+            ]
+            self.assertTrue(tour_date_reads)
+            self.assertGreaterEqual(min(tour_date_reads), position)
+
+    def test_failed_write_rolls_back_the_whole_schedule(self):
+        """A database error part-way through should leave no partial tour."""
+        existing_date = date.today() + timedelta(days=30)
+        TourDate.objects.create(
+            artist=self.artist, tour=self.tour_group, venue=self.venue1, date=existing_date,
+            ticket_price=Decimal('90.00'), created_by=self.owner,
+        )
+        with mock.patch.object(TourDate.objects, 'bulk_update', side_effect=IntegrityError('boom')):
+            response = self.confirm([
+                {'venue_id': self.venue2.id, 'date': (existing_date + timedelta(days=1)).isoformat()},
+                {'venue_id': self.venue2.id, 'date': existing_date.isoformat()},
+            ], conflict_strategy='overwrite')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(TourDate.objects.filter(artist=self.artist).count(), 1)
+        self.assertEqual(TourDate.objects.get(artist=self.artist).venue_id, self.venue1.id)
+
+
+class PlanOptimizationRunAPITests(APITestCase):
+    """Tests for plan runs and the streaming run endpoint."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='planuser',
+            email='plan@test.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.artist = Artist.objects.create(name='Plan Artist', genre='House', owner=self.user)
+        coords = [
+            ('Plan Venue A', 'NYC', '40.7505', '-73.9934'),
+            ('Plan Venue B', 'Chicago', '41.8807', '-87.6742'),
+            ('Plan Venue C', 'LA', '34.0430', '-118.2673'),
+            ('Plan Venue D', 'Boston', '42.3601', '-71.0589'),
+        ]
+        self.venues = [
+            Venue.objects.create(
+                name=name, city=city, capacity=10000,
+                latitude=Decimal(lat), longitude=Decimal(lon),
+                operating_cost=Decimal('30000.00'),
+            )
+            for name, city, lat, lon in coords
+        ]
+        self.plan = TourPlan.objects.create(
+            artist=self.artist,
+            name='Spring Plan',
+            start_city='NYC',
+            start_date=date.today() + timedelta(days=30),
+            end_date=date.today() + timedelta(days=60),
+            venue_ids=[v.id for v in self.venues],
+            constraints={'max_venues': 3, 'start_venue_id': self.venues[0].id},
+        )
+
+    def read_events(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8')
+        events = []
+        for block in content.strip().split('\n\n'):
+            lines = dict(line.split(': ', 1) for line in block.split('\n'))
+            events.append((lines['event'], json.loads(lines['data'])))
+        return events
+
+    def test_plan_run_creates_optimization_run(self):
+        """Running a plan should store and return an OptimizationRun."""
+        response = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['result']['selected_venue_ids']), 3)
+        self.assertTrue(OptimizationRun.objects.filter(id=response.data['id']).exists())
+
+    def test_run_list_returns_summary_columns_without_result(self):
+        """Listing runs should serve stored summary columns and never load the result blob."""
+        run_id = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json').data['id']
+        detail = self.client.get(f'/api/runs/{run_id}/').data
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/runs/')
+        item = response.data['results'][0]
+        self.assertNotIn('result', item)
+        self.assertEqual(item['venue_count'], 3)
+        self.assertEqual(item['estimated_revenue'], detail['result']['metrics']['estimated_revenue'])
+        self.assertEqual(item['optimized_distance_km'], detail['result']['metrics']['optimized_distance_km'])
+        self.assertEqual(item['selection_strategy'], detail['result']['selection_strategy'])
+        run_queries = [q['sql'] for q in queries.captured_queries if 'tours_optimizationrun' in q['sql']]
+        self.assertFalse(any('"tours_optimizationrun"."result"' in sql for sql in run_queries))
+
+    def test_runs_filter_and_sort_by_summary_columns(self):
+        """Runs should be filterable and orderable by their summary columns."""
+        low = OptimizationRun.objects.create(plan=self.plan, estimated_revenue=1000.0, estimated_roi=0.1, venue_count=2)
+        high = OptimizationRun.objects.create(plan=self.plan, estimated_revenue=9000.0, estimated_roi=0.8, venue_count=4)
+
+        response = self.client.get('/api/runs/?estimated_roi__gte=0.5')
+        self.assertEqual([item['id'] for item in response.data['results']], [high.id])
+        response = self.client.get('/api/runs/?ordering=estimated_revenue')
+        self.assertEqual([item['id'] for item in response.data['results']], [low.id, high.id])
+        response = self.client.get('/api/runs/?venue_count__lte=2')
+        self.assertEqual([item['id'] for item in response.data['results']], [low.id])
+
+    def stored_result(self, run_id):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT result FROM tours_optimizationrun WHERE id = %s', [run_id])
+            value = cursor.fetchone()[0]
+        return json.loads(value) if isinstance(value, str) else value
+
+    def as_json(self, value):
+        return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+    def test_run_result_is_stored_compact_and_read_back_in_full(self):
+        """Results should be stored as plain compact JSON and re-expanded to the API shape."""
+        posted = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json').data
+        stored = self.stored_result(posted['id'])
+        self.assertEqual(stored['v'], 2)
+        self.assertNotIn('zlib', stored)
+        self.assertNotIn('venue_revenues', stored)
+        self.assertNotIn('schedule', stored)
+        self.assertEqual(stored['schedule_offsets'][0], 0)
+
+        detail = self.client.get(f'/api/runs/{posted["id"]}/').data
+        self.assertTrue(detail['result']['schedule'])
+        self.assertEqual(self.as_json(detail['result']), self.as_json(posted['result']))
+
+    def test_compact_run_results_command_rewrites_legacy_rows(self):
+        """The command should compact results saved in the old formats without changing what is read."""
+        plain_id = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json').data['id']
+        original = self.as_json(OptimizationRun.objects.get(id=plain_id).result)
+        zlib_id = OptimizationRun.objects.create(plan=self.plan).id
+        raw = json.dumps(compact_result(original), separators=(',', ':')).encode('utf-8')
+        blob = {'v': 2, 'zlib': base64.b64encode(zlib.compress(raw, 6)).decode('ascii')}
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE tours_optimizationrun SET result = %s WHERE id = %s', [json.dumps(original), plain_id])
+            cursor.execute('UPDATE tours_optimizationrun SET result = %s WHERE id = %s', [json.dumps(blob), zlib_id])
+        self.assertNotIn('v', self.stored_result(plain_id))
+        self.assertEqual(self.as_json(OptimizationRun.objects.get(id=zlib_id).result), original)
+
+        out = StringIO()
+        call_command('compact_run_results', dry_run=True, stdout=out)
+        self.assertIn('would compact rows=2', out.getvalue())
+        self.assertNotIn('v', self.stored_result(plain_id))
+        self.assertIn('zlib', self.stored_result(zlib_id))
+
+        out = StringIO()
+        call_command('compact_run_results', batch_size=1, stdout=out)
+        self.assertIn('compacted rows=2', out.getvalue())
+        for run_id in (plain_id, zlib_id):
+            stored = self.stored_result(run_id)
+            self.assertEqual(stored['v'], 2)
+            self.assertNotIn('zlib', stored)
+            self.assertEqual(self.as_json(OptimizationRun.objects.get(id=run_id).result), original)
+
+        out = StringIO()
+        call_command('compact_run_results', stdout=out)
+        self.assertIn('rows=0', out.getvalue())
+
+    def test_prune_keeps_newest_runs_per_plan_and_confirmed_runs(self):
+        """Retention should drop old unconfirmed runs (and their inputs) in batches, nothing else."""
+        confirmed_id = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json').data['id']
+        tour = Tour.objects.create(artist=self.artist, name='Retention Tour')
+        response = self.client.post(f'/api/runs/{confirmed_id}/confirm/', {'tour_id': tour.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(OptimizationRun.objects.get(id=confirmed_id).confirmed_at)
+
+        base = timezone.now() - timedelta(days=10)
+        old = [OptimizationRun.objects.create(plan=self.plan) for _ in range(3)]
+        pending = OptimizationRun.objects.create(plan=self.plan, status=OptimizationRun.STATUS_PENDING)
+        newest = [OptimizationRun.objects.create(plan=self.plan) for _ in range(2)]
+        for offset, run in enumerate([*old, pending, *newest]):
+            OptimizationRun.objects.filter(id=run.id).update(created_at=base + timedelta(days=offset + 1))
+        OptimizationRun.objects.filter(id=confirmed_id).update(created_at=base)
+        OptimizationRunInput.objects.create(run=old[0], artist=self.artist, venue=self.venues[0])
+
+        other_plan = TourPlan.objects.create(
+            artist=self.artist, name='Other Plan', start_date=self.plan.start_date, end_date=self.plan.end_date,
+        )
+        other = [OptimizationRun.objects.create(plan=other_plan) for _ in range(2)]
+
+        out = StringIO()
+        call_command('prune_optimization_runs', keep=2, dry_run=True, stdout=out)
+        self.assertIn('would delete runs=3 inputs=1', out.getvalue())
+        self.assertEqual(OptimizationRun.objects.count(), 9)
+
+        out = StringIO()
+        call_command('prune_optimization_runs', keep=2, batch_size=2, stdout=out)
+        self.assertIn('deleted runs=3 inputs=1', out.getvalue())
+        self.assertEqual(
+            set(OptimizationRun.objects.values_list('id', flat=True)),
+            {confirmed_id, pending.id, *(run.id for run in newest), *(run.id for run in other)},
+        )
+        self.assertTrue(OptimizationRunInput.objects.filter(run_id=confirmed_id).exists())
+        self.assertFalse(OptimizationRunInput.objects.filter(run=old[0].id).exists())
+
+    def test_stream_emits_stages_and_ends_with_result(self):
+        """Streaming a plan run should emit stage/progress events and finish with the saved run."""
+        response = self.client.post(f'/api/plans/{self.plan.id}/run/stream/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = self.read_events(response)
+        names = [name for name, _payload in events]
+        self.assertEqual(names[0], 'stage')
+        self.assertIn('selection', names)
+        self.assertIn('progress', names)
+        self.assertEqual(names[-1], 'result')
+        self.assertNotIn('error', names)
+
+        run_data = events[-1][1]
+        self.assertTrue(OptimizationRun.objects.filter(id=run_data['id']).exists())
+        self.assertEqual(run_data['result']['selection_strategy'], 'heuristic')
+
+    def test_stream_reports_pipeline_errors_as_events(self):
+        """Pipeline errors should be delivered as an SSE error event."""
+        Venue.objects.filter(id=self.venues[0].id).update(latitude=None)
+        response = self.client.get(
+            f'/api/plans/{self.plan.id}/run/stream/',
+            HTTP_ACCEPT='text/event-stream',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        events = self.read_events(response)
+        self.assertEqual(events[-1][0], 'error')
+        self.assertIn(self.venues[0].id, events[-1][1]['missing_venue_ids'])
+
+    def make_plans(self, count):
+        offset = TourPlan.objects.count()
+        return [
+            TourPlan.objects.create(
+                artist=self.artist,
+                name=f'Batch Plan {offset + idx}',
+                start_city='NYC',
+                start_date=date.today() + timedelta(days=30),
+                end_date=date.today() + timedelta(days=60),
+                venue_ids=[v.id for v in self.venues],
+                constraints={'max_venues': 3, 'start_venue_id': self.venues[0].id},
+            )
+            for idx in range(count)
+        ]
+
+    def test_batch_run_returns_summary_per_plan(self):
+        """Batch runs should create one run per plan and report unknown plans."""
+        plans = self.make_plans(2)
+        plan_ids = [p.id for p in plans] + [999999]
+        response = self.client.post('/api/plans/run-batch/', {'plan_ids': plan_ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        summaries = {item['plan_id']: item for item in response.data['plans']}
+        self.assertEqual(summaries[999999]['status'], 'not_found')
+        for plan in plans:
+            self.assertEqual(summaries[plan.id]['status'], 'ok')
+            run = OptimizationRun.objects.get(id=summaries[plan.id]['run_id'])
+            self.assertEqual(run.plan_id, plan.id)
+        # Missing fan demand rows were provisioned once for the shared artist/venues.
+        self.assertEqual(FanDemand.objects.filter(artist=self.artist).count(), len(self.venues))
+
+    def test_batch_run_reports_a_failing_plan_without_failing_the_batch(self):
+        """A plan whose solver raises should get an error entry while the others still run."""
+        failing, passing = self.make_plans(2)
+        real_solve_plan = views.solve_plan
+
+        def solve_or_raise(plan, data, inputs):
+            if plan.id == failing.id:
+                raise RuntimeError('solver crashed')
+            return real_solve_plan(plan, data, inputs)
+
+        # Spawned solver processes would not see the patch, so solve on a thread pool here.
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        with mock.patch.object(background, 'solver_pool', return_value=pool), \
+                mock.patch.object(views, 'solve_plan', side_effect=solve_or_raise):
+            response = self.client.post('/api/plans/run-batch/', {'plan_ids': [failing.id, passing.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        summaries = {item['plan_id']: item for item in response.data['plans']}
+        self.assertEqual(summaries[failing.id]['status'], 'error')
+        self.assertIn('solver crashed', summaries[failing.id]['detail']['detail'])
+        self.assertEqual(summaries[passing.id]['status'], 'ok')
+        self.assertFalse(OptimizationRun.objects.filter(plan=failing).exists())
+        self.assertTrue(OptimizationRun.objects.filter(plan=passing).exists())
+
+    def test_batch_runs_share_one_spawned_solver_pool(self):
+        """Batch requests should reuse one lazily created pool of spawned (not forked) workers."""
+        self.addCleanup(background.discard_solver_pool)
+        background.discard_solver_pool()
+        plans = self.make_plans(2)
+        for plan in plans:
+            response = self.client.post('/api/plans/run-batch/', {'plan_ids': [plan.id]}, format='json')
+            self.assertEqual(response.data['plans'][0]['status'], 'ok')
+        pool = background.solver_pool()
+        self.assertIs(pool, background.solver_pool())
+        self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
+
+        background.discard_solver_pool(pool)
+        self.assertIsNot(background.solver_pool(), pool)
+
+    def test_batch_run_query_count_does_not_grow_with_plans(self):
+        """Loading and saving a batch should use a fixed number of queries."""
+        small = self.make_plans(1)
+        self.client.post('/api/plans/run-batch/', {'plan_ids': [small[0].id]}, format='json')
+        with CaptureQueriesContext(connection) as one_plan:
+            self.client.post('/api/plans/run-batch/', {'plan_ids': [small[0].id]}, format='json')
+
+        many = self.make_plans(4)
+        with CaptureQueriesContext(connection) as four_plans:
+            self.client.post('/api/plans/run-batch/', {'plan_ids': [p.id for p in many]}, format='json')
+        self.assertEqual(len(one_plan), len(four_plans))
+
+    def test_precompute_command_only_reruns_changed_plans(self):
+        """The nightly command should skip plans whose inputs match their last run."""
+        out = StringIO()
+        call_command('precompute_plan_runs', workers=1, stdout=out)
+        self.assertIn('runs=1', out.getvalue())
+        self.assertEqual(OptimizationRun.objects.filter(plan=self.plan).count(), 1)
+
+        out = StringIO()
+        call_command('precompute_plan_runs', workers=1, stdout=out)
+        self.assertIn('runs=0, unchanged=1', out.getvalue())
+
+        FanDemand.objects.filter(artist=self.artist, venue=self.venues[1]).update(fan_count=1)
+        out = StringIO()
+        call_command('precompute_plan_runs', workers=1, stdout=out)
+        self.assertIn('runs=1, unchanged=0', out.getvalue())
+        self.assertIn('p95=', out.getvalue())
+        # The rerun solved with the updated demand, not a cached estimate.
+        rerun = OptimizationRun.objects.filter(plan=self.plan).latest('created_at')
+        demand = FanDemand.objects.get(artist=self.artist, venue=self.venues[1])
+        self.assertEqual(
+            rerun.inputs.get(venue=self.venues[1]).expected_attendance,
+            float(Decimal(1) * demand.engagement_score),
+        )
+
+    def test_precompute_command_keeps_going_when_a_plan_raises(self):
+        """A solver exception should count that plan as failed and still save the others."""
+        failing, = self.make_plans(1)
+        real_solve_plan = views.solve_plan
+
+        def solve_or_raise(plan, data, inputs):
+            if plan.id == failing.id:
+                raise RuntimeError('solver crashed')
+            return real_solve_plan(plan, data, inputs)
+
+        out, err = StringIO(), StringIO()
+        # The solver process is forked after the patch, so it sees it too.
+        with mock.patch.object(views, 'solve_plan', side_effect=solve_or_raise):
+            call_command('precompute_plan_runs', workers=1, stdout=out, stderr=err)
+        self.assertIn('runs=1, unchanged=0, failed=1', out.getvalue())
+        self.assertIn(f'Plan {failing.id} failed', err.getvalue())
+        self.assertTrue(OptimizationRun.objects.filter(plan=self.plan).exists())
+        self.assertFalse(OptimizationRun.objects.filter(plan=failing).exists())
+
+    def test_precompute_command_compares_against_latest_completed_run(self):
+        """Failed or hash-less runs newer than the last completed run should not affect the skip check."""
+        call_command('precompute_plan_runs', workers=1, stdout=StringIO())
+        completed = OptimizationRun.objects.get(plan=self.plan)
+        OptimizationRun.objects.create(plan=self.plan, status=OptimizationRun.STATUS_FAILED, input_hash=completed.input_hash[::-1])
+        OptimizationRun.objects.create(plan=self.plan)
+
+        out = StringIO()
+        call_command('precompute_plan_runs', workers=1, stdout=out)
+        self.assertIn('runs=0, unchanged=1', out.getvalue())
+
+    def test_fan_demand_change_marks_dependent_runs_stale(self):
+        """Saving a FanDemand a run depended on should flag only that run's matching inputs."""
+        response = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        run = OptimizationRun.objects.get(id=response.data['id'])
+        self.assertFalse(run.is_stale)
+        self.assertEqual(run.inputs.count(), len(self.venues))
+
+        demand = FanDemand.objects.get(artist=self.artist, venue=self.venues[2])
+        demand.fan_count = demand.fan_count * 2
+        demand.save()
+
+        run.refresh_from_db()
+        self.assertTrue(run.is_stale)
+        stale = OptimizationRunInput.objects.filter(run=run, is_stale=True)
+        self.assertEqual([row.venue_id for row in stale], [self.venues[2].id])
+
+        response = self.client.get('/api/runs/?is_stale=true')
+        self.assertEqual([item['id'] for item in response.data['results']], [run.id])
+
+    def test_venue_capacity_change_marks_runs_stale(self):
+        """Changing a venue's capacity should mark runs that used it stale."""
+        response = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        venue = self.venues[1]
+        venue.name = 'Renamed Venue'
+        venue.save()
+        self.assertFalse(OptimizationRun.objects.get(id=response.data['id']).is_stale)
+
+        venue.capacity = 500
+        venue.save()
+        self.assertTrue(OptimizationRun.objects.get(id=response.data['id']).is_stale)
+
+    def test_equal_venue_values_of_another_type_keep_runs_fresh(self):
+        """Assigning a float or str equal to the stored Decimal is not a change."""
+        response = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        venue = Venue.objects.get(id=self.venues[1].id)
+        venue.latitude = float(venue.latitude)
+        venue.longitude = str(venue.longitude)
+        venue.capacity = str(venue.capacity)
+        venue.save()
+        self.assertFalse(OptimizationRun.objects.get(id=response.data['id']).is_stale)
+
+        venue.latitude = float(venue.latitude) + 0.5
+        venue.save()
+        self.assertTrue(OptimizationRun.objects.get(id=response.data['id']).is_stale)
+
+    def test_refresh_recomputes_only_changed_venues(self):
+        """Refreshing a stale run should reuse cached revenue for unchanged venues."""
+        response = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        run = OptimizationRun.objects.get(id=response.data['id'])
+        # Poison the cached artefact of an unchanged venue: refresh must reuse it as-is.
+        OptimizationRunInput.objects.filter(run=run, venue=self.venues[3]).update(base_revenue=123.0)
+
+        demand = FanDemand.objects.get(artist=self.artist, venue=self.venues[2])
+        demand.fan_count = 1
+        demand.save()
+
+        response = self.client.post(f'/api/runs/{run.id}/refresh/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['is_stale'])
+        refreshed = OptimizationRun.objects.get(id=response.data['id'])
+        base = {row.venue_id: row.base_revenue for row in refreshed.inputs.all()}
+        self.assertEqual(base[self.venues[3].id], 123.0)
+        self.assertLess(base[self.venues[2].id], run.inputs.get(venue=self.venues[2]).base_revenue)
+
+    def test_revenue_estimates_are_cached_until_inputs_change(self):
+        """Repeat runs should reuse cached estimates until a FanDemand changes."""
+        self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        self.assertEqual(RevenueEstimate.objects.filter(artist=self.artist).count(), len(self.venues))
+
+        with mock.patch.object(views, 'estimate_revenue_by_venue', wraps=views.estimate_revenue_by_venue) as estimate:
+            self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+            self.assertEqual(estimate.call_count, 0)
+
+            demand = FanDemand.objects.get(artist=self.artist, venue=self.venues[0])
+            demand.engagement_score = Decimal('0.2')
+            demand.save()
+
+            self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+            self.assertEqual(estimate.call_count, 1)
+
+    def test_revenue_estimates_follow_queryset_updates(self):
+        """Bulk writes skip save(), so the cache must notice changed values on its own."""
+        self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        FanDemand.objects.filter(artist=self.artist, venue=self.venues[1]).update(fan_count=1)
+        Venue.objects.filter(id=self.venues[2].id).update(capacity=10)
+
+        venues_by_id = {v.id: v for v in Venue.objects.filter(id__in=[v.id for v in self.venues])}
+        fallback = views.fallback_prices({self.artist.id})
+        demands = list(FanDemand.objects.filter(artist=self.artist))
+        estimates = views.revenue_estimates(demands, venues_by_id, fallback)
+
+        expected = views.estimate_revenue_by_venue(demands, fallback.get(self.artist.id), venues_by_id)
+        for venue in (self.venues[1], self.venues[2]):
+            self.assertEqual(estimates[(self.artist.id, venue.id)][0], expected[venue.id])
+        updated = next(d for d in demands if d.venue_id == self.venues[1].id)
+        self.assertEqual(estimates[(self.artist.id, self.venues[1].id)][1], float(Decimal(1) * updated.engagement_score))
+
+    def test_recreated_fan_demand_does_not_reuse_cached_estimate(self):
+        """Deleting and recreating a FanDemand should drop its estimate and build a new one."""
+        self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        old = FanDemand.objects.get(artist=self.artist, venue=self.venues[0])
+        self.assertTrue(RevenueEstimate.objects.filter(demand=old).exists())
+
+        response = self.client.delete(f'/api/fan-demand/{old.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(RevenueEstimate.objects.filter(artist=self.artist, venue=self.venues[0]).exists())
+        response = self.client.post('/api/fan-demand/', {
+            'artist': self.artist.id, 'venue': self.venues[0].id,
+            'fan_count': 50000, 'engagement_score': '0.5500', 'expected_ticket_price': '90.00',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recreated = FanDemand.objects.get(id=response.data['id'])
+
+        venues_by_id = {v.id: v for v in self.venues}
+        expected = views.estimate_revenue_by_venue([recreated], None, venues_by_id)[recreated.venue_id]
+        estimates = views.revenue_estimates([recreated], venues_by_id, views.fallback_prices({self.artist.id}))
+        self.assertEqual(estimates[(self.artist.id, self.venues[0].id)][0], expected)
+        self.assertEqual(RevenueEstimate.objects.get(artist=self.artist, venue=self.venues[0]).demand_id, recreated.id)
+
+        # An estimate left behind by a bulk path is still rejected: it belongs to another row.
+        RevenueEstimate.objects.filter(artist=self.artist, venue=self.venues[0]).update(demand=None, revenue=1000.0)
+        estimates = views.revenue_estimates([recreated], venues_by_id, views.fallback_prices({self.artist.id}))
+        self.assertEqual(estimates[(self.artist.id, self.venues[0].id)][0], expected)
+
+    def test_deferred_run_returns_heuristic_and_refines_in_background(self):
+        """ai_mode=deferred should answer without AI and complete a second run with it."""
+        executor = InlineExecutor()
+        with mock.patch.object(background, 'refinement_executor', executor), \
+                mock.patch.object(views, 'run_ai_stage', wraps=views.run_ai_stage) as ai_stage:
+            response = self.client.post(f'/api/plans/{self.plan.id}/run/', {'ai_mode': 'deferred'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['result']['selection_strategy'], 'heuristic')
+        self.assertEqual(ai_stage.call_count, 1)
+
+        refined_id = response.data['refinement']['run_id']
+        refined = self.client.get(f'/api/runs/{refined_id}/')
+        self.assertEqual(refined.data['status'], 'completed')
+        self.assertEqual(refined.data['refines'], response.data['id'])
+        self.assertEqual(refined.data['result']['refines_run_id'], response.data['id'])
+        self.assertTrue(OptimizationRunInput.objects.filter(run_id=refined_id).exists())
+
+    def test_deferred_run_fails_when_saving_the_refinement_raises(self):
+        """A save error in the background job should leave the run failed, not running."""
+        real_save = views.save_plan_runs
+
+        def save_or_raise(entries, runs=None):
+            # The heuristic run saves normally; filling in the pending run fails.
+            if runs:
+                raise IntegrityError('duplicate run input')
+            return real_save(entries, runs=runs)
+
+        with mock.patch.object(background, 'refinement_executor', InlineExecutor()), \
+                mock.patch.object(views, 'save_plan_runs', side_effect=save_or_raise):
+            response = self.client.post(f'/api/plans/{self.plan.id}/run/', {'ai_mode': 'deferred'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        refined = self.client.get(f"/api/runs/{response.data['refinement']['run_id']}/")
+        self.assertEqual(refined.data['status'], 'failed')
+        self.assertIn('duplicate run input', refined.data['result']['detail'])
+
+    def test_deferred_run_is_refused_when_queue_is_full(self):
+        """A full refinement queue should still return the heuristic run, without a pending one."""
+        with mock.patch.object(background, 'refinement_executor', InlineExecutor(accept=False)):
+            response = self.client.post(f'/api/plans/{self.plan.id}/run/', {'ai_mode': 'deferred'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['refinement']['status'], 'rejected')
+        self.assertEqual(OptimizationRun.objects.filter(plan=self.plan).count(), 1)
+
+    def test_repeat_plan_run_reuses_recent_identical_run(self):
+        """A second run of unchanged inputs should return the run just saved instead of solving again."""
+        first = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        with mock.patch.object(views, 'solve_plan', wraps=views.solve_plan) as solve:
+            second = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        self.assertEqual(solve.call_count, 0)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(second['X-Single-Flight'], 'shared')
+        self.assertEqual(OptimizationRun.objects.filter(plan=self.plan).count(), 1)
+
+        FanDemand.objects.filter(artist=self.artist, venue=self.venues[1]).update(fan_count=1)
+        third = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        self.assertNotEqual(third.data['id'], first.data['id'])
+        self.assertFalse(third.has_header('X-Single-Flight'))
+
+    def test_plan_run_solves_again_after_reuse_window(self):
+        """Identical inputs outside SINGLE_FLIGHT_REUSE_SECONDS should get a fresh run."""
+        first = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        OptimizationRun.objects.filter(id=first.data['id']).update(created_at=timezone.now() - timedelta(minutes=5))
+        second = self.client.post(f'/api/plans/{self.plan.id}/run/', {}, format='json')
+        self.assertNotEqual(second.data['id'], first.data['id'])
+
+    def test_pending_run_cannot_be_confirmed(self):
+        """Confirming a run that is still being refined should return 409."""
+        run = OptimizationRun.objects.create(plan=self.plan, status=OptimizationRun.STATUS_PENDING)
+        tour = Tour.objects.create(artist=self.artist, name='Spring Tour')
+        response = self.client.post(f'/api/runs/{run.id}/confirm/', {'tour_id': tour.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_bounded_executor_refuses_work_beyond_max_pending(self):
+        """Jobs beyond max_pending should be refused until a slot frees up."""
+        executor = BoundedExecutor(max_workers=1, max_pending=1, thread_name_prefix='test')
+        release = threading.Event()
+        first = executor.submit(release.wait, 5)
+        self.assertIsNotNone(first)
+        self.assertIsNone(executor.submit(lambda: None))
+        release.set()
+        first.result(timeout=5)
+        second = None
+        for _attempt in range(50):
+            second = executor.submit(lambda: 'done')
+            if second:
+                break
+            release.wait(0.01)
+        self.assertEqual(second.result(timeout=5), 'done')
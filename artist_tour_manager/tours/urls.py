@@ -1,6 +1,6 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import ArtistViewSet, VenueViewSet, FanDemandViewSet, TourDateViewSet, RegisterView, TourExportView, TourOptimizationView, TourOptimizationConfirmView, TourViewSet, TourPlanViewSet, PlanOptimizationRunView, OptimizationRunConfirmView, OptimizationRunViewSet
+from .views import ArtistViewSet, VenueViewSet, FanDemandViewSet, TourDateViewSet, RegisterView, TourExportView, TourOptimizationView, TourOptimizationConfirmView, TourViewSet, TourPlanViewSet, PlanOptimizationRunView, PlanOptimizationStreamView, PlanBatchRunView, OptimizationRunConfirmView, OptimizationRunRefreshView, OptimizationRunViewSet, AIStatusView
 
 router = DefaultRouter()
 router.register(r'artists', ArtistViewSet)
@@ -16,7 +16,11 @@ urlpatterns = [
     path('export/tours/', TourExportView.as_view(), name='tour-export'),
     path('optimize/', TourOptimizationView.as_view(), name='tour-optimize'),
     path('optimize/confirm/', TourOptimizationConfirmView.as_view(), name='tour-optimize-confirm'),
+    path('ai/status/', AIStatusView.as_view(), name='ai-status'),
+    path('plans/run-batch/', PlanBatchRunView.as_view(), name='plan-optimize-batch'),
     path('plans/<int:plan_id>/run/', PlanOptimizationRunView.as_view(), name='plan-optimize-run'),
+    path('plans/<int:plan_id>/run/stream/', PlanOptimizationStreamView.as_view(), name='plan-optimize-stream'),
+    path('runs/<int:run_id>/refresh/', OptimizationRunRefreshView.as_view(), name='run-optimize-refresh'),
     path('runs/<int:run_id>/confirm/', OptimizationRunConfirmView.as_view(), name='run-optimize-confirm'),
     path('', include(router.urls)),
 ]
@@ -1,7 +1,11 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 import datetime
+import hashlib
+import json
 import random
+import time
+from concurrent.futures.process import BrokenProcessPool
 from decimal import Decimal
 
 # Create your views here.
@@ -10,117 +14,272 @@ from decimal import Decimal
 # ViewSet = ALL the CRUD endpoints automatically from q. and s.
 
 from rest_framework import viewsets, generics
-from .models import Artist, Venue, TourDate, FanDemand, Tour, TourPlan, OptimizationRun
+from .models import Artist, Venue, TourDate, FanDemand, Tour, TourPlan, OptimizationRun, OptimizationRunInput, RevenueEstimate, RevenueMultiplier
+from django.conf import settings
 from django.contrib.auth.models import User
-from .serializers import ArtistSerializer, VenueSerializer, TourDateSerializer, RegisterSerializer, OptimizationRequestSerializer, FanDemandSerializer, OptimizationConfirmSerializer, TourSerializer, TourPlanSerializer, OptimizationRunSerializer
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.utils import timezone
+from .serializers import ArtistSerializer, VenueSerializer, TourDateSerializer, RegisterSerializer, OptimizationRequestSerializer, FanDemandSerializer, OptimizationConfirmSerializer, TourSerializer, TourPlanSerializer, OptimizationRunSerializer, OptimizationRunSummarySerializer, PlanBatchRunSerializer, PlanRunOptionsSerializer
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .permissions import IsArtistOwner
 from rest_framework import status
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from . import background
+from .idempotency import idempotent
+from .single_flight import SingleFlight, advisory_lock
 from .optimization import (
     nearest_neighbor_route,
     two_opt,
+    iter_two_opt,
+    total_distance_km,
     score_route,
     estimate_revenue_by_venue,
-    ai_adjust_revenue,
     build_schedule,
     filter_venues_by_region,
-    select_venue_subset,
-    ai_select_venues,
+    select_local_venues,
+    run_ai_stage,
+    openai_status,
 )
 
+def build_fan_demand(artist, venue, fallback_price):
+    # Deterministic per (artist, venue) so regenerated demand is stable across requests.
+    base_capacity = venue.capacity or 10000
+    seed = (artist.id or 1) * 100000 + venue.id
+    rng = random.Random(seed)
+    fan_count = int(base_capacity * rng.uniform(3.0, 7.0))
+    expected_price = venue.default_ticket_price or fallback_price or Decimal("100.00")
+    return FanDemand(
+        artist=artist,
+        venue=venue,
+        fan_count=fan_count,
+        engagement_score=Decimal("0.10"),
+        expected_ticket_price=expected_price,
+    )
+
+def with_stored_multipliers(fan_demands):
+    """Annotate FanDemand rows with their batch-computed AI revenue multiplier (`ai_multiplier`, or None)."""
+    return fan_demands.annotate(ai_multiplier=Subquery(
+        RevenueMultiplier.objects.filter(artist=OuterRef('artist'), venue=OuterRef('venue')).values('multiplier')[:1]
+    ))
+
+def apply_stored_multipliers(revenue_by_venue, fan_demands):
+    """
+    Apply the multipliers stored by adjust_revenue_batch. Returns (revenue_by_venue, covered),
+    where `covered` is the set of venue ids that had a stored multiplier; other venues keep
+    their revenue unchanged and still need the live revenue call.
+    """
+    stored = {d.venue_id: d.ai_multiplier for d in fan_demands if getattr(d, 'ai_multiplier', None) is not None}
+    covered = set(stored) & set(revenue_by_venue)
+    if not covered:
+        return revenue_by_venue, covered
+    return {vid: revenue * stored.get(vid, 1.0) for vid, revenue in revenue_by_venue.items()}, covered
+
+def revenue_adjustment_source(covered, uncovered):
+    """`revenue_adjustment_source` of a result: stored multipliers, the live AI call, or both."""
+    if not uncovered:
+        return 'stored'
+    return 'mixed' if covered else 'ai'
+
+def fallback_prices(artist_ids):
+    """Latest ticket price per artist, used when neither demand nor venue sets one."""
+    return dict(
+        Artist.objects.filter(id__in=artist_ids).annotate(
+            fallback_price=Subquery(
+                TourDate.objects.filter(artist=OuterRef('pk')).order_by('-date').values('ticket_price')[:1]
+            )
+        ).values_list('id', 'fallback_price')
+    )
+
 def ensure_fan_demands(artist, venues, fallback_price):
-    existing = {
-        demand.venue_id: demand
-        for demand in FanDemand.objects.filter(artist=artist, venue__in=venues)
+    """
+    Return (fan_demands, created) for `artist` at every venue, generating the
+    missing rows with build_fan_demand. Missing rows go in with one INSERT that
+    skips rows a concurrent request already added, then are re-read in one query.
+    """
+    demands = with_stored_multipliers(FanDemand.objects.filter(artist=artist, venue__in=venues))
+    existing = {demand.venue_id: demand for demand in demands}
+    missing = [build_fan_demand(artist, venue, fallback_price) for venue in venues if venue.id not in existing]
+    if not missing:
+        return list(existing.values()), []
+    FanDemand.objects.bulk_create(missing, ignore_conflicts=True)
+    missing_ids = {demand.venue_id for demand in missing}
+    created = list(demands.filter(venue_id__in=missing_ids))
+    existing.update((demand.venue_id, demand) for demand in created)
+    return list(existing.values()), created
+
+def revenue_input_hash(demand, venue, fallback_price):
+    """Fingerprint of every value estimate_revenue_by_venue reads for one demand row."""
+    def num(value):
+        # Decimals read back from the DB carry extra places ('0.10' vs '0.1000').
+        return float(value) if value is not None else None
+
+    canonical = [
+        demand.id, demand.fan_count, num(demand.engagement_score), num(demand.expected_ticket_price),
+        venue.capacity, num(venue.default_ticket_price), num(fallback_price),
+    ]
+    return hashlib.sha256(json.dumps(canonical).encode('utf-8')).hexdigest()
+
+def revenue_estimates(fan_demands, venues_by_id, fallback_by_artist):
+    """
+    Return {(artist_id, venue_id): (revenue, uncapped_attendance)} for the given
+    demand rows. Values come from RevenueEstimate when it was built from the
+    same FanDemand row and its input_hash matches the current demand, venue
+    and fallback price values, so rows changed by
+    QuerySet.update() or bulk_update() are recomputed too; anything else is
+    recomputed once and upserted in a single query.
+    """
+    cached = {
+        (row.artist_id, row.venue_id): row
+        for row in RevenueEstimate.objects.filter(
+            artist_id__in={d.artist_id for d in fan_demands},
+            venue_id__in={d.venue_id for d in fan_demands},
+        )
     }
-    created = []
-    for venue in venues:
-        if venue.id in existing:
+    estimates = {}
+    refreshed = []
+    for demand in fan_demands:
+        key = (demand.artist_id, demand.venue_id)
+        fallback_price = fallback_by_artist.get(demand.artist_id)
+        input_hash = revenue_input_hash(demand, venues_by_id[demand.venue_id], fallback_price)
+        row = cached.get(key)
+        if row and row.demand_id == demand.id and row.input_hash == input_hash:
+            estimates[key] = (row.revenue, row.attendance)
             continue
-        base_capacity = venue.capacity or 10000
-        seed = (artist.id or 1) * 100000 + venue.id
-        rng = random.Random(seed)
-        fan_count = int(base_capacity * rng.uniform(3.0, 7.0))
-        expected_price = venue.default_ticket_price or fallback_price or Decimal("100.00")
-        demand = FanDemand.objects.create(
-            artist=artist,
-            venue=venue,
-            fan_count=fan_count,
-            engagement_score=Decimal("0.10"),
-            expected_ticket_price=expected_price,
+        revenue = estimate_revenue_by_venue([demand], fallback_price, venues_by_id)[demand.venue_id]
+        attendance = float(Decimal(demand.fan_count) * Decimal(demand.engagement_score))
+        estimates[key] = (revenue, attendance)
+        refreshed.append(RevenueEstimate(
+            artist_id=demand.artist_id,
+            venue_id=demand.venue_id,
+            demand_id=demand.id,
+            input_hash=input_hash,
+            revenue=revenue,
+            attendance=attendance,
+        ))
+    if refreshed:
+        RevenueEstimate.objects.bulk_create(
+            refreshed,
+            update_conflicts=True,
+            unique_fields=['artist', 'venue'],
+            update_fields=['demand', 'input_hash', 'revenue', 'attendance', 'updated_at'],
         )
-        existing[venue.id] = demand
-        created.append(demand)
-    return list(existing.values()), created
+    return estimates
 
-def apply_schedule_to_tour(artist, tour, schedule, conflict_strategy, user):
-    conflicts = []
-    created = []
-    skipped = []
-    overwritten = []
+def lock_artist(artist_id):
+    """
+    Row-lock the artist until the surrounding transaction ends, so writers of
+    that artist's tour dates queue up instead of racing (a no-op on SQLite).
+    """
+    list(Artist.objects.select_for_update().filter(pk=artist_id).values_list('pk', flat=True))
 
+def apply_schedule_to_tour(artist, tour, schedule, conflict_strategy, user):
+    """
+    Write a confirmed schedule as TourDate rows. Conflicting dates, fan demand
+    prices and venue prices are loaded with one query each, the changes are
+    worked out in memory, and the inserts and overwrites run as two bulk
+    queries in one transaction, so a bad item, an unresolved conflict or a
+    database error leaves the tour untouched. Conflict detection and writes
+    happen under lock_artist, so concurrent confirms for one artist run one
+    after the other. Returns (result, error_response).
+    """
+    if conflict_strategy not in (None, '', 'skip', 'overwrite'):
+        return None, Response({'detail': 'conflict_strategy must be skip or overwrite.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    items = []
     for item in schedule:
         venue_id = item.get('venue_id')
         date_str = item.get('date')
         if not venue_id or not date_str:
             return None, Response({'detail': 'Each schedule item must include venue_id and date.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            venue_id = int(venue_id)
+        except (TypeError, ValueError):
+            return None, Response({'detail': f'Invalid venue_id: {venue_id}.'}, status=status.HTTP_400_BAD_REQUEST)
         try:
             date_value = datetime.date.fromisoformat(date_str)
         except ValueError:
             return None, Response({'detail': f'Invalid date format: {date_str}.'}, status=status.HTTP_400_BAD_REQUEST)
         if date_value <= datetime.date.today():
             return None, Response({'detail': f'Date must be in the future: {date_str}.'}, status=status.HTTP_400_BAD_REQUEST)
+        items.append((venue_id, date_str, date_value))
+
+    dates = [date_value for _venue_id, _date_str, date_value in items]
+    if len(set(dates)) != len(dates):
+        return None, Response({'detail': 'Each date may appear only once in the schedule.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    venue_ids = {venue_id for venue_id, _date_str, _date_value in items}
+    venue_prices = dict(Venue.objects.filter(id__in=venue_ids).values_list('id', 'default_ticket_price'))
+    missing_venues = sorted(venue_ids - set(venue_prices))
+    if missing_venues:
+        return None, Response(
+            {'detail': 'One or more venues not found.', 'missing_venue_ids': missing_venues},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    demand_prices = dict(
+        FanDemand.objects.filter(artist=artist, venue_id__in=venue_ids).values_list('venue_id', 'expected_ticket_price')
+    )
+
+    try:
+        with transaction.atomic():
+            lock_artist(artist.id)
+            result, error = write_schedule(artist, tour, items, conflict_strategy, user, venue_prices, demand_prices)
+    except IntegrityError:
+        # Only reachable if a date was booked without taking the artist lock (e.g. via the TourDate API).
+        return None, Response(
+            {'detail': 'Tour dates changed while confirming; nothing was saved. Please retry.'},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return result, error
 
-        existing = TourDate.objects.filter(artist=artist, date=date_value).first()
-        if existing:
-            conflicts.append({
-                'date': date_str,
-                'existing_tour_id': existing.id,
-                'existing_venue_id': existing.venue_id,
-                'new_venue_id': venue_id,
-            })
-            if conflict_strategy == 'skip':
-                skipped.append(date_str)
-                continue
-            if conflict_strategy == 'overwrite':
-                existing.venue_id = venue_id
-                existing.tour = tour
-                existing.created_by = user
-                demand = FanDemand.objects.filter(artist=artist, venue_id=venue_id).first()
-                if demand and demand.expected_ticket_price is not None:
-                    existing.ticket_price = demand.expected_ticket_price
-                else:
-                    venue_default = Venue.objects.filter(id=venue_id).values_list('default_ticket_price', flat=True).first()
-                    fallback_price = TourDate.objects.filter(artist=artist).order_by('-date').values_list('ticket_price', flat=True).first()
-                    existing.ticket_price = venue_default or fallback_price or 0
-                existing.save()
-                overwritten.append(existing.id)
-                continue
+def write_schedule(artist, tour, items, conflict_strategy, user, venue_prices, demand_prices):
+    # Called by apply_schedule_to_tour inside its transaction, with the artist locked.
+    dates = [date_value for _venue_id, _date_str, date_value in items]
+    existing_by_date = {row.date: row for row in TourDate.objects.filter(artist=artist, date__in=dates)}
+    fallback_price = None
+    if any(demand_prices.get(vid) is None and not venue_prices[vid] for vid in venue_prices):
+        fallback_price = TourDate.objects.filter(artist=artist).order_by('-date').values_list('ticket_price', flat=True).first()
 
-        if existing and not conflict_strategy:
-            continue
+    def ticket_price(venue_id):
+        if demand_prices.get(venue_id) is not None:
+            return demand_prices[venue_id]
+        return venue_prices[venue_id] or fallback_price or 0
 
-        demand = FanDemand.objects.filter(artist=artist, venue_id=venue_id).first()
-        if demand and demand.expected_ticket_price is not None:
-            ticket_price = demand.expected_ticket_price
-        else:
-            venue_default = Venue.objects.filter(id=venue_id).values_list('default_ticket_price', flat=True).first()
-            fallback_price = TourDate.objects.filter(artist=artist).order_by('-date').values_list('ticket_price', flat=True).first()
-            ticket_price = venue_default or fallback_price or 0
-
-        created_tour = TourDate.objects.create(
-            artist=artist,
-            tour=tour,
-            venue_id=venue_id,
-            date=date_value,
-            ticket_price=ticket_price,
-            created_by=user,
-        )
-        created.append(created_tour.id)
+    conflicts = []
+    skipped = []
+    to_create = []
+    to_update = []
+    for venue_id, date_str, date_value in items:
+        existing = existing_by_date.get(date_value)
+        if not existing:
+            to_create.append(TourDate(
+                artist=artist,
+                tour=tour,
+                venue_id=venue_id,
+                date=date_value,
+                ticket_price=ticket_price(venue_id),
+                created_by=user,
+            ))
+            continue
+        conflicts.append({
+            'date': date_str,
+            'existing_tour_id': existing.id,
+            'existing_venue_id': existing.venue_id,
+            'new_venue_id': venue_id,
+        })
+        if conflict_strategy == 'skip':
+            skipped.append(date_str)
+        elif conflict_strategy == 'overwrite':
+            existing.venue_id = venue_id
+            existing.tour = tour
+            existing.created_by = user
+            existing.ticket_price = ticket_price(venue_id)
+            to_update.append(existing)
 
     if conflicts and not conflict_strategy:
         return None, Response({
@@ -128,13 +287,539 @@ def apply_schedule_to_tour(artist, tour, schedule, conflict_strategy, user):
             'conflicts': conflicts,
         }, status=status.HTTP_409_CONFLICT)
 
+    created = TourDate.objects.bulk_create(to_create)
+    TourDate.objects.bulk_update(to_update, ['venue', 'tour', 'created_by', 'ticket_price'])
     return {
-        'created_tour_ids': created,
-        'overwritten_tour_ids': overwritten,
+        'created_tour_ids': [row.id for row in created],
+        'overwritten_tour_ids': [row.id for row in to_update],
         'skipped_dates': skipped,
         'conflicts': conflicts,
     }, None
 
+# Progress events from 2-opt are throttled so large routes don't flood the stream.
+PROGRESS_INTERVAL_SECONDS = 0.25
+
+def plan_optimization_data(plan, venue_ids):
+    payload = {
+        'artist_id': plan.artist_id,
+        'venue_ids': venue_ids,
+        'start_city': plan.start_city,
+        'start_venue_id': plan.constraints.get('start_venue_id'),
+        'use_ai': True,
+        'use_ai_selection': plan.constraints.get('use_ai_selection', False),
+        'selection_strategy': plan.constraints.get('selection_strategy', 'heuristic'),
+        'max_venues': plan.constraints.get('max_venues'),
+        'cost_per_km': plan.constraints.get('cost_per_km', '2.00'),
+        'distance_weight': plan.constraints.get('distance_weight', '1.0'),
+        'revenue_weight': plan.constraints.get('revenue_weight', '1.0'),
+        'start_date': plan.start_date,
+        'min_gap_days': plan.constraints.get('min_gap_days', 1),
+        'travel_speed_km_per_day': plan.constraints.get('travel_speed_km_per_day', '500'),
+    }
+
+    serializer = OptimizationRequestSerializer(data=payload)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+def plan_inputs(plan, data, venues_by_id):
+    """
+    Resolve a plan's venues from already-loaded `venues_by_id` and apply its
+    region filters. Returns (inputs, error) where error is a 400 response body.
+    """
+    venue_ids = data['venue_ids']
+    venues = [venues_by_id[vid] for vid in dict.fromkeys(venue_ids) if vid in venues_by_id]
+    if len(venues) != len(venue_ids):
+        return None, {'detail': 'One or more venues not found.'}
+
+    filtered_venues, excluded_ids = filter_venues_by_region(venues, plan.region_filters or {})
+    if not filtered_venues:
+        return None, {'detail': 'No venues match the region filters.'}
+    if excluded_ids:
+        venue_ids = [v.id for v in filtered_venues]
+        venues = filtered_venues
+
+    missing_geo = [v.id for v in venues if v.latitude is None or v.longitude is None]
+    if missing_geo:
+        return None, {'detail': 'All venues must include latitude/longitude.', 'missing_venue_ids': missing_geo}
+
+    return {
+        'venue_ids': venue_ids,
+        'venues': venues,
+        'excluded_ids': excluded_ids,
+    }, None
+
+def plan_input_hash(plan, data, inputs):
+    """
+    Fingerprint everything a plan run depends on (plan settings, venue rows,
+    fan demand and fallback price) so unchanged plans can be skipped.
+    """
+    def num(value):
+        # Decimals read back from the DB carry extra places ('0.10' vs '0.1000').
+        return float(value) if value is not None else None
+
+    venues = sorted(inputs['venues'], key=lambda v: v.id)
+    demands = sorted(inputs['fan_demands'], key=lambda d: d.venue_id)
+    canonical = {
+        'data': {key: str(value) for key, value in sorted(data.items())},
+        'region_filters': plan.region_filters or {},
+        'targets': plan.targets or {},
+        'excluded_ids': sorted(inputs['excluded_ids']),
+        'fallback_price': num(inputs['fallback_price']),
+        'venues': [
+            [v.id, v.city, num(v.latitude), num(v.longitude), v.capacity, num(v.operating_cost), num(v.default_ticket_price)]
+            for v in venues
+        ],
+        'fan_demands': [
+            [d.venue_id, d.fan_count, num(d.engagement_score), num(d.expected_ticket_price), getattr(d, 'ai_multiplier', None)]
+            for d in demands
+        ],
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_plan_inputs(plan, data):
+    inputs, error = plan_inputs(plan, data, Venue.objects.in_bulk(data['venue_ids']))
+    if error:
+        return None, error
+
+    fallback_price = TourDate.objects.filter(artist_id=plan.artist_id).order_by('-date').values_list('ticket_price', flat=True).first()
+    inputs['fallback_price'] = fallback_price
+    inputs['fan_demands'], _created_demands = ensure_fan_demands(plan.artist, inputs['venues'], fallback_price)
+    estimates = revenue_estimates(inputs['fan_demands'], {v.id: v for v in inputs['venues']}, {plan.artist_id: fallback_price})
+    inputs['estimates'] = {venue_id: value for (_artist_id, venue_id), value in estimates.items()}
+    return inputs, None
+
+def load_refresh_inputs(run, plan, data):
+    """
+    Like load_plan_inputs, but attach the artefacts of a previous (stale) run
+    so iter_plan_solution only recomputes revenue for venues whose inputs
+    changed, reuses its AI multipliers and selection, and keeps its route
+    when the selected venues did not move.
+    """
+    inputs, error = load_plan_inputs(plan, data)
+    if error:
+        return None, error
+
+    rows = {row.venue_id: row for row in run.inputs.all()}
+    fresh = {vid: row for vid, row in rows.items() if not row.is_stale}
+    moved = {
+        v.id for v in inputs['venues']
+        if v.id in rows and (rows[v.id].latitude, rows[v.id].longitude) != (float(v.latitude), float(v.longitude))
+    }
+    result = run.result or {}
+    inputs['previous'] = {
+        'base_revenue': {vid: row.base_revenue for vid, row in fresh.items()},
+        'attendance': {vid: row.expected_attendance for vid, row in fresh.items()},
+        'multipliers': {vid: row.revenue_multiplier for vid, row in rows.items()},
+        'selection_strategy': result.get('selection_strategy'),
+        'selection_rationale': result.get('selection_rationale'),
+        'selected_venue_ids': result.get('selected_venue_ids') or [],
+        'optimized_route': result.get('optimized_route') or [],
+        'moved_venue_ids': moved,
+    }
+    return inputs, None
+
+def iter_plan_solution(plan, data, inputs):
+    """
+    Run the plan optimization pipeline, yielding (event, payload) pairs.
+
+    Events are `stage`, `progress`, `selection`, and finally either `result`
+    (the run result dict, not yet saved) or `error` (a 400 response body).
+    No database access happens here, so it can run in worker processes once
+    inputs have been loaded. Per-venue artefacts (base revenue, attendance,
+    AI multipliers) are left in inputs['artefacts'] for save_plan_runs.
+    """
+    artist_id = data['artist_id']
+    venue_ids = inputs['venue_ids']
+    venues = inputs['venues']
+    excluded_ids = inputs['excluded_ids']
+    fan_demands = inputs['fan_demands']
+    previous = inputs.get('previous')
+    venues_by_id = {v.id: v for v in venues}
+
+    ai_cache_hits = {'revenue_adjustment': None, 'venue_selection': None}
+
+    yield 'stage', {'stage': 'revenue'}
+    # Fresh artefacts from a stale run win; otherwise use the cached estimates.
+    cached_revenue = previous['base_revenue'] if previous else {}
+    cached_attendance = previous['attendance'] if previous else {}
+    estimates = inputs['estimates']
+    revenue_by_venue = {
+        d.venue_id: cached_revenue.get(d.venue_id, estimates[d.venue_id][0])
+        for d in fan_demands
+    }
+    # Uncapped attendance; capacity is applied below once the selection is known.
+    attendance_by_venue = {
+        d.venue_id: cached_attendance.get(d.venue_id, estimates[d.venue_id][1])
+        for d in fan_demands
+    }
+    base_revenue_by_venue = dict(revenue_by_venue)
+
+    max_venues = data.get('max_venues')
+    use_ai_selection = data.get('use_ai_selection', False)
+    ai_selected = None
+    revenue_source = None
+    if previous:
+        revenue_source = 'previous_run'
+        revenue_by_venue = {
+            vid: revenue * previous['multipliers'].get(vid, 1.0)
+            for vid, revenue in revenue_by_venue.items()
+        }
+    else:
+        # Multipliers precomputed by adjust_revenue_batch replace the live revenue call;
+        # only venues without one are sent to the model.
+        uncovered = set()
+        if data.get('use_ai'):
+            revenue_by_venue, covered = apply_stored_multipliers(revenue_by_venue, fan_demands)
+            uncovered = set(revenue_by_venue) - covered
+            revenue_source = revenue_adjustment_source(covered, uncovered)
+        if uncovered or use_ai_selection:
+            yield 'stage', {'stage': 'ai'}
+            revenue_by_venue, ai_selected, ai_cache_hits = run_ai_stage(
+                revenue_by_venue, venue_ids, venues_by_id, max_venues, data.get('start_city'), data.get('start_venue_id'),
+                adjust_revenue=bool(uncovered), adjust_venue_ids=uncovered, select_venues=use_ai_selection,
+            )
+
+    inputs['artefacts'] = {
+        'base_revenue': base_revenue_by_venue,
+        'attendance': attendance_by_venue,
+        'multipliers': {
+            vid: (revenue_by_venue.get(vid, base) / base) if base else 1.0
+            for vid, base in base_revenue_by_venue.items()
+        },
+    }
+
+    selection_strategy = None
+    ai_rationale = None
+    ai_error = None
+    prompt_stats = None
+    if max_venues and len(venue_ids) > max_venues:
+        yield 'stage', {'stage': 'selection'}
+        selection_strategy = "heuristic"
+        if previous:
+            previous_ids = previous['selected_venue_ids']
+            if (
+                use_ai_selection
+                and previous['selection_strategy'] == "ai"
+                and len(previous_ids) <= max_venues
+                and all(vid in venues_by_id for vid in previous_ids)
+            ):
+                venue_ids = previous_ids
+                ai_rationale = previous['selection_rationale']
+                selection_strategy = "ai"
+        elif ai_selected:
+            ai_rationale = ai_selected.get("rationale")
+            ai_error = ai_selected.get("error_detail") or ai_selected.get("error")
+            prompt_stats = ai_selected.get("prompt_stats")
+            if ai_selected.get("venue_ids"):
+                venue_ids = ai_selected["venue_ids"]
+                selection_strategy = "ai"
+        if selection_strategy != "ai":
+            venue_ids, selection_strategy, local_rationale = select_local_venues(
+                data.get('selection_strategy'), venue_ids, venues_by_id, revenue_by_venue, max_venues,
+                data.get('start_venue_id'), data.get('start_city'),
+            )
+            ai_rationale = local_rationale or ai_rationale
+
+        venues = [venues_by_id[vid] for vid in venue_ids]
+        venues_by_id = {v.id: v for v in venues}
+        yield 'selection', {
+            'selection_strategy': selection_strategy,
+            'selection_rationale': ai_rationale,
+            'selection_error': ai_error,
+            'selection_prompt_stats': prompt_stats,
+            'selected_venue_ids': venue_ids,
+            'ai_cache_hits': ai_cache_hits,
+            'revenue_adjustment_source': revenue_source,
+        }
+
+    start_venue_id = data.get('start_venue_id')
+    if not start_venue_id and data.get('start_city'):
+        city_matches = [v for v in venues if v.city and v.city.lower().startswith(data['start_city'].lower())]
+        if city_matches:
+            start_venue_id = max(city_matches, key=lambda v: revenue_by_venue.get(v.id, 0)).id
+
+    baseline_route = venue_ids[:]
+    if start_venue_id and start_venue_id in venue_ids:
+        baseline_route = [start_venue_id] + [vid for vid in venue_ids if vid != start_venue_id]
+
+    expected_start = start_venue_id if start_venue_id in venues_by_id else venue_ids[0]
+    previous_route = previous['optimized_route'] if previous else []
+    if (
+        previous_route
+        and previous_route[0] == expected_start
+        and sorted(previous_route) == sorted(venue_ids)
+        and not previous['moved_venue_ids'] & set(venue_ids)
+    ):
+        yield 'stage', {'stage': 'routing', 'cached': True}
+        optimized_route = list(previous_route)
+    else:
+        yield 'stage', {'stage': 'routing'}
+        nn_route = nearest_neighbor_route(venue_ids, venues_by_id, start_venue_id)
+        yield 'progress', {'stage': 'nearest_neighbor', 'route': nn_route, 'distance_km': total_distance_km(nn_route, venues_by_id)}
+
+        optimized_route = nn_route
+        last_progress = time.monotonic()
+        for optimized_route in iter_two_opt(nn_route, venues_by_id):
+            now = time.monotonic()
+            if now - last_progress >= PROGRESS_INTERVAL_SECONDS:
+                last_progress = now
+                yield 'progress', {'stage': 'two_opt', 'route': optimized_route, 'distance_km': total_distance_km(optimized_route, venues_by_id)}
+
+    yield 'stage', {'stage': 'scoring'}
+    baseline_metrics = score_route(baseline_route, venues_by_id, revenue_by_venue, data['cost_per_km'], data['distance_weight'], data['revenue_weight'])
+    optimized_metrics = score_route(optimized_route, venues_by_id, revenue_by_venue, data['cost_per_km'], data['distance_weight'], data['revenue_weight'])
+
+    baseline_distance = baseline_metrics['distance_km']
+    optimized_distance = optimized_metrics['distance_km']
+    reduction_pct = None
+    if baseline_distance > 0:
+        reduction_pct = round(((baseline_distance - optimized_distance) / baseline_distance) * 100, 2)
+
+    total_cost = optimized_metrics['total_cost']
+    roi = None
+    if total_cost > 0:
+        roi = round((optimized_metrics['revenue'] - total_cost) / total_cost, 4)
+
+    schedule = build_schedule(
+        optimized_route,
+        venues_by_id,
+        start_date=data.get('start_date'),
+        min_gap_days=data.get('min_gap_days', 0),
+        travel_speed_km_per_day=data.get('travel_speed_km_per_day'),
+    )
+
+    expected_attendance = 0.0
+    for vid, demand_attendance in attendance_by_venue.items():
+        venue = venues_by_id.get(vid)
+        if venue and venue.capacity:
+            demand_attendance = min(demand_attendance, float(venue.capacity))
+        expected_attendance += demand_attendance
+
+    warnings = []
+    targets = plan.targets or {}
+    min_revenue = targets.get('min_revenue')
+    min_roi = targets.get('min_roi')
+    min_attendance = targets.get('min_attendance')
+    if min_revenue and optimized_metrics['revenue'] < float(min_revenue):
+        warnings.append('Estimated revenue is below target.')
+    if min_roi and roi is not None and roi < float(min_roi):
+        warnings.append('Estimated ROI is below target.')
+    if min_attendance and expected_attendance < float(min_attendance):
+        warnings.append('Estimated attendance is below target.')
+
+    yield 'result', {
+        'artist_id': artist_id,
+        'baseline_route': baseline_route,
+        'optimized_route': optimized_route,
+        'selected_venue_ids': venue_ids,
+        'selection_strategy': selection_strategy,
+        'selection_rationale': ai_rationale,
+        'selection_error': ai_error,
+        'selection_prompt_stats': prompt_stats,
+        'ai_cache_hits': ai_cache_hits,
+        'revenue_adjustment_source': revenue_source,
+        'revenue_by_venue': revenue_by_venue,
+        'venue_revenues': [
+            {'venue_id': vid, 'estimated_revenue': revenue_by_venue.get(vid, 0)}
+            for vid in venue_ids
+        ],
+        'metrics': {
+            'baseline_distance_km': baseline_distance,
+            'optimized_distance_km': optimized_distance,
+            'distance_reduction_pct': reduction_pct,
+            'estimated_revenue': optimized_metrics['revenue'],
+            'estimated_total_cost': total_cost,
+            'estimated_roi': roi,
+            'expected_attendance': round(expected_attendance, 2),
+        },
+        'schedule': schedule,
+        'excluded_venue_ids': excluded_ids,
+        'warnings': warnings,
+        'input_hash': plan_input_hash(plan, data, inputs),
+    }
+
+def load_plan_batch(plans):
+    """
+    Load everything the solver needs for many plans with a fixed number of
+    queries: one each for venues, fallback prices, fan demand and cached
+    revenue estimates, plus at most one bulk insert (and re-read) for missing
+    demand rows and one upsert for refreshed estimates.
+
+    Returns a dict of plan id -> (data, inputs, error).
+    """
+    prepared = {}
+    all_venue_ids = set()
+    for plan in plans:
+        try:
+            data = plan_optimization_data(plan, plan.venue_ids)
+        except ValidationError as exc:
+            prepared[plan.id] = (None, None, exc.detail)
+            continue
+        prepared[plan.id] = (data, None, None)
+        all_venue_ids.update(data['venue_ids'])
+
+    venues_by_id = Venue.objects.in_bulk(all_venue_ids)
+    artist_ids = {plan.artist_id for plan in plans}
+    fallback_by_artist = fallback_prices(artist_ids)
+    demands = {
+        (demand.artist_id, demand.venue_id): demand
+        for demand in with_stored_multipliers(FanDemand.objects.filter(artist_id__in=artist_ids, venue_id__in=all_venue_ids))
+    }
+
+    missing = {}
+    for plan in plans:
+        data, _inputs, error = prepared[plan.id]
+        if error:
+            continue
+        inputs, error = plan_inputs(plan, data, venues_by_id)
+        if error:
+            prepared[plan.id] = (data, None, error)
+            continue
+        inputs['fallback_price'] = fallback_by_artist.get(plan.artist_id)
+        prepared[plan.id] = (data, inputs, None)
+        for venue in inputs['venues']:
+            key = (plan.artist_id, venue.id)
+            if key not in demands and key not in missing:
+                missing[key] = build_fan_demand(plan.artist, venue, inputs['fallback_price'])
+    if missing:
+        # Skip rows a concurrent request inserted first, then read back the stored ones.
+        FanDemand.objects.bulk_create(missing.values(), ignore_conflicts=True)
+        demands.update(
+            ((demand.artist_id, demand.venue_id), demand)
+            for demand in with_stored_multipliers(FanDemand.objects.filter(
+                artist_id__in={artist_id for artist_id, _venue_id in missing},
+                venue_id__in={venue_id for _artist_id, venue_id in missing},
+            ))
+            if (demand.artist_id, demand.venue_id) in missing
+        )
+
+    needed = {}
+    for plan in plans:
+        data, inputs, error = prepared[plan.id]
+        if inputs:
+            inputs['fan_demands'] = [demands[(plan.artist_id, vid)] for vid in inputs['venue_ids']]
+            needed.update(((d.artist_id, d.venue_id), d) for d in inputs['fan_demands'])
+    estimates = revenue_estimates(list(needed.values()), venues_by_id, fallback_by_artist)
+    for plan in plans:
+        data, inputs, error = prepared[plan.id]
+        if inputs:
+            inputs['estimates'] = {vid: estimates[(plan.artist_id, vid)] for vid in inputs['venue_ids']}
+    return prepared
+
+def run_summary(result):
+    """The OptimizationRun summary columns for a solver result."""
+    metrics = result.get('metrics') or {}
+    return {
+        'optimized_distance_km': metrics.get('optimized_distance_km'),
+        'estimated_revenue': metrics.get('estimated_revenue'),
+        'estimated_roi': metrics.get('estimated_roi'),
+        'venue_count': len(result.get('selected_venue_ids') or []),
+        'selection_strategy': result.get('selection_strategy') or '',
+        'warnings': result.get('warnings') or [],
+    }
+
+def save_plan_runs(entries, runs=None):
+    """
+    Insert an OptimizationRun for each (plan, result, inputs) entry, plus the
+    dependency index rows (one per candidate venue) that let signal handlers
+    mark the run stale when that venue's fan demand, price or capacity change.
+    Pass `runs` to complete already-created (pending) runs instead.
+    """
+    if runs is None:
+        runs = OptimizationRun.objects.bulk_create([
+            OptimizationRun(plan=plan, result=result, input_hash=result.get('input_hash', ''), **run_summary(result))
+            for plan, result, _inputs in entries
+        ])
+    else:
+        for run, (_plan, result, _inputs) in zip(runs, entries):
+            run.result = result
+            run.input_hash = result.get('input_hash', '')
+            run.status = OptimizationRun.STATUS_COMPLETED
+            for field, value in run_summary(result).items():
+                setattr(run, field, value)
+        OptimizationRun.objects.bulk_update(runs, ['result', 'input_hash', 'status', *OptimizationRun.SUMMARY_FIELDS])
+    index_rows = []
+    for run, (plan, _result, inputs) in zip(runs, entries):
+        artefacts = inputs['artefacts']
+        for venue in inputs['venues']:
+            index_rows.append(OptimizationRunInput(
+                run=run,
+                artist_id=plan.artist_id,
+                venue=venue,
+                base_revenue=artefacts['base_revenue'].get(venue.id, 0.0),
+                expected_attendance=artefacts['attendance'].get(venue.id, 0.0),
+                revenue_multiplier=artefacts['multipliers'].get(venue.id, 1.0),
+                latitude=float(venue.latitude),
+                longitude=float(venue.longitude),
+            ))
+    OptimizationRunInput.objects.bulk_create(index_rows)
+    return runs
+
+def solve_plan(plan, data, inputs):
+    for event, payload in iter_plan_solution(plan, data, inputs):
+        if event in ('result', 'error'):
+            return event, payload
+    return 'error', {'detail': 'Optimization produced no result.'}
+
+def solve_plan_in_worker(plan, data, inputs):
+    # Runs in a solver process, so the artefacts solve_plan leaves in inputs
+    # have to be sent back explicitly.
+    event, payload = solve_plan(plan, data, inputs)
+    return event, payload, inputs.get('artefacts')
+
+# Concurrent identical plan runs inside this process share one solve.
+plan_run_flights = SingleFlight()
+
+def run_plan_single_flight(plan, data, inputs):
+    """
+    Solve and save a plan run, coalescing identical requests. Threads in this
+    process wait on the first one (SingleFlight); other workers queue on a
+    Postgres advisory lock keyed by plan and input hash, then pick up the run
+    the lock holder saved, since any completed run with the same input hash
+    from the last SINGLE_FLIGHT_REUSE_SECONDS is returned instead of solving
+    again. Returns (run, shared).
+    """
+    input_hash = plan_input_hash(plan, data, inputs)
+    key = f'plan-run:{plan.id}:{input_hash}'
+
+    def solve_once():
+        with advisory_lock(key, settings.SINGLE_FLIGHT_WAIT_SECONDS):
+            recent = OptimizationRun.objects.filter(
+                plan=plan,
+                input_hash=input_hash,
+                status=OptimizationRun.STATUS_COMPLETED,
+                is_stale=False,
+                created_at__gte=timezone.now() - datetime.timedelta(seconds=settings.SINGLE_FLIGHT_REUSE_SECONDS),
+            ).order_by('-created_at').first()
+            if recent:
+                return recent, True
+            _event, result = solve_plan(plan, data, inputs)
+            run, = save_plan_runs([(plan, result, inputs)])
+            return run, False
+
+    (run, reused), shared = plan_run_flights.do(key, solve_once)
+    return run, reused or shared
+
+def refine_plan_run(run_id, plan, data, inputs):
+    """
+    Background job for ai_mode="deferred": solve the plan with AI enabled and
+    fill in the pending run created for it. Failures are stored on the run.
+    """
+    run = OptimizationRun.objects.get(id=run_id)
+    OptimizationRun.objects.filter(id=run_id).update(status=OptimizationRun.STATUS_RUNNING)
+    try:
+        event, payload = solve_plan(plan, data, inputs)
+        if event == 'result':
+            payload['refines_run_id'] = run.refines_id
+            # Atomic, so a failed save leaves no half-written run or inputs behind.
+            with transaction.atomic():
+                save_plan_runs([(plan, payload, inputs)], runs=[run])
+            return
+    except Exception as exc:
+        payload = {'detail': f'AI refinement failed: {exc}'}
+    # Anything but a saved result ends in a terminal state, so pollers stop waiting.
+    OptimizationRun.objects.filter(id=run_id).update(status=OptimizationRun.STATUS_FAILED, result=payload)
+
 # ViewSets are used to create views for models, allowing for CRUD operations.
 
 class ArtistViewSet(viewsets.ModelViewSet):
@@ -168,8 +853,22 @@ class TourViewSet(viewsets.ModelViewSet):
     serializer_class = TourSerializer
     permission_classes = [IsAuthenticated, IsArtistOwner]
 
+    def expand_venues(self):
+        if self.action != 'list':
+            return True
+        return 'venues' in self.request.query_params.get('expand', '').split(',')
+
     def get_queryset(self):
-        return Tour.objects.filter(artist__owner=self.request.user)
+        # Venues come through TourGroupVenue in one extra query for the whole page.
+        venues = Venue.objects.all() if self.expand_venues() else Venue.objects.only('id')
+        return (
+            Tour.objects.filter(artist__owner=self.request.user)
+            .select_related('artist')
+            .prefetch_related(Prefetch('venues', queryset=venues))
+        )
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'expand_venues': self.expand_venues()}
 
     def perform_create(self, serializer):
         artist = serializer.validated_data.get("artist")
@@ -203,9 +902,30 @@ class TourPlanViewSet(viewsets.ModelViewSet):
 class OptimizationRunViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = OptimizationRunSerializer
     permission_classes = [IsAuthenticated, IsArtistOwner]
+    filterset_fields = {
+        'plan': ['exact'],
+        'is_stale': ['exact'],
+        'status': ['exact'],
+        'selection_strategy': ['exact'],
+        'venue_count': ['exact', 'gte', 'lte'],
+        'optimized_distance_km': ['gte', 'lte'],
+        'estimated_revenue': ['gte', 'lte'],
+        'estimated_roi': ['gte', 'lte'],
+    }
+    ordering_fields = ['created_at', 'optimized_distance_km', 'estimated_revenue', 'estimated_roi', 'venue_count']
+    ordering = ['-created_at']
 
     def get_queryset(self):
-        return OptimizationRun.objects.filter(plan__artist__owner=self.request.user).order_by('-created_at')
+        runs = OptimizationRun.objects.filter(plan__artist__owner=self.request.user).order_by('-created_at')
+        # Listings carry only the summary columns; the full result is detail-only.
+        if self.action == 'list':
+            runs = runs.defer('result')
+        return runs
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OptimizationRunSummarySerializer
+        return OptimizationRunSerializer
 
 class FanDemandViewSet(viewsets.ModelViewSet):
     queryset = FanDemand.objects.all()
@@ -232,6 +952,20 @@ Filter by:
     date: /api/tours/?date=2025-09-01
 '''
 
+def with_tour_date_relations(queryset):
+    """
+    Load everything TourDateSerializer renders (artist, venue, tour and the
+    tour's artist name for str(tour)) in the same query, leaving out columns it
+    never reads such as the tour description.
+    """
+    return queryset.select_related('artist', 'venue', 'tour', 'tour__artist').only(
+        'id', 'date', 'ticket_price', 'is_archived',
+        'artist__id', 'artist__name', 'artist__genre', 'artist__owner',
+        *(f'venue__{field.name}' for field in Venue._meta.concrete_fields),
+        'tour__id', 'tour__name', 'tour__artist__name',
+    )
+
+
 class TourDateViewSet(viewsets.ModelViewSet):
     queryset = TourDate.objects.all()
     serializer_class = TourDateSerializer
@@ -258,7 +992,7 @@ class TourDateViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=self.request.user)
 
     def get_queryset(self):
-        return TourDate.objects.filter(artist__owner=self.request.user)
+        return with_tour_date_relations(TourDate.objects.filter(artist__owner=self.request.user))
 
 
 
@@ -285,7 +1019,7 @@ class TourExportView(APIView):
         # Get the user and their tours
         # Assuming the user is authenticated and has a TourDate relationship
         user = request.user
-        user_tours = TourDate.objects.filter(artist__owner=user)
+        user_tours = with_tour_date_relations(TourDate.objects.filter(artist__owner=user))
         
         #csv format
         if request.query_params.get('type', '').lower() == 'csv':
@@ -307,7 +1041,13 @@ class TourExportView(APIView):
 class TourOptimizationView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
+        if request.data.get('ai_mode') == 'deferred':
+            return Response(
+                {'detail': 'ai_mode "deferred" needs a saved plan; use /api/plans/<id>/run/.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         serializer = OptimizationRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
@@ -344,7 +1084,8 @@ class TourOptimizationView(APIView):
 
         fallback_price = TourDate.objects.filter(artist_id=artist_id).order_by('-date').values_list('ticket_price', flat=True).first()
         fan_demands, _created_demands = ensure_fan_demands(artist, venues, fallback_price)
-        revenue_by_venue = estimate_revenue_by_venue(fan_demands, fallback_price, venues_by_id)
+        estimates = revenue_estimates(fan_demands, venues_by_id, {artist.id: fallback_price})
+        revenue_by_venue = {venue_id: revenue for (_artist_id, venue_id), (revenue, _attendance) in estimates.items()}
         if not start_venue_id and start_city:
             city_matches = [v for v in venues if v.city and v.city.lower().startswith(start_city.lower())]
             if not city_matches:
@@ -353,27 +1094,38 @@ class TourOptimizationView(APIView):
                 city_matches,
                 key=lambda v: revenue_by_venue.get(v.id, 0),
             ).id
+        ai_cache_hits = {'revenue_adjustment': None, 'venue_selection': None}
+        ai_selected = None
+        revenue_source = None
+        uncovered = set()
         if use_ai:
-            try:
-                revenue_by_venue = ai_adjust_revenue(revenue_by_venue, venues_by_id)
-            except Exception:
-                pass
+            revenue_by_venue, covered = apply_stored_multipliers(revenue_by_venue, fan_demands)
+            uncovered = set(revenue_by_venue) - covered
+            revenue_source = revenue_adjustment_source(covered, uncovered)
+        if uncovered or use_ai_selection:
+            revenue_by_venue, ai_selected, ai_cache_hits = run_ai_stage(
+                revenue_by_venue, venue_ids, venues_by_id, max_venues, start_city, start_venue_id,
+                adjust_revenue=bool(uncovered), adjust_venue_ids=uncovered, select_venues=use_ai_selection,
+            )
 
         selection_strategy = None
         ai_rationale = None
         ai_error = None
+        prompt_stats = None
         if max_venues and len(venue_ids) > max_venues:
             selection_strategy = "heuristic"
-            if use_ai_selection:
-                ai_selected = ai_select_venues(venue_ids, venues_by_id, revenue_by_venue, max_venues, start_city, start_venue_id)
-                if ai_selected:
-                    ai_rationale = ai_selected.get("rationale")
-                    ai_error = ai_selected.get("error_detail") or ai_selected.get("error")
-                    if ai_selected.get("venue_ids"):
-                        venue_ids = ai_selected["venue_ids"]
-                        selection_strategy = "ai"
+            if ai_selected:
+                ai_rationale = ai_selected.get("rationale")
+                ai_error = ai_selected.get("error_detail") or ai_selected.get("error")
+                prompt_stats = ai_selected.get("prompt_stats")
+                if ai_selected.get("venue_ids"):
+                    venue_ids = ai_selected["venue_ids"]
+                    selection_strategy = "ai"
             if selection_strategy != "ai":
-                venue_ids = select_venue_subset(venue_ids, venues_by_id, revenue_by_venue, max_venues, start_venue_id, start_city)
+                venue_ids, selection_strategy, local_rationale = select_local_venues(
+                    data.get('selection_strategy'), venue_ids, venues_by_id, revenue_by_venue, max_venues, start_venue_id, start_city,
+                )
+                ai_rationale = local_rationale or ai_rationale
 
             venues = list(Venue.objects.filter(id__in=venue_ids))
             venues_by_id = {v.id: v for v in venues}
@@ -415,6 +1167,9 @@ class TourOptimizationView(APIView):
             'selection_strategy': selection_strategy,
             'selection_rationale': ai_rationale,
             'selection_error': ai_error,
+            'selection_prompt_stats': prompt_stats,
+            'ai_cache_hits': ai_cache_hits,
+            'revenue_adjustment_source': revenue_source,
             'revenue_by_venue': revenue_by_venue,
             'venue_revenues': [
                 {'venue_id': vid, 'estimated_revenue': revenue_by_venue.get(vid, 0)}
@@ -432,9 +1187,18 @@ class TourOptimizationView(APIView):
         })
 
 
+class AIStatusView(APIView):
+    """State of this worker's OpenAI client, including the circuit breaker counters."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'openai': openai_status()})
+
+
 class PlanOptimizationRunView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request, plan_id):
         plan = TourPlan.objects.filter(id=plan_id, artist__owner=request.user).first()
         if not plan:
@@ -444,166 +1208,215 @@ class PlanOptimizationRunView(APIView):
         if not venue_ids:
             return Response({'detail': 'No venue_ids provided for this plan.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        payload = {
-            'artist_id': plan.artist_id,
-            'venue_ids': venue_ids,
-            'start_city': plan.start_city,
-            'start_venue_id': plan.constraints.get('start_venue_id'),
-            'use_ai': True,
-            'use_ai_selection': plan.constraints.get('use_ai_selection', False),
-            'max_venues': plan.constraints.get('max_venues'),
-            'cost_per_km': plan.constraints.get('cost_per_km', '2.00'),
-            'distance_weight': plan.constraints.get('distance_weight', '1.0'),
-            'revenue_weight': plan.constraints.get('revenue_weight', '1.0'),
-            'start_date': plan.start_date,
-            'min_gap_days': plan.constraints.get('min_gap_days', 1),
-            'travel_speed_km_per_day': plan.constraints.get('travel_speed_km_per_day', '500'),
-        }
+        options = PlanRunOptionsSerializer(data=request.data)
+        options.is_valid(raise_exception=True)
 
-        serializer = OptimizationRequestSerializer(data=payload)
-        serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
+        data = plan_optimization_data(plan, venue_ids)
+        inputs, error = load_plan_inputs(plan, data)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        if options.validated_data['ai_mode'] == 'deferred':
+            return self.deferred(plan, data, inputs)
+
+        run, shared = run_plan_single_flight(plan, data, inputs)
+        headers = {'X-Single-Flight': 'shared'} if shared else None
+        return Response(OptimizationRunSerializer(run).data, headers=headers)
+
+    def deferred(self, plan, data, inputs):
+        # Answer with the heuristic route now; the AI pass fills in a second run later.
+        heuristic_inputs = dict(inputs)
+        _event, result = solve_plan(plan, dict(data, use_ai=False, use_ai_selection=False), heuristic_inputs)
+        run, = save_plan_runs([(plan, result, heuristic_inputs)])
+
+        pending = OptimizationRun.objects.create(plan=plan, status=OptimizationRun.STATUS_PENDING, refines=run)
+        if background.refinement_executor.submit(refine_plan_run, pending.id, plan, data, inputs) is None:
+            pending.delete()
+            refinement = {
+                'run_id': None,
+                'status': 'rejected',
+                'detail': 'Too many AI refinements in progress; only the heuristic result is available.',
+            }
+        else:
+            refinement = {'run_id': pending.id, 'status': pending.status}
 
-        artist_id = data['artist_id']
-        venues = list(Venue.objects.filter(id__in=venue_ids))
-        if len(venues) != len(venue_ids):
-            return Response({'detail': 'One or more venues not found.'}, status=status.HTTP_400_BAD_REQUEST)
+        response = OptimizationRunSerializer(run).data
+        response['refinement'] = refinement
+        return Response(response)
 
-        filtered_venues, excluded_ids = filter_venues_by_region(venues, plan.region_filters or {})
-        if not filtered_venues:
-            return Response({'detail': 'No venues match the region filters.'}, status=status.HTTP_400_BAD_REQUEST)
-        if excluded_ids:
-            venue_ids = [v.id for v in filtered_venues]
-            venues = filtered_venues
 
-        venues_by_id = {v.id: v for v in venues}
-        missing_geo = [v.id for v in venues if v.latitude is None or v.longitude is None]
-        if missing_geo:
-            return Response(
-                {'detail': 'All venues must include latitude/longitude.', 'missing_venue_ids': missing_geo},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+class OptimizationRunRefreshView(APIView):
+    """
+    Re-run the plan behind a stale run incrementally: only venues whose inputs
+    changed get their revenue recomputed; AI multipliers, AI selection and the
+    route are reused from the stale run where still valid. Creates a new run.
+    """
+    permission_classes = [IsAuthenticated]
 
-        fallback_price = TourDate.objects.filter(artist_id=artist_id).order_by('-date').values_list('ticket_price', flat=True).first()
-        fan_demands, _created_demands = ensure_fan_demands(plan.artist, venues, fallback_price)
-        revenue_by_venue = estimate_revenue_by_venue(fan_demands, fallback_price, venues_by_id)
+    def post(self, request, run_id):
+        run = OptimizationRun.objects.filter(id=run_id, plan__artist__owner=request.user).select_related('plan__artist').first()
+        if not run:
+            return Response({'detail': 'Run not found or not owned by user.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if data.get('use_ai'):
+        plan = run.plan
+        if not plan.venue_ids:
+            return Response({'detail': 'No venue_ids provided for this plan.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = plan_optimization_data(plan, plan.venue_ids)
+        inputs, error = load_refresh_inputs(run, plan, data)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        _event, result = solve_plan(plan, data, inputs)
+        new_run, = save_plan_runs([(plan, result, inputs)])
+        return Response(OptimizationRunSerializer(new_run).data)
+
+
+class PlanBatchRunView(APIView):
+    """
+    Re-run many saved plans in one request. Inputs for every plan are loaded
+    up front with a fixed number of queries, the solvers run in parallel on the
+    shared background.solver_pool() (the solve is CPU-bound, so threads would
+    serialize on the GIL), and the resulting OptimizationRuns are inserted with
+    a single bulk_create. A plan whose solver raises is reported as an error entry
+    without failing the rest of the batch.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = PlanBatchRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        plan_ids = list(dict.fromkeys(serializer.validated_data['plan_ids']))
+
+        started = time.monotonic()
+        plans = list(TourPlan.objects.filter(id__in=plan_ids, artist__owner=request.user).select_related('artist'))
+        prepared = load_plan_batch(plans)
+
+        runnable = [plan for plan in plans if prepared[plan.id][1] is not None]
+        outcomes = {}
+        pool = background.solver_pool()
+        try:
+            futures = {plan.id: pool.submit(solve_plan_in_worker, plan, *prepared[plan.id][:2]) for plan in runnable}
+        except BrokenProcessPool:
+            # Another request saw a worker die; start a fresh pool and submit again.
+            background.discard_solver_pool(pool)
+            pool = background.solver_pool()
+            futures = {plan.id: pool.submit(solve_plan_in_worker, plan, *prepared[plan.id][:2]) for plan in runnable}
+        for plan_id, future in futures.items():
             try:
-                revenue_by_venue = ai_adjust_revenue(revenue_by_venue, venues_by_id)
-            except Exception:
-                pass
+                event, payload, artefacts = future.result()
+            except Exception as exc:
+                if isinstance(exc, BrokenProcessPool):
+                    background.discard_solver_pool(pool)
+                outcomes[plan_id] = ('error', {'detail': f'Optimization failed: {exc}'})
+                continue
+            prepared[plan_id][1]['artefacts'] = artefacts
+            outcomes[plan_id] = (event, payload)
+
+        plans_by_id = {plan.id: plan for plan in plans}
+        runs_by_plan = {
+            run.plan_id: run
+            for run in save_plan_runs([
+                (plans_by_id[plan_id], payload, prepared[plan_id][1])
+                for plan_id, (event, payload) in outcomes.items()
+                if event == 'result'
+            ])
+        }
 
-        selection_strategy = None
-        ai_rationale = None
-        ai_error = None
-        max_venues = data.get('max_venues')
-        use_ai_selection = data.get('use_ai_selection', False)
-        if max_venues and len(venue_ids) > max_venues:
-            selection_strategy = "heuristic"
-            if use_ai_selection:
-                ai_selected = ai_select_venues(venue_ids, venues_by_id, revenue_by_venue, max_venues, data.get('start_city'), data.get('start_venue_id'))
-                if ai_selected:
-                    ai_rationale = ai_selected.get("rationale")
-                    ai_error = ai_selected.get("error_detail") or ai_selected.get("error")
-                    if ai_selected.get("venue_ids"):
-                        venue_ids = ai_selected["venue_ids"]
-                        selection_strategy = "ai"
-            if selection_strategy != "ai":
-                venue_ids = select_venue_subset(venue_ids, venues_by_id, revenue_by_venue, max_venues, data.get('start_venue_id'), data.get('start_city'))
+        summaries = []
+        for plan_id in plan_ids:
+            if plan_id not in plans_by_id:
+                summaries.append({'plan_id': plan_id, 'status': 'not_found', 'detail': 'Plan not found or not owned by user.'})
+                continue
+            run = runs_by_plan.get(plan_id)
+            if not run:
+                error = prepared[plan_id][2] or outcomes.get(plan_id, (None, {}))[1]
+                summaries.append({'plan_id': plan_id, 'status': 'error', 'detail': error})
+                continue
+            summaries.append({
+                'plan_id': plan_id,
+                'status': 'ok',
+                'run_id': run.id,
+                'selection_strategy': run.selection_strategy,
+                'optimized_distance_km': run.optimized_distance_km,
+                'estimated_revenue': run.estimated_revenue,
+                'estimated_roi': run.estimated_roi,
+                'warnings': run.warnings,
+            })
 
-            venues = list(Venue.objects.filter(id__in=venue_ids))
-            venues_by_id = {v.id: v for v in venues}
+        return Response({
+            'plans': summaries,
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        })
 
-        start_venue_id = data.get('start_venue_id')
-        if not start_venue_id and data.get('start_city'):
-            city_matches = [v for v in venues if v.city and v.city.lower().startswith(data['start_city'].lower())]
-            if city_matches:
-                start_venue_id = max(city_matches, key=lambda v: revenue_by_venue.get(v.id, 0)).id
 
-        baseline_route = venue_ids[:]
-        if start_venue_id and start_venue_id in venue_ids:
-            baseline_route = [start_venue_id] + [vid for vid in venue_ids if vid != start_venue_id]
+class EventStreamRenderer(BaseRenderer):
+    # Lets clients send `Accept: text/event-stream` (as EventSource does) without a 406,
+    # and renders early errors as a single SSE error event.
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
 
-        nn_route = nearest_neighbor_route(venue_ids, venues_by_id, start_venue_id)
-        optimized_route = two_opt(nn_route, venues_by_id)
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event('error', data).encode('utf-8')
 
-        baseline_metrics = score_route(baseline_route, venues_by_id, revenue_by_venue, data['cost_per_km'], data['distance_weight'], data['revenue_weight'])
-        optimized_metrics = score_route(optimized_route, venues_by_id, revenue_by_venue, data['cost_per_km'], data['distance_weight'], data['revenue_weight'])
 
-        baseline_distance = baseline_metrics['distance_km']
-        optimized_distance = optimized_metrics['distance_km']
-        reduction_pct = None
-        if baseline_distance > 0:
-            reduction_pct = round(((baseline_distance - optimized_distance) / baseline_distance) * 100, 2)
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, cls=JSONEncoder)}\n\n"
 
-        total_cost = optimized_metrics['total_cost']
-        roi = None
-        if total_cost > 0:
-            roi = round((optimized_metrics['revenue'] - total_cost) / total_cost, 4)
 
-        schedule = build_schedule(
-            optimized_route,
-            venues_by_id,
-            start_date=data.get('start_date'),
-            min_gap_days=data.get('min_gap_days', 0),
-            travel_speed_km_per_day=data.get('travel_speed_km_per_day'),
-        )
+class PlanOptimizationStreamView(APIView):
+    """
+    Server-Sent Events version of PlanOptimizationRunView.
 
-        expected_attendance = 0.0
-        for demand in fan_demands:
-            venue = venues_by_id.get(demand.venue_id)
-            demand_attendance = Decimal(demand.fan_count) * Decimal(demand.engagement_score)
-            if venue and venue.capacity:
-                demand_attendance = min(demand_attendance, Decimal(venue.capacity))
-            expected_attendance += float(demand_attendance)
-
-        warnings = []
-        targets = plan.targets or {}
-        min_revenue = targets.get('min_revenue')
-        min_roi = targets.get('min_roi')
-        min_attendance = targets.get('min_attendance')
-        if min_revenue and optimized_metrics['revenue'] < float(min_revenue):
-            warnings.append('Estimated revenue is below target.')
-        if min_roi and roi is not None and roi < float(min_roi):
-            warnings.append('Estimated ROI is below target.')
-        if min_attendance and expected_attendance < float(min_attendance):
-            warnings.append('Estimated attendance is below target.')
-
-        result = {
-            'artist_id': artist_id,
-            'baseline_route': baseline_route,
-            'optimized_route': optimized_route,
-            'selected_venue_ids': venue_ids,
-            'selection_strategy': selection_strategy,
-            'selection_rationale': ai_rationale,
-            'selection_error': ai_error,
-            'revenue_by_venue': revenue_by_venue,
-            'venue_revenues': [
-                {'venue_id': vid, 'estimated_revenue': revenue_by_venue.get(vid, 0)}
-                for vid in venue_ids
-            ],
-            'metrics': {
-                'baseline_distance_km': baseline_distance,
-                'optimized_distance_km': optimized_distance,
-                'distance_reduction_pct': reduction_pct,
-                'estimated_revenue': optimized_metrics['revenue'],
-                'estimated_total_cost': total_cost,
-                'estimated_roi': roi,
-                'expected_attendance': round(expected_attendance, 2),
-            },
-            'schedule': schedule,
-            'excluded_venue_ids': excluded_ids,
-            'warnings': warnings,
-        }
+    Emits `stage` events as the pipeline advances, `progress` events with the
+    current best route while 2-opt improves it, a `selection` event as soon as
+    the venue subset (and AI rationale) is known, and finally a `result` event
+    carrying the saved OptimizationRun. Pipeline errors arrive as an `error` event.
+    GET uses the plan's venue_ids so browsers can connect with EventSource.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
 
-        run = OptimizationRun.objects.create(plan=plan, result=result)
-        return Response(OptimizationRunSerializer(run).data)
+    def get(self, request, plan_id):
+        return self.stream(request, plan_id, None)
+
+    def post(self, request, plan_id):
+        return self.stream(request, plan_id, request.data.get('venue_ids'))
+
+    def stream(self, request, plan_id, venue_ids):
+        plan = TourPlan.objects.filter(id=plan_id, artist__owner=request.user).first()
+        if not plan:
+            return Response({'detail': 'Plan not found or not owned by user.'}, status=status.HTTP_404_NOT_FOUND)
+
+        venue_ids = venue_ids or plan.venue_ids
+        if not venue_ids:
+            return Response({'detail': 'No venue_ids provided for this plan.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = plan_optimization_data(plan, venue_ids)
+
+        def events():
+            yield sse_event('stage', {'stage': 'loading'})
+            inputs, error = load_plan_inputs(plan, data)
+            if error:
+                yield sse_event('error', error)
+                return
+            for event, payload in iter_plan_solution(plan, data, inputs):
+                if event == 'result':
+                    run, = save_plan_runs([(plan, payload, inputs)])
+                    payload = OptimizationRunSerializer(run).data
+                yield sse_event(event, payload)
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class OptimizationRunConfirmView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request, run_id):
         run = OptimizationRun.objects.filter(id=run_id, plan__artist__owner=request.user).first()
         if not run:
@@ -619,6 +1432,9 @@ class OptimizationRunConfirmView(APIView):
         if not tour:
             return Response({'detail': 'Tour not found for this artist.'}, status=status.HTTP_404_NOT_FOUND)
 
+        if run.status != OptimizationRun.STATUS_COMPLETED:
+            return Response({'detail': f'Run is {run.status}; wait for it to complete.'}, status=status.HTTP_409_CONFLICT)
+
         schedule = request.data.get('schedule') or (run.result or {}).get('schedule') or []
         if not schedule:
             return Response({'detail': 'No schedule available in this run.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -626,12 +1442,14 @@ class OptimizationRunConfirmView(APIView):
         result, error = apply_schedule_to_tour(plan.artist, tour, schedule, conflict_strategy, request.user)
         if error:
             return error
+        OptimizationRun.objects.filter(id=run.id).update(confirmed_at=timezone.now())
         return Response(result)
 
 
 class TourOptimizationConfirmView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         serializer = OptimizationConfirmSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -52,6 +52,19 @@ async function apiRequest(path, options = {}) {
   return JSON.parse(text);
 }
 
+// Collect every page of a paginated list by following the `next` cursor.
+async function apiRequestAll(path, pageSize = 200) {
+  const items = [];
+  let next = `${path}${path.includes("?") ? "&" : "?"}page_size=${pageSize}`;
+  while (next) {
+    const data = await apiRequest(next);
+    if (Array.isArray(data)) return items.concat(data);
+    items.push(...data.results);
+    next = data.next ? data.next.replace(/^https?:\/\/[^/]+/, "") : null;
+  }
+  return items;
+}
+
 function getQueryParam(name) {
   const params = new URLSearchParams(window.location.search);
   return params.get(name);
@@ -203,7 +216,7 @@ async function loadHomeSummary() {
   if (!upcomingList || !summaryEl) return;
 
   try {
-    const tourDates = await apiRequest("/api/tours/");
+    const tourDates = await apiRequestAll("/api/tours/");
     const today = getToday();
     const upcoming = tourDates
       .filter((t) => parseISODate(t.date) >= today)
@@ -235,9 +248,9 @@ async function loadArtistsPage() {
     const artistTours = document.getElementById("artist-tours");
 
     const [artists, tourDates, tourGroups] = await Promise.all([
-      apiRequest("/api/artists/"),
-      apiRequest("/api/tours/"),
-      apiRequest("/api/tour-groups/")
+      apiRequestAll("/api/artists/"),
+      apiRequestAll("/api/tours/"),
+      apiRequestAll("/api/tour-groups/")
     ]);
 
     const sortedArtists = [...artists].sort((a, b) => a.name.localeCompare(b.name));
@@ -349,9 +362,9 @@ async function loadTourGroupsPage() {
 
   try {
     const [tourGroups, artists, venues] = await Promise.all([
-      apiRequest("/api/tour-groups/"),
-      apiRequest("/api/artists/"),
-      apiRequest("/api/venues/")
+      apiRequestAll("/api/tour-groups/"),
+      apiRequestAll("/api/artists/"),
+      apiRequestAll("/api/venues/")
     ]);
 
     tourGroupList.innerHTML = tourGroups.length
@@ -437,8 +450,8 @@ async function loadTourGroupDetail() {
 
   try {
     const [groups, tourDates] = await Promise.all([
-      apiRequest("/api/tour-groups/"),
-      apiRequest("/api/tours/")
+      apiRequestAll("/api/tour-groups/"),
+      apiRequestAll("/api/tours/")
     ]);
 
     const group = groups.find((g) => g.id === groupId);
@@ -553,10 +566,10 @@ async function loadTourDatesPage() {
 
   try {
     const [tourDates, venues, artists, tourGroups] = await Promise.all([
-      apiRequest("/api/tours/"),
-      apiRequest("/api/venues/"),
-      apiRequest("/api/artists/"),
-      apiRequest("/api/tour-groups/")
+      apiRequestAll("/api/tours/"),
+      apiRequestAll("/api/venues/"),
+      apiRequestAll("/api/artists/"),
+      apiRequestAll("/api/tour-groups/")
     ]);
 
     const today = getToday();
@@ -936,8 +949,8 @@ async function loadOptimizePage() {
   if (!tourGroupSelect || !startCitySelect || !venueList || !confirmTourGroup) return;
 
   const [tourGroups, tourDates] = await Promise.all([
-    apiRequest("/api/tour-groups/"),
-    apiRequest("/api/tours/")
+    apiRequestAll("/api/tour-groups/?expand=venues"),
+    apiRequestAll("/api/tours/")
   ]);
 
   tourGroupSelect.innerHTML = tourGroups
@@ -1024,7 +1037,7 @@ function bindOptimizeFlow() {
     }
 
     try {
-      const tourGroups = await apiRequest("/api/tour-groups/");
+      const tourGroups = await apiRequestAll("/api/tour-groups/");
       const group = tourGroups.find((g) => g.id === tourGroupId);
       if (!group) {
         throw new Error("Tour group not found.");
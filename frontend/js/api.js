@@ -62,6 +62,30 @@ async function apiRequest(path, options = {}) {
   return JSON.parse(text);
 }
 
+// Paginated lists: yield items page by page by following the `next` cursor
+async function* iterateList(path, { pageSize = 200 } = {}) {
+  const sep = path.includes("?") ? "&" : "?";
+  let next = `${path}${sep}page_size=${pageSize}`;
+  while (next) {
+    const data = await apiRequest(next);
+    if (Array.isArray(data)) {
+      yield* data;
+      return;
+    }
+    yield* data.results;
+    // `next` is absolute; apiRequest prefixes API_BASE, so keep only the path.
+    next = data.next ? data.next.replace(/^https?:\/\/[^/]+/, "") : null;
+  }
+}
+
+async function requestAll(path, options) {
+  const items = [];
+  for await (const item of iterateList(path, options)) {
+    items.push(item);
+  }
+  return items;
+}
+
 // Auth functions
 async function login(username, password) {
   const res = await fetch(`${API_BASE}/api/token/`, {
@@ -116,6 +140,8 @@ function requireAuth() {
 // Export
 window.API = {
   request: apiRequest,
+  iterateList,
+  requestAll,
   login,
   register,
   logout,
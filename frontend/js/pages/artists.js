@@ -16,9 +16,9 @@ async function loadArtistsPage() {
 
   try {
     const [artists, tourDates, tourGroups] = await Promise.all([
-      window.API.request("/api/artists/"),
-      window.API.request("/api/tours/"),
-      window.API.request("/api/tour-groups/")
+      window.API.requestAll("/api/artists/"),
+      window.API.requestAll("/api/tours/"),
+      window.API.requestAll("/api/tour-groups/")
     ]);
 
     artistsData = {
@@ -10,7 +10,7 @@ async function loadHomeSummary() {
   if (!upcomingList || !summaryEl) return;
 
   try {
-    const tourDates = await window.API.request("/api/tours/");
+    const tourDates = await window.API.requestAll("/api/tours/");
     const today = window.UI.getToday();
 
     const upcoming = tourDates
@@ -129,7 +129,7 @@ async function loadOptimizeDetail() {
 
   let fanDemands = [];
   try {
-    const allDemands = await window.API.request("/api/fan-demand/");
+    const allDemands = await window.API.requestAll("/api/fan-demand/");
     fanDemands = allDemands.filter(d => d.artist === data.artist_id);
   } catch {
     fanDemands = [];
@@ -80,7 +80,7 @@ async function loadOptimizePage() {
   if (!tourGroupSelect) return;
 
   try {
-    const tourGroups = await window.API.request("/api/tour-groups/");
+    const tourGroups = await window.API.requestAll("/api/tour-groups/?expand=venues");
     optimizeState.tourGroups = tourGroups;
 
     tourGroupSelect.innerHTML = tourGroups.map(g =>
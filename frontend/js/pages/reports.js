@@ -11,7 +11,7 @@ async function loadReportsPage() {
   if (!reportType) return;
 
   try {
-    const artists = await window.API.request("/api/artists/");
+    const artists = await window.API.requestAll("/api/artists/");
 
     if (artistSelect) {
       artistSelect.innerHTML = '<option value="">All Artists</option>' +
@@ -16,10 +16,10 @@ async function loadTourDatesPage() {
 
   try {
     const [tourDates, venues, artists, tourGroups] = await Promise.all([
-      window.API.request("/api/tours/"),
-      window.API.request("/api/venues/"),
-      window.API.request("/api/artists/"),
-      window.API.request("/api/tour-groups/")
+      window.API.requestAll("/api/tours/"),
+      window.API.requestAll("/api/venues/"),
+      window.API.requestAll("/api/artists/"),
+      window.API.requestAll("/api/tour-groups/")
     ]);
 
     const today = window.UI.getToday();
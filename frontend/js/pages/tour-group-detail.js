@@ -19,8 +19,8 @@ async function loadTourGroupDetail() {
 
   try {
     const [groups, tourDates] = await Promise.all([
-      window.API.request("/api/tour-groups/"),
-      window.API.request("/api/tours/")
+      window.API.requestAll("/api/tour-groups/"),
+      window.API.requestAll("/api/tours/")
     ]);
 
     const group = groups.find(g => g.id === groupId);
@@ -69,9 +69,9 @@ async function loadTourGroupsPage() {
 
   try {
     const [tourGroups, artists, venues] = await Promise.all([
-      window.API.request("/api/tour-groups/"),
-      window.API.request("/api/artists/"),
-      window.API.request("/api/venues/")
+      window.API.requestAll("/api/tour-groups/"),
+      window.API.requestAll("/api/artists/"),
+      window.API.requestAll("/api/venues/")
     ]);
 
     tourGroupsPageData = { tourGroups, artists, venues };
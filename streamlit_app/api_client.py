@@ -9,6 +9,13 @@ def _auth_headers(token):
     return {"Authorization": f"Bearer {token}"}
 
 
+def _idempotency_headers(token, idempotency_key):
+    headers = _auth_headers(token)
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    return headers
+
+
 def _handle_response(response):
     try:
         data = response.json()
@@ -22,6 +29,24 @@ def _handle_response(response):
     return data
 
 
+def iter_list(api_base_url, token, path, params=None, page_size=200):
+    """
+    Yield every item of a paginated list endpoint, one page in memory at a time.
+    Pages are fetched lazily by following the server's `next` cursor.
+    """
+    url = _url(api_base_url, path)
+    params = {**(params or {}), "page_size": page_size}
+    while url:
+        data = _handle_response(requests.get(url, params=params, headers=_auth_headers(token), timeout=15))
+        if not isinstance(data, dict) or "results" not in data:
+            # Unpaginated endpoint: the whole list came back at once.
+            yield from data or []
+            return
+        yield from data["results"]
+        # `next` already carries the cursor and page_size.
+        url, params = data.get("next"), None
+
+
 def login(api_base_url, username, password):
     response = requests.post(
         _url(api_base_url, "/api/token/"),
@@ -41,12 +66,7 @@ def register(api_base_url, username, email, password):
 
 
 def get_artists(api_base_url, token):
-    response = requests.get(
-        _url(api_base_url, "/api/artists/"),
-        headers=_auth_headers(token),
-        timeout=15,
-    )
-    return _handle_response(response)
+    return list(iter_list(api_base_url, token, "/api/artists/"))
 
 
 def create_artist(api_base_url, token, name, genre):
@@ -60,21 +80,11 @@ def create_artist(api_base_url, token, name, genre):
 
 
 def get_venues(api_base_url, token):
-    response = requests.get(
-        _url(api_base_url, "/api/venues/"),
-        headers=_auth_headers(token),
-        timeout=15,
-    )
-    return _handle_response(response)
+    return list(iter_list(api_base_url, token, "/api/venues/"))
 
 
 def get_tour_groups(api_base_url, token):
-    response = requests.get(
-        _url(api_base_url, "/api/tour-groups/"),
-        headers=_auth_headers(token),
-        timeout=15,
-    )
-    return _handle_response(response)
+    return list(iter_list(api_base_url, token, "/api/tour-groups/"))
 
 
 def create_tour_group(api_base_url, token, payload):
@@ -88,29 +98,24 @@ def create_tour_group(api_base_url, token, payload):
 
 
 def get_tour_dates(api_base_url, token):
-    response = requests.get(
-        _url(api_base_url, "/api/tours/"),
-        headers=_auth_headers(token),
-        timeout=15,
-    )
-    return _handle_response(response)
+    return list(iter_list(api_base_url, token, "/api/tours/"))
 
 
-def run_optimization(api_base_url, token, payload):
+def run_optimization(api_base_url, token, payload, idempotency_key=None):
     response = requests.post(
         _url(api_base_url, "/api/optimize/"),
         json=payload,
-        headers=_auth_headers(token),
+        headers=_idempotency_headers(token, idempotency_key),
         timeout=60,
     )
     return _handle_response(response)
 
 
-def confirm_optimization(api_base_url, token, payload):
+def confirm_optimization(api_base_url, token, payload, idempotency_key=None):
     response = requests.post(
         _url(api_base_url, "/api/optimize/confirm/"),
         json=payload,
-        headers=_auth_headers(token),
+        headers=_idempotency_headers(token, idempotency_key),
         timeout=30,
     )
     return _handle_response(response)
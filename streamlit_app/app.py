@@ -1,5 +1,6 @@
 import math
 import os
+import uuid
 from datetime import date, timedelta
 
 import pydeck as pdk
@@ -56,6 +57,22 @@ def list_response_items(data):
     return data if isinstance(data, list) else []
 
 
+def idempotency_key(action, payload):
+    # A fresh key per button press. A failed press keeps its key, so pressing
+    # again with the same payload retries the same action and the server
+    # replays its stored response instead of running it twice.
+    pending = st.session_state.get(f"{action}_idempotency")
+    if pending and pending["payload"] == payload:
+        return pending["key"]
+    key = str(uuid.uuid4())
+    st.session_state[f"{action}_idempotency"] = {"key": key, "payload": payload}
+    return key
+
+
+def clear_idempotency_key(action):
+    st.session_state.pop(f"{action}_idempotency", None)
+
+
 def display_error(error):
     response = getattr(error, "response", None)
     if response is not None:
@@ -583,6 +600,10 @@ def render_optimize_tab():
         travel_speed_km_per_day = st.number_input("Travel speed km/day", min_value=1.0, value=500.0, step=25.0)
         use_ai = st.checkbox("Use AI revenue adjustment")
         use_ai_selection = st.checkbox("Use AI venue selection")
+        spread_selection = st.checkbox(
+            "Spread venues across regions",
+            help="Without AI (or if it fails), trade some revenue for geographic coverage when trimming to Max venues.",
+        )
 
     ai_ready = bool(max_venues and len(selected_venue_ids) > max_venues and use_ai_selection)
     if use_ai_selection:
@@ -597,6 +618,7 @@ def render_optimize_tab():
             "venue_ids": selected_venue_ids,
             "use_ai": use_ai,
             "use_ai_selection": use_ai_selection,
+            "selection_strategy": "diverse" if spread_selection else "heuristic",
             "cost_per_km": str(cost_per_km),
             "distance_weight": "1.0",
             "revenue_weight": "1.0",
@@ -614,7 +636,9 @@ def render_optimize_tab():
                 st.session_state["api_base_url"],
                 get_access_token(),
                 payload,
+                idempotency_key=idempotency_key("optimize", payload),
             )
+            clear_idempotency_key("optimize")
         except requests.RequestException as error:
             display_error(error)
 
@@ -774,7 +798,13 @@ def render_save_to_my_tours(api_base_url, token, result, artist_label, artist_id
             if conflict_label in conflict_map:
                 payload["conflict_strategy"] = conflict_map[conflict_label]
 
-            save_result = confirm_optimization(api_base_url, token, payload)
+            save_result = confirm_optimization(
+                api_base_url,
+                token,
+                payload,
+                idempotency_key=idempotency_key("confirm", payload),
+            )
+            clear_idempotency_key("confirm")
             refresh_account_data()
             st.success("Saved to My Tours")
             st.json(save_result)